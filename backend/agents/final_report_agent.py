@@ -1,9 +1,60 @@
 from backend.agents.websearch_agent import news_agent
 from backend.agents.pinecone_agent import search_pinecone_db
 from backend.agents.snowflake_agent import snowflake_agent_call
-from backend.pinecone_db import AgenticResearchAssistant
-from langgraph.graph import StateGraph
+from backend.pinecone_db import get_assistant
+from langgraph.graph import StateGraph, START, END
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
 from typing import Dict, List, Any, TypedDict
+import logging
+import threading
+import time
+import os
+
+# Per-agent time limits (seconds); an agent that runs over contributes None to the report
+AGENT_TIMEOUTS = {
+    "pinecone": float(os.getenv("PINECONE_AGENT_TIMEOUT", "120")),
+    "snowflake": float(os.getenv("SNOWFLAKE_AGENT_TIMEOUT", "90")),
+    "news": float(os.getenv("NEWS_AGENT_TIMEOUT", "60")),
+}
+
+# Agents run here so a node can stop waiting on them once its timeout expires. An agent
+# that timed out keeps its thread until it returns, so reports are admitted only while
+# every agent call can start at once (AGENT_WORKERS / 3 concurrent reports)
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", "12"))
+_agent_executor = ThreadPoolExecutor(max_workers=AGENT_WORKERS, thread_name_prefix="report-agent")
+_agent_calls_lock = threading.Lock()
+_agent_calls = 0  # agent calls submitted and not yet returned, including timed-out ones
+
+
+class AgentPoolSaturated(Exception):
+    """Raised when the agent pool has no room for another report's agents."""
+
+
+def reserve_agents(count):
+    """Reserves threads for `count` agent calls, or raises AgentPoolSaturated."""
+    global _agent_calls
+    with _agent_calls_lock:
+        if _agent_calls + count > AGENT_WORKERS:
+            raise AgentPoolSaturated(f"All {AGENT_WORKERS} report agent workers are busy; try again later.")
+        _agent_calls += count
+
+
+def _release_agent(_future):
+    global _agent_calls
+    with _agent_calls_lock:
+        _agent_calls -= 1
+
+
+def submit_agent(fn, *args):
+    """Runs an agent call reserved with reserve_agents() on the agent pool."""
+    future = _agent_executor.submit(fn, *args)
+    future.add_done_callback(_release_agent)
+    return future
+
+
+def agent_pool_stats():
+    with _agent_calls_lock:
+        return {"workers": AGENT_WORKERS, "running": _agent_calls}
 
 # Define a typed state for the graph
 class AgentState(TypedDict):
@@ -13,30 +64,64 @@ class AgentState(TypedDict):
     snowflake_result: str | None
     news_result: str | None
 
-# Define agent functions with proper signatures
-def pinecone_node(state: AgentState) -> AgentState:
+def run_with_timeout(agent_name, fn, *args):
+    """Runs an agent call with its configured timeout, returning None on timeout or error."""
+    timeout = AGENT_TIMEOUTS[agent_name]
+    future = submit_agent(fn, *args)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        logging.warning(f"{agent_name} agent timed out after {timeout}s; omitting its section.")
+    except Exception as e:
+        logging.error(f"{agent_name} agent failed: {e}")
+    return None
+
+# Define agent functions with proper signatures. The nodes run in parallel, so each
+# one returns only the state key it owns.
+def pinecone_node(state: AgentState) -> Dict[str, Any]:
     """Node for Pinecone search functionality"""
-    assistant = AgenticResearchAssistant()
-    query = state["query"]
-    year_quarter_dict = state["year_quarter_dict"]
-    result = search_pinecone_db(assistant, query, year_quarter_dict)
-    state["pinecone_result"] = result
-    return state
-
-def snowflake_node(state: AgentState) -> AgentState:
+    def run(query, year_quarter_dict):
+        return search_pinecone_db(get_assistant(), query, year_quarter_dict)
+    result = run_with_timeout("pinecone", run, state["query"], state["year_quarter_dict"])
+    return {"pinecone_result": result}
+
+def snowflake_node(state: AgentState) -> Dict[str, Any]:
     """Node for Snowflake query functionality"""
-    query = state["query"]
-    year_quarter_dict = state["year_quarter_dict"]
-    result = snowflake_agent_call(year_quarter_dict, query)
-    state["snowflake_result"] = result
-    return state
+    result = run_with_timeout("snowflake", snowflake_agent_call, state["year_quarter_dict"], state["query"])
+    return {"snowflake_result": result}
 
-def news_node(state: AgentState) -> AgentState:
+def news_node(state: AgentState) -> Dict[str, Any]:
     """Node for News search functionality"""
-    query = state["query"]
-    result = news_agent(query)
-    state["news_result"] = result
-    return state
+    result = run_with_timeout("news", news_agent, state["query"])
+    return {"news_result": result}
+
+def join_node(state: AgentState) -> Dict[str, Any]:
+    """Join point: runs once all three agent nodes have finished"""
+    return {}
+
+def build_report_graph():
+    """
+    Builds and compiles the report workflow: the three independent agents fan out
+    from START in parallel and are joined before END.
+    """
+    workflow = StateGraph(AgentState)
+
+    # Add nodes to the graph
+    workflow.add_node("pinecone", pinecone_node)
+    workflow.add_node("snowflake", snowflake_node)
+    workflow.add_node("news", news_node)
+    workflow.add_node("join", join_node)
+
+    # Fan out to all agents, then wait for all of them at the join node
+    for agent_name in ("pinecone", "snowflake", "news"):
+        workflow.add_edge(START, agent_name)
+    workflow.add_edge(["pinecone", "snowflake", "news"], "join")
+    workflow.add_edge("join", END)
+
+    return workflow.compile()
+
+# Compiled once at import and reused by every request
+report_graph = build_report_graph()
 
 def combine_agents(query: str, year_quarter_dict: Dict[str, List[str]]) -> str:
     """
@@ -48,23 +133,10 @@ def combine_agents(query: str, year_quarter_dict: Dict[str, List[str]]) -> str:
         
     Returns:
         Combined report from all agents
+
+    Raises AgentPoolSaturated when the agent pool cannot run all three agents now.
     """
-    # Create a LangGraph StateGraph object
-    workflow = StateGraph(AgentState)
-    
-    # Add nodes to the graph
-    workflow.add_node("pinecone", pinecone_node)
-    workflow.add_node("snowflake", snowflake_node)
-    workflow.add_node("news", news_node)
-    
-    # Define the workflow graph edges
-    workflow.set_entry_point("pinecone")
-    workflow.add_edge("pinecone", "snowflake")
-    workflow.add_edge("snowflake", "news")
-    
-    # Compile the graph
-    app = workflow.compile()
-    
+    reserve_agents(3)
     # Initialize the state
     initial_state = {
         "query": query,
@@ -75,16 +147,59 @@ def combine_agents(query: str, year_quarter_dict: Dict[str, List[str]]) -> str:
     }
     
     # Execute the workflow
-    final_state = app.invoke(initial_state)
+    final_state = report_graph.invoke(initial_state)
     
-    # Combine the results into a final repor
-
+    # Combine the results into a final report
     final_report = {"pinecone_result": final_state['pinecone_result'],
                     "snowflake_result": final_state['snowflake_result'],
                     "news_result": final_state['news_result']}
     
     return final_report
 
+def iter_agent_sections(query: str, year_quarter_dict: Dict[str, List[str]]):
+    """
+    Starts the three agents in parallel and returns an iterator of (agent_name, result)
+    that yields each one as soon as it finishes, for streaming the report section by
+    section. An agent that exceeds its timeout or fails is yielded with a None result.
+    Raises AgentPoolSaturated (before any agent starts) when the pool is full.
+    """
+    calls = {
+        "pinecone": lambda: search_pinecone_db(get_assistant(), query, year_quarter_dict),
+        "snowflake": lambda: snowflake_agent_call(year_quarter_dict, query),
+        "news": lambda: news_agent(query),
+    }
+    reserve_agents(len(calls))
+    start = time.monotonic()
+    futures = {submit_agent(call): agent_name for agent_name, call in calls.items()}
+    return _agent_sections(futures, start)
+
+def _agent_sections(futures, start):
+    pending = set(futures)
+
+    while pending:
+        # Give up on agents that are past their own timeout
+        elapsed = time.monotonic() - start
+        for future in list(pending):
+            agent_name = futures[future]
+            if not future.done() and elapsed >= AGENT_TIMEOUTS[agent_name]:
+                pending.discard(future)
+                logging.warning(f"{agent_name} agent timed out after {AGENT_TIMEOUTS[agent_name]}s; omitting its section.")
+                yield agent_name, None
+        if not pending:
+            break
+
+        next_deadline = min(AGENT_TIMEOUTS[futures[future]] for future in pending) - (time.monotonic() - start)
+        done, _ = wait(pending, timeout=max(next_deadline, 0), return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            agent_name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.error(f"{agent_name} agent failed: {e}")
+                result = None
+            yield agent_name, result
+
 # Example of how to invoke the function
 if __name__ == "__main__":
     query = "Nvidia financial results"
@@ -1,58 +1,136 @@
 from backend.pinecone_db import AgenticResearchAssistant  # adjust import as needed
-from backend.llm_response import generate_gemini_response
+from backend.llm_response import generate_gemini_response, stream_gemini_response
+from backend.semantic_cache import answer_cache
+from backend.lexical_index import fuse_matches
+from backend.context_packer import pack_context
+from concurrent.futures import ThreadPoolExecutor, wait
 import logging
+import os
+
+# Bounded pool shared by all requests for the per-quarter Pinecone queries
+QUERY_TIMEOUT_SECONDS = float(os.getenv("PINECONE_QUERY_TIMEOUT", "10"))
+_query_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PINECONE_QUERY_WORKERS", "8")),
+    thread_name_prefix="pinecone-query"
+)
+
+# "dense" (vector search only) or "hybrid" (BM25 fused with vector search)
+RETRIEVAL_MODES = ("dense", "hybrid")
+DEFAULT_RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+
+def query_quarter(vector_store, query_embedding, year, quarter, top_k):
+    """Runs one filtered vector-store query for a single (year, quarter) pair."""
+    return vector_store.query(query_embedding, top_k, year, quarter)
+
+def hybrid_query_quarter(vector_store, lexical_index, query, query_embedding, year, quarter, candidates, top_k):
+    """
+    Fuses the top `candidates` dense and BM25 matches of one (year, quarter) and keeps the
+    best `top_k`. Quarters without a lexical index fall back to dense results.
+    """
+    dense_matches = vector_store.query(query_embedding, candidates, year, quarter)
+    lexical_matches = lexical_index.search(query, candidates, year, quarter)
+    if lexical_matches is None:
+        logging.warning(f"No lexical index for {year} Q{quarter}; using dense results only.")
+        return dense_matches[:top_k]
+    return fuse_matches(dense_matches, lexical_matches, top_k)
+
+def query_quarters_concurrently(vector_store, query_embedding, all_quarters, top_k, timeout=QUERY_TIMEOUT_SECONDS,
+                                lexical_index=None, query=None, candidates=None):
+    """
+    Issues the per-quarter queries concurrently and merges the matches in quarter order.
+    Quarters that fail or exceed `timeout` are logged and skipped, so partial results are
+    still returned. With a `lexical_index`, each quarter runs a hybrid query over `candidates`
+    matches per retriever.
+    """
+    if lexical_index is None:
+        futures = [
+            _query_executor.submit(query_quarter, vector_store, query_embedding, year, quarter, top_k)
+            for year, quarter in all_quarters
+        ]
+    else:
+        futures = [
+            _query_executor.submit(hybrid_query_quarter, vector_store, lexical_index, query, query_embedding,
+                                   year, quarter, candidates or top_k, top_k)
+            for year, quarter in all_quarters
+        ]
+    wait(futures, timeout=timeout)
+
+    combined_matches = []
+    for (year, quarter), future in zip(all_quarters, futures):
+        if not future.done():
+            future.cancel()
+            logging.warning(f"Vector store query for {year} Q{quarter} timed out after {timeout}s.")
+            continue
+        try:
+            combined_matches.extend(future.result())
+        except Exception as e:
+            logging.warning(f"Vector store query for {year} Q{quarter} failed: {e}")
+    return combined_matches
+
+def build_context(self, query_embedding, year_quarter_dict, query=None, mode=None):
+    """
+    Retrieves the matches for every selected quarter and builds the Gemini context.
+    In "hybrid" mode the lexical and dense scores are fused, and fewer, more precise
+    chunks are kept per quarter.
+
+    Returns (context, None) on success, or (None, message) when there is nothing to answer from.
+    """
+    mode = mode or DEFAULT_RETRIEVAL_MODE
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode '{mode}'. Choose 'dense' or 'hybrid'.")
+    # Flatten all (year, quarter) combinations
+    all_quarters = [(str(year), str(q)) for year, quarters in year_quarter_dict.items() for q in quarters]
+    n_quarters = len(all_quarters)
+
+    if n_quarters == 0:
+        logging.warning("No quarters provided for search.")
+        return None, "Please specify at least one quarter."
+
+    # Dynamically decide how many top results per quarter
+    if n_quarters == 1:
+        top_k_per_quarter = 20
+    elif n_quarters == 2:
+        top_k_per_quarter = 10
+    elif n_quarters == 3:
+        top_k_per_quarter = 7
+    else:  # 4 or 5
+        top_k_per_quarter = 5
+
+    if mode == "hybrid":
+        # The dense depth becomes the candidate pool; fusion keeps about half of it
+        combined_matches = query_quarters_concurrently(
+            self.vector_store, query_embedding, all_quarters, max(3, top_k_per_quarter // 2),
+            lexical_index=self.lexical_index, query=query, candidates=top_k_per_quarter
+        )
+    else:
+        combined_matches = query_quarters_concurrently(self.vector_store, query_embedding, all_quarters, top_k_per_quarter)
+    logging.debug(f"Retrieved {len(combined_matches)} matches from {len(all_quarters)} quarters.")
+
+    if not combined_matches:
+        logging.warning("No relevant matches found for the given quarters.")
+        return None, "No relevant information found for the specified year and quarters."
+
+    # Create context: deduplicated, best-scored chunks within the token budget, fair across quarters
+    context, _ = pack_context(combined_matches)
+    return context, None
+
+def search_pinecone_db(self, query, year_quarter_dict, use_cache=True, mode=None):
+    query_vector = self.model.encode([query])[0]  # single vector
+    query_embedding = query_vector.tolist()
+
+    # Serve near-identical questions about the same quarters from the semantic cache
+    if use_cache:
+        cached_response = answer_cache.lookup(year_quarter_dict, query_vector)
+        if cached_response is not None:
+            return cached_response
 
-def search_pinecone_db(self, query, year_quarter_dict):
-    query_embedding = self.model.encode([query]).tolist()[0]  # single vector
     try:
-        # Flatten all (year, quarter) combinations
-        all_quarters = [(str(year), str(q)) for year, quarters in year_quarter_dict.items() for q in quarters]
-        n_quarters = len(all_quarters)
-
-        if n_quarters == 0:
-            logging.warning("No quarters provided for search.")
-            return "Please specify at least one quarter."
-
-        # Dynamically decide how many top results per quarter
-        if n_quarters == 1:
-            top_k_per_quarter = 20
-        elif n_quarters == 2:
-            top_k_per_quarter = 10
-        elif n_quarters == 3:
-            top_k_per_quarter = 7
-        else:  # 4 or 5
-            top_k_per_quarter = 5
-
-        combined_matches = []
-
-        for year, quarter in all_quarters:
-            filter_criteria = {
-                "year": {"$eq": year},
-                "quarter": {"$eq": quarter}
-            }
-            results = self.index.query(
-                vector=[query_embedding],
-                top_k=top_k_per_quarter,
-                include_metadata=True,
-                filter=filter_criteria
-            )
-            combined_matches.extend(results.get("matches", []))
-            # print(combined_matches)
-            print(len(combined_matches))
-
-        if not combined_matches:
-            logging.warning("No relevant matches found for the given quarters.")
-            return "No relevant information found for the specified year and quarters."
-
-        # Extract matched texts along with metadata
-        retrieved_data = [
-            (match["metadata"]["text"], match["metadata"]["year"], match["metadata"]["quarter"])
-            for match in combined_matches
-        ]
+        context, message = build_context(self, query_embedding, year_quarter_dict, query, mode)
+        if context is None:
+            return message
 
-        # Create context
-        context = "\n".join([f"Year: {year}, Quarter: {quarter} - {text}" for text, year, quarter in retrieved_data])
         response = generate_gemini_response("pinecone-agent",query, context)
+        answer_cache.store(year_quarter_dict, query_vector, response)
 
         return response
 
@@ -60,6 +138,39 @@ def search_pinecone_db(self, query, year_quarter_dict):
         logging.error(f"Error during search: {e}")
         return "Error occurred during search."
 
+def stream_search_pinecone_db(self, query, year_quarter_dict, use_cache=True, mode=None):
+    """Streaming variant of search_pinecone_db: yields the answer in pieces as Gemini generates it."""
+    query_vector = self.model.encode([query])[0]  # single vector
+    query_embedding = query_vector.tolist()
+
+    if use_cache:
+        cached_response = answer_cache.lookup(year_quarter_dict, query_vector)
+        if cached_response is not None:
+            yield cached_response
+            return
+
+    try:
+        context, message = build_context(self, query_embedding, year_quarter_dict, query, mode)
+    except Exception as e:
+        logging.error(f"Error during search: {e}")
+        yield "Error occurred during search."
+        return
+    if context is None:
+        yield message
+        return
+
+    pieces = []
+    try:
+        for piece in stream_gemini_response("pinecone-agent", query, context):
+            pieces.append(piece)
+            yield piece
+    except Exception as e:
+        logging.error(f"Error during streamed generation: {e}")
+        yield "\n\nError occurred during search."
+        return
+
+    answer_cache.store(year_quarter_dict, query_vector, "".join(pieces).strip())
+
 
 
 # # Step 1: Instantiate the class
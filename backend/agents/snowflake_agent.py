@@ -1,124 +1,108 @@
-import snowflake.connector
 from dotenv import load_dotenv
 import os
 import re
-import io
+import logging
 import pandas as pd
-import matplotlib.pyplot as plt
 from backend.llm_response import generate_gemini_response
 from datetime import datetime
-from backend.s3_utils import upload_image_to_s3, fetch_images_from_s3_folder
+from backend.s3_utils import upload_images_to_s3
+from backend.snowflake_pool import snowflake_pool
+from backend.sql_cache import resolve_sql, question_tickers
+from backend.chart_rendering import render_query_charts
+from backend.fin_data_mirror import fin_data_source, query_mirror, iter_mirror_batches
+from snowflake.connector.constants import FIELD_ID_TO_NAME
 
 # Load environment variables
 dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../..", ".env"))
 load_dotenv(dotenv_path)
 
-def fetch_snowflake_df(query):
-    # Snowflake connection details
-    SNOWFLAKE_ACCOUNT = os.getenv("SNOWFLAKE_ACCOUNT")  # e.g. 'vwcoqxf-qtb83828'
-    SNOWFLAKE_USER = os.getenv("SNOWFLAKE_USER")  # Your Snowflake username
-    SNOWFLAKE_PASSWORD = os.getenv("SNOWFLAKE_PASSWORD")  # Your Snowflake password
-    SNOWFLAKE_ROLE = os.getenv("SNOWFLAKE_ROLE")  # Your role, e.g., 'SYSADMIN'
-
-    # Connecting to Snowflake
-    conn = snowflake.connector.connect(
-        user=SNOWFLAKE_USER,        # This should be your username
-        password=SNOWFLAKE_PASSWORD,       # This should be your password
-        account=SNOWFLAKE_ACCOUNT,     # This should be your Snowflake account URL
-        role=SNOWFLAKE_ROLE          # Optional, if you need to specify the role
-    )
-
-    cur = conn.cursor()
-    cur.execute("USE DATABASE NVIDIA_DB;")  # Specify the database
-    cur.execute("USE SCHEMA NVIDIA_DB.NVIDIA_SCHEMA;")  # Specify the schema
+# pandas dtypes of Snowflake column types (FIXED depends on its scale), as the Arrow batches convert them
+PANDAS_DTYPES = {
+    "REAL": "float64",
+    "BOOLEAN": "bool",
+    "DATE": "datetime64[ns]",
+    "TIMESTAMP_NTZ": "datetime64[ns]",
+    "TIMESTAMP_LTZ": "datetime64[ns, UTC]",
+    "TIMESTAMP_TZ": "datetime64[ns, UTC]",
+}
+
+def column_dtype(column):
+    """pandas dtype of a result column, from the cursor metadata."""
+    type_name = FIELD_ID_TO_NAME.get(column.type_code)
+    if type_name == "FIXED":
+        return "int64" if not column.scale else "float64"
+    return PANDAS_DTYPES.get(type_name, "object")
+
+def empty_result(cur):
+    """Empty DataFrame with the result's column names and dtypes."""
+    return pd.DataFrame({column.name: pd.Series(dtype=column_dtype(column)) for column in cur.description})
+
+def iter_snowflake_batches(query):
+    """
+    Streams the query result as pandas DataFrames, one per Arrow result batch, so large
+    date ranges never have to be held in memory at once.
+    """
+    # Serve from the local DuckDB mirror of NVIDIA_FIN_DATA when FIN_DATA_SOURCE=local
+    if fin_data_source() == "local":
+        yield from iter_mirror_batches(query)
+        return
 
-    #print(agg_query)
-    columns = re.search(r"SELECT\s+(.*?)\s+FROM", query, re.IGNORECASE)
+    # Borrow a pooled connection (database and schema are already set) and always return it
+    with snowflake_pool.connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(query)
+            batches = 0
+            for table in cur.fetch_arrow_batches():
+                batches += 1
+                yield table.to_pandas()
+            if batches == 0:
+                # No rows: keep the columns and their types so callers can still inspect the result
+                yield empty_result(cur)
+        finally:
+            cur.close()
 
-    # Split the extracted column names by commas and strip whitespace
-    if columns:
-        column_names = [col.strip() for col in columns.group(1).split(",")]
-        print(column_names)
+def fetch_snowflake_df(query):
+    """Runs the query and returns the whole result as one DataFrame, built from Arrow batches."""
+    if fin_data_source() == "local":
+        df = query_mirror(query)
     else:
-        print("No columns found.")
-
-    cur.execute(query)
-    results = cur.fetchall()  # Fetch all rows
-    #print(results)
-    print(type(results))
-    df = pd.DataFrame(results, columns=column_names)
-    print(df)
+        batches = list(iter_snowflake_batches(query))
+        df = batches[0] if len(batches) == 1 else pd.concat(batches, ignore_index=True)
+    logging.debug(f"Query returned {df.shape[0]} rows x {df.shape[1]} columns.")
     return df
 
 
-def plot_graph(df, column_name, folder_name):
-    print(f"Plotting graphs for column: {column_name}")
-    if column_name not in df.columns:
-        print(f"Column '{column_name}' not found in the DataFrame.")
-        return
-    
-    # Create the plot
-    plt.figure(figsize=(10, 6))
-    plt.plot(df['DATE'], df[column_name], label=column_name, color='blue')
-
-    # Set title and labels
-    plt.title(f'Plot of {column_name} over Time')
-    plt.xlabel('Date')
-    plt.ylabel(column_name)
-    plt.legend(title=column_name)
-
-    # Rotate x-axis labels for readability
-    plt.xticks(rotation=45)
-
-    # Save the plot as a PNG file
-    plt.tight_layout()  # Adjust layout to avoid clipping
-    #plt.savefig(f'{column_name}_plot.png', format='png')
-
-    # Save the plot to a BytesIO object
-    image_buffer = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(image_buffer, format='png')  # Save as PNG
-    image_buffer.seek(0)  # Reset buffer position
-
-    # Generate image
-    image_name = f"{column_name}_plot.png"
-
-    # Upload the image to S3
-    uploaded_url = upload_image_to_s3(
-        image_content=image_buffer.getvalue(),  # Get binary content
-        filename=image_name,
-        folder=f"plots/{folder_name}",  # Optional folder name
-        content_type="image/png"
-    )
-
-    print(f"Uploaded Image URL: {uploaded_url}")
-
-def snowflake_agent_call(year_quarter_dict, query):
+def generate_sql(query, year_quarter_dict):
+    """Asks Gemini for the raw-data SQL query answering the question."""
     llm_query_response = generate_gemini_response("snowflake-agent",query,year_quarter_dict)
     print(llm_query_response)
 
     match = re.findall(r"(SELECT[\s\S]*?);", llm_query_response)
 
     # Store the queries in variables
-    raw_query = match[0] if len(match) >= 1 else None
+    return match[0] if len(match) >= 1 else None
 
-    print("\nRaw Data Query:")
-    print(raw_query)
+def snowflake_agent_call(year_quarter_dict, query):
+    # Known metric questions use a SQL template; repeated questions reuse cached SQL
+    raw_query, source = resolve_sql(query, year_quarter_dict, generate_sql)
 
-    #fetch_snowflake_df(agg_query)
-    df = fetch_snowflake_df(raw_query)
+    print(f"\nRaw Data Query ({source}):")
+    print(raw_query)
 
-    # Dynamically get columns other than 'DATE'
-    columns_to_plot = [col for col in df.columns if col.upper() not in ['DATE', "YEAR", "QUARTER"]]
-    print(columns_to_plot)
+    # Render every metric column in parallel (one line per ticker); a repeated query is served from the render cache
+    charts = render_query_charts(raw_query, fetch_snowflake_df, tickers=question_tickers(query))
+    print(list(charts))
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     folder_name = f"{timestamp}_visuals"
 
-    for col in columns_to_plot:
-        plot_graph(df, col, folder_name)
-
-    image_urls = fetch_images_from_s3_folder(f"plots/{folder_name}")
+    # Upload all charts concurrently; the upload returns their presigned URLs directly
+    image_urls = upload_images_to_s3(
+        [(f"{col}_plot.png", image_content) for col, image_content in charts.items()],
+        folder=f"plots/{folder_name}",
+        content_type="image/png"
+    )
     print(image_urls)
     return image_urls
 
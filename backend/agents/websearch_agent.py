@@ -1,14 +1,33 @@
 import requests
 import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from backend.llm_response import generate_gemini_response
+from backend.news_cache import NewsCache, NewsPrewarmer
+
+# Latencies kept for the percentiles reported by stats()
+LATENCY_WINDOW = 1000
+
+# The general feed shown with every report; always kept warm by the pre-warm scheduler
+GENERAL_QUERY = "NVIDIA"
+GENERAL_RECORDS = 18
+FINANCIAL_RECORDS = 30
 
 class NewsRetriever:
-    def __init__(self):
-        """Initialize the NewsRetriever with the API key."""
-        self.api_key = self._get_api_key()
+    def __init__(self, api_key: Optional[str] = None):
+        """
+        Initialize the NewsRetriever with the API key. One instance is meant to live for the
+        whole process: it keeps a pooled HTTP session to SerpApi and a small worker pool
+        for running several searches at once.
+        """
+        self.api_key = api_key or self._get_api_key()
         self.allowed_domains = [
             "nvidia.com", "investor.nvidia.com", "techcrunch.com", "theverge.com",
             "wired.com", "engadget.com", "arstechnica.com", "venturebeat.com",
@@ -18,7 +37,29 @@ class NewsRetriever:
             "guardian.com", "tomshardware.com", "anandtech.com", "extremetech.com",
             "pcgamer.com"
         ]
-        self.SERPAPI_URL = "https://serpapi.com/search"
+        # SERPAPI_URL points the retriever at another server, e.g. benchmarks/fake_serpapi.py
+        self.SERPAPI_URL = os.getenv("SERPAPI_URL", "https://serpapi.com/search")
+        self.cache = NewsCache()
+
+        # (connect, read) timeouts in seconds
+        self.timeout = (float(os.getenv("NEWS_CONNECT_TIMEOUT", "3")), float(os.getenv("NEWS_READ_TIMEOUT", "10")))
+        workers = int(os.getenv("NEWS_FETCH_WORKERS", "4"))
+        self.session = requests.Session()
+        # Keep-alive connections reused across searches; transient failures are retried with backoff
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=workers,
+            max_retries=Retry(total=int(os.getenv("NEWS_MAX_RETRIES", "2")), backoff_factor=0.5,
+                              status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="news-fetch")
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.errors = 0
     
     def _get_api_key(self) -> str:
         """Load the SerpApi API key from environment variables."""
@@ -114,22 +155,10 @@ class NewsRetriever:
         
         return markdown_content
     
-    def fetch_news(
-        self, 
-        query: str,
-        records: int
-    ) -> List[Dict[str, Any]]:
+    def search(self, query: str, records: int) -> List[Dict[str, Any]]:
         """
-        Fetch news articles based on the query and filtering options.
-        
-        Args:
-            query: The search query string
-            filter_by_domains: Whether to filter results by allowed domains
-            num_results: Maximum number of results to return
-            time_period_days: Number of days to look back for articles
-            
-        Returns:
-            List of filtered news articles
+        Runs one SerpApi news search and filters the results. Raises on HTTP and
+        response-parsing errors.
         """
         # Define parameters for the search query
         params = {
@@ -140,34 +169,59 @@ class NewsRetriever:
             "num": records # Request more to account for filtering
         }
         
+        start = time.perf_counter()
+        failed = True
         try:
-            # Make the request to SerpApi
-            response = requests.get(self.SERPAPI_URL, params=params)
+            # Make the request to SerpApi over the pooled session
+            response = self.session.get(self.SERPAPI_URL, params=params, timeout=self.timeout)
             response.raise_for_status()  # Raise exception for HTTP errors
             data = response.json()
+            failed = False
+        finally:
+            latency = time.perf_counter() - start
+            self._record(latency, failed)
+            print(f"News search for '{query}' took {latency * 1000:.0f} ms")
             
-            # Check if the response contains news articles
-            if "news_results" not in data:
-                print("No news results found for query: %s", query)
-                return []
-                
-            articles = data["news_results"]
+        # Check if the response contains news articles
+        if "news_results" not in data:
+            print("No news results found for query: %s", query)
+            return []
             
-            # Apply domain filtering if requested
-            articles = self._filter_by_domains(articles)
-                
-            # Apply date filtering
-            if query != "NVIDIA":
-                articles = self._filter_by_date(articles, days=90)
-                
-                # Sort articles by date (newest first)
-                articles = self._sort_articles_by_date(articles)
+        articles = data["news_results"]
+        
+        # Apply domain filtering if requested
+        articles = self._filter_by_domains(articles)
+            
+        # Apply date filtering
+        if query != GENERAL_QUERY:
+            articles = self._filter_by_date(articles, days=90)
+            
+            # Sort articles by date (newest first)
+            articles = self._sort_articles_by_date(articles)
 
-                return articles[:5]
-                
-            # Return the requested number of articles
             return articles[:5]
             
+        # Return the requested number of articles
+        return articles[:5]
+
+    def fetch_news(
+        self, 
+        query: str,
+        records: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch news articles based on the query and filtering options, served from the
+        news cache when possible.
+        
+        Args:
+            query: The search query string
+            records: Number of results to request before filtering
+            
+        Returns:
+            List of filtered news articles
+        """
+        try:
+            return self.cache.get(query, records, self.search)
         except requests.exceptions.RequestException as e:
             print("Error fetching news: %s", e)
             return []
@@ -175,20 +229,90 @@ class NewsRetriever:
             print("Error parsing response: %s", e)
             return []
 
+    def fetch_news_batch(self, searches: List[Tuple[str, int]]) -> List[List[Dict[str, Any]]]:
+        """
+        Runs several (query, records) searches concurrently and returns their articles in
+        the same order, so the batch costs about one round-trip of wall time.
+        """
+        futures = [self._executor.submit(self.fetch_news, query, records) for query, records in searches]
+        return [future.result() for future in futures]
+
+    def _record(self, latency: float, failed: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            self.errors += failed
+            self._latencies.append(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        """Call counts and SerpApi latency percentiles (ms) over the last LATENCY_WINDOW calls."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            calls, errors = self.calls, self.errors
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+
+        return {"calls": calls, "errors": errors, "p50_ms": percentile(0.5), "p95_ms": percentile(0.95),
+                "max_ms": round(latencies[-1] * 1000, 1) if latencies else None}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+_news_retriever = None
+_news_retriever_lock = threading.Lock()
+_news_prewarmer = None
+
+def get_news_retriever() -> NewsRetriever:
+    """The shared NewsRetriever, created on first use."""
+    global _news_retriever
+    if _news_retriever is None:
+        with _news_retriever_lock:
+            if _news_retriever is None:
+                _news_retriever = NewsRetriever()
+    return _news_retriever
+
+def news_retriever_stats() -> Dict[str, Any]:
+    if _news_retriever is None:
+        return {"calls": 0}
+    return {**_news_retriever.stats(), "cache": _news_retriever.cache.stats()}
+
+def start_news_prewarm() -> None:
+    """Starts the background refresh of the general feed and popular searches (NEWS_PREWARM_ENABLED=false disables it)."""
+    global _news_prewarmer
+    if os.getenv("NEWS_PREWARM_ENABLED", "true").lower() == "false" or _news_prewarmer is not None:
+        return
+    try:
+        retriever = get_news_retriever()
+    except ValueError as e:
+        print(f"News pre-warm disabled: {e}")
+        return
+    _news_prewarmer = NewsPrewarmer(retriever.cache, retriever.search, [(GENERAL_QUERY, GENERAL_RECORDS)])
+    _news_prewarmer.start()
+
+def close_news_retriever() -> None:
+    global _news_retriever, _news_prewarmer
+    if _news_prewarmer is not None:
+        _news_prewarmer.stop()
+        _news_prewarmer = None
+    with _news_retriever_lock:
+        if _news_retriever is not None:
+            _news_retriever.close()
+            _news_retriever = None
+
 def news_agent(financial_query: str):
     """Main function to run the news retrieval and return results in markdown format."""
-    news_retriever = NewsRetriever()
+    news_retriever = get_news_retriever()
     final_query = f"News on NVIDIA: {financial_query}"
     print(final_query)
-    # Get top 5 financial news for NVIDIA
-    financial_articles = news_retriever.fetch_news(final_query, 30)
+    # Top 5 financial news for NVIDIA and the latest NVIDIA news from trusted sources, fetched concurrently
+    financial_articles, general_articles = news_retriever.fetch_news_batch(
+        [(final_query, FINANCIAL_RECORDS), (GENERAL_QUERY, GENERAL_RECORDS)]
+    )
     print(financial_articles)
     # financial_news_markdown = "## TOP 5 NVIDIA FINANCIAL NEWS BASED ON QUERY \n\n"
     financial_news_markdown = news_retriever.display_articles(financial_articles)
 
-    # Get latest NVIDIA news from trusted sources
-    general_query = "NVIDIA"
-    general_articles = news_retriever.fetch_news(general_query, 18)
     general_news_markdown = "## LATEST NVIDIA GENERAL NEWS \n\n"
     general_news_markdown += news_retriever.display_articles(general_articles)
 
@@ -0,0 +1,247 @@
+import io
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+# Figures are built with the object-oriented API on the Agg canvas, never through pyplot,
+# so renders share no global state and are safe to run in worker threads or processes
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+DEFAULT_STYLE = {"figsize": (10, 6), "dpi": 100, "color": "blue"}
+
+# Columns that are plotted against, not plotted themselves
+NON_PLOT_COLUMNS = ("TICKER", "DATE", "YEAR", "QUARTER")
+
+_render_executor = None
+_render_executor_lock = threading.Lock()
+
+
+def get_render_executor():
+    """
+    The shared render pool, created on first use. Rendering is CPU-bound Python, so the
+    default is a process pool (spawned, never forked from the server's threads);
+    CHART_RENDER_EXECUTOR=thread keeps rendering in-process.
+    """
+    global _render_executor
+    if _render_executor is None:
+        with _render_executor_lock:
+            if _render_executor is None:
+                workers = int(os.getenv("CHART_RENDER_WORKERS", "4"))
+                if os.getenv("CHART_RENDER_EXECUTOR", "process") == "thread":
+                    _render_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chart-render")
+                else:
+                    _render_executor = ProcessPoolExecutor(max_workers=workers,
+                                                           mp_context=multiprocessing.get_context("spawn"))
+    return _render_executor
+
+
+def reset_render_executor(broken):
+    """Drops a render pool that can no longer run work (a worker died), so the next call gets a new one."""
+    global _render_executor
+    with _render_executor_lock:
+        if _render_executor is broken:
+            _render_executor = None
+    broken.shutdown(wait=False)
+
+
+def submit_render(series, column, style):
+    """
+    Submits a chart to the render pool, replacing the pool once if it is broken.
+    Returns (executor, future).
+    """
+    executor = get_render_executor()
+    try:
+        return executor, executor.submit(render_chart, series, column, style)
+    except BrokenProcessPool:
+        logging.warning("The chart render pool is broken; starting a new one.")
+        reset_render_executor(executor)
+        executor = get_render_executor()
+        return executor, executor.submit(render_chart, series, column, style)
+
+
+def sql_hash(sql, tickers=()):
+    """Hash of the SQL text (ignoring case, whitespace and a trailing semicolon) and the tickers it is charted for."""
+    key = " ".join(sql.strip().rstrip(";").lower().split()) + "|" + ",".join(sorted(tickers))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def style_key(style):
+    return tuple(sorted(style.items()))
+
+
+def render_chart(series, column_name, style=None):
+    """
+    Renders one column over time as PNG bytes. `series` is a list of (label, dates, values),
+    one line per ticker; a single series is drawn in the style's color.
+    """
+    style = {**DEFAULT_STYLE, **(style or {})}
+    fig = Figure(figsize=style["figsize"], dpi=style["dpi"])
+    FigureCanvasAgg(fig)
+    try:
+        ax = fig.add_subplot()
+        if len(series) == 1:
+            _, dates, values = series[0]
+            ax.plot(dates, values, label=column_name, color=style["color"])
+        else:
+            for label, dates, values in series:
+                ax.plot(dates, values, label=label)
+
+        # Set title and labels
+        ax.set_title(f'Plot of {column_name} over Time')
+        ax.set_xlabel('Date')
+        ax.set_ylabel(column_name)
+        ax.legend(title=column_name)
+
+        # Rotate x-axis labels for readability
+        ax.tick_params(axis="x", labelrotation=45)
+        fig.tight_layout()  # Adjust layout to avoid clipping
+
+        image_buffer = io.BytesIO()
+        fig.savefig(image_buffer, format='png')
+        return image_buffer.getvalue()
+    finally:
+        # Release the figure's artists and canvas right away
+        fig.clear()
+
+
+class RenderCache:
+    """
+    LRU cache of rendered charts keyed by (SQL hash, column, style).
+
+    It also remembers which columns each (SQL hash, style) produced, so a repeated query
+    can be answered entirely from the cache without running it. Entries expire after
+    `ttl` seconds (the underlying table is refreshed daily); the least recently used
+    images are evicted past `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=None, ttl=None):
+        self.max_bytes = max_bytes or int(os.getenv("RENDER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.ttl = ttl if ttl is not None else float(os.getenv("RENDER_CACHE_TTL", "3600"))
+        self._lock = threading.Lock()
+        self._images = OrderedDict()  # (sql hash, column, style) -> (png bytes, created_at)
+        self._queries = {}  # (sql hash, style) -> columns
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        entry = self._images.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[1] > self.ttl:
+            self._bytes -= len(self._images.pop(key)[0])
+            return None
+        self._images.move_to_end(key)
+        return entry[0]
+
+    def get(self, query_hash, column, style):
+        with self._lock:
+            image = self._get((query_hash, column, style_key(style)))
+            if image is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return image
+
+    def get_query(self, query_hash, style):
+        """Returns {column: png bytes} if every chart of the query is cached, else None."""
+        with self._lock:
+            columns = self._queries.get((query_hash, style_key(style)))
+            if columns is None:
+                return None
+            images = {}
+            for column in columns:
+                image = self._get((query_hash, column, style_key(style)))
+                if image is None:
+                    return None
+                images[column] = image
+            self.hits += len(images)
+            return images
+
+    def put(self, query_hash, column, style, image):
+        key = (query_hash, column, style_key(style))
+        with self._lock:
+            previous = self._images.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0])
+            self._images[key] = (image, time.time())
+            self._bytes += len(image)
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                self._bytes -= len(self._images.popitem(last=False)[1][0])
+
+    def put_query(self, query_hash, style, columns):
+        with self._lock:
+            self._queries[(query_hash, style_key(style))] = list(columns)
+
+    def stats(self):
+        with self._lock:
+            return {"images": len(self._images), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+def chart_series(df, column):
+    """(label, dates, values) to plot for a column: one per ticker when the result holds several."""
+    if "TICKER" in df.columns and df["TICKER"].nunique() > 1:
+        return [(ticker, rows["DATE"], rows[column]) for ticker, rows in df.groupby("TICKER", sort=True)]
+    return [(column, df["DATE"], df[column])]
+
+
+def render_charts(df, sql, style=None, cache=None, tickers=()):
+    """
+    Renders every plottable column of a query result in parallel, reusing cached images.
+    `tickers` are the tickers the query was asked for (part of the cache key).
+    Returns {column: png bytes} in column order.
+    """
+    cache = cache or render_cache
+    style = {**DEFAULT_STYLE, **(style or {})}
+    query_hash = sql_hash(sql, tickers)
+    columns = [col for col in df.columns if col.upper() not in NON_PLOT_COLUMNS]
+
+    images, futures = {}, {}
+    for column in columns:
+        image = cache.get(query_hash, column, style)
+        if image is not None:
+            images[column] = image
+            continue
+        print(f"Plotting graphs for column: {column}")
+        try:
+            futures[column] = submit_render(chart_series(df, column), column, style)
+        except Exception as e:
+            logging.error(f"Rendering the chart for {column} failed: {e}")
+    for column, (executor, future) in futures.items():
+        try:
+            try:
+                images[column] = future.result()
+            except BrokenProcessPool:
+                # A worker died mid-render (out of memory, crash in Agg): replace the pool and render here
+                logging.warning(f"A chart render worker died; rendering {column} in-process.")
+                reset_render_executor(executor)
+                images[column] = render_chart(chart_series(df, column), column, style)
+            cache.put(query_hash, column, style, images[column])
+        except Exception as e:
+            logging.error(f"Rendering the chart for {column} failed: {e}")
+    if len(images) == len(columns):
+        cache.put_query(query_hash, style, columns)
+    return {column: images[column] for column in columns if column in images}
+
+
+def render_query_charts(sql, fetch_df, style=None, cache=None, tickers=()):
+    """
+    Returns the charts of a query, {column: png bytes}. A query whose charts are all
+    cached is not run again; otherwise `fetch_df(sql)` is called and its result rendered.
+    """
+    cache = cache or render_cache
+    cached = cache.get_query(sql_hash(sql, tickers), {**DEFAULT_STYLE, **(style or {})})
+    if cached is not None:
+        print(f"Serving {len(cached)} cached charts.")
+        return cached
+    return render_charts(fetch_df(sql), sql, style, cache, tickers)
+
+
+# Shared instance used by the snowflake agent
+render_cache = RenderCache()
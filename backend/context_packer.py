@@ -0,0 +1,132 @@
+import os
+import re
+import logging
+import threading
+
+# Gemini has no local tokenizer; cl100k_base is close enough for budgeting
+TOKEN_ENCODING = "cl100k_base"
+# Used when tiktoken cannot load its encoding (e.g. offline on first run)
+CHARS_PER_TOKEN = 4
+SHINGLE_SIZE = 3
+WORD_PATTERN = re.compile(r"\w+")
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Loads the tiktoken encoding once; returns None if it is unavailable."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+                except Exception as e:
+                    logging.warning(f"tiktoken unavailable ({e}); estimating tokens from characters.")
+                    _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts text to at most `max_tokens` tokens."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def _shingles(text):
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def format_match(match):
+    metadata = match["metadata"]
+    return f"Year: {metadata['year']}, Quarter: {metadata['quarter']} - {metadata['text']}"
+
+
+def pack_context(matches, token_budget=None, dedup_threshold=None):
+    """
+    Builds the Gemini context from retrieved matches within a token budget.
+
+    Matches are taken in descending score order. A chunk is dropped when at least
+    `dedup_threshold` of its word 3-grams already appear in a higher-scored kept chunk
+    (repeated boilerplate, overlapping sections). Each (year, quarter) is first given an
+    equal share of the budget; budget a quarter leaves unused is then filled with the
+    best remaining chunks of any quarter. A quarter whose best chunk exceeds its share
+    gets that chunk truncated, so every quarter is represented.
+
+    Returns (context, stats).
+    """
+    token_budget = token_budget or int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+    dedup_threshold = dedup_threshold if dedup_threshold is not None else float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+
+    ranked = sorted(matches, key=lambda match: match["score"], reverse=True)
+    entries = [format_match(match) for match in ranked]
+    original_tokens = count_tokens("\n".join(entries))
+
+    # Drop near-duplicates, keeping the higher-scored copy
+    unique, kept_shingles = [], []
+    for match, entry in zip(ranked, entries):
+        shingles = _shingles(match["metadata"]["text"])
+        if any(len(shingles & other) >= dedup_threshold * len(shingles) for other in kept_shingles):
+            continue
+        kept_shingles.append(shingles)
+        unique.append((match, entry, count_tokens(entry)))
+
+    quarters = []
+    for match, _, _ in unique:
+        quarter = (str(match["metadata"]["year"]), str(match["metadata"]["quarter"]))
+        if quarter not in quarters:
+            quarters.append(quarter)
+    share = token_budget // max(len(quarters), 1)
+
+    selected = {}  # position in `unique` -> entry text
+    used = 0
+    # First pass: each quarter fills its own share with its best chunks
+    for quarter in quarters:
+        quarter_used = 0
+        for position, (match, entry, tokens) in enumerate(unique):
+            if (str(match["metadata"]["year"]), str(match["metadata"]["quarter"])) != quarter:
+                continue
+            if quarter_used + tokens <= share:
+                selected[position] = entry
+                quarter_used += tokens
+            elif quarter_used == 0 and share > 0:
+                selected[position] = truncate_to_tokens(entry, share)
+                quarter_used = share
+        used += quarter_used
+
+    # Second pass: spend the leftover budget on the best chunks not yet selected
+    for position, (match, entry, tokens) in enumerate(unique):
+        if position not in selected and used + tokens <= token_budget:
+            selected[position] = entry
+            used += tokens
+
+    context = "\n".join(selected[position] for position in sorted(selected))
+    packed_tokens = count_tokens(context)
+    stats = {
+        "matches": len(matches),
+        "duplicates_dropped": len(ranked) - len(unique),
+        "chunks_packed": len(selected),
+        "original_tokens": original_tokens,
+        "packed_tokens": packed_tokens,
+        "tokens_saved": original_tokens - packed_tokens,
+    }
+    logging.info(
+        f"Packed {stats['chunks_packed']}/{stats['matches']} chunks into {packed_tokens} tokens "
+        f"(budget {token_budget}); saved {stats['tokens_saved']} tokens, "
+        f"{stats['duplicates_dropped']} near-duplicates dropped."
+    )
+    return context, stats
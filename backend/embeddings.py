@@ -0,0 +1,164 @@
+import os
+import logging
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
+load_dotenv(dotenv_path)
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_DIMENSION = 384
+MAX_SEQ_LENGTH = 256  # Same truncation as the SentenceTransformer model card
+
+DEFAULT_ONNX_MODEL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models", "all-MiniLM-L6-v2-onnx"))
+
+
+class SentenceTransformerBackend:
+    """Reference encoder: the full PyTorch SentenceTransformer stack."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name=MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dimension = EMBEDDING_DIMENSION
+
+    def encode(self, texts, batch_size=32):
+        """Returns an (n, 384) float32 array of L2-normalized embeddings."""
+        embeddings = self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+class OnnxEmbeddingBackend:
+    """
+    CPU encoder running an exported (optionally int8-quantized) ONNX graph of
+    all-MiniLM-L6-v2 with ONNX Runtime. Reproduces the SentenceTransformer
+    pipeline (mean pooling over the attention mask + L2 normalization), so the
+    vectors stay compatible with the existing Pinecone index.
+
+    The model directory must contain the `.onnx` file and `tokenizer.json`;
+    nothing is downloaded at startup. Create it with `export_onnx_model`.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_dir=None, model_file=None, num_threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = model_dir or os.getenv("EMBEDDING_MODEL_PATH", DEFAULT_ONNX_MODEL_DIR)
+        model_file = model_file or os.getenv("EMBEDDING_ONNX_FILE", "model_quantized.onnx")
+        model_path = os.path.join(self.model_dir, model_file)
+        tokenizer_path = os.path.join(self.model_dir, "tokenizer.json")
+        if not os.path.exists(model_path) or not os.path.exists(tokenizer_path):
+            raise FileNotFoundError(
+                f"ONNX embedding artifact not found in '{self.model_dir}'. "
+                "Run `python -m backend.embeddings export` to create it."
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        num_threads = num_threads or int(os.getenv("EMBEDDING_NUM_THREADS", "0"))
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+        self.dimension = EMBEDDING_DIMENSION
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalization
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled = summed / counts
+        norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return (pooled / norms).astype(np.float32)
+
+    def encode(self, texts, batch_size=32):
+        """Returns an (n, 384) float32 array of L2-normalized embeddings."""
+        if isinstance(texts, str):
+            texts = [texts]
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        batches = [self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        return np.concatenate(batches, axis=0)
+
+
+EMBEDDING_BACKENDS = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    OnnxEmbeddingBackend.name: OnnxEmbeddingBackend,
+}
+
+
+def get_embedding_backend(name=None):
+    """Instantiates the embedding backend selected by `name` or the EMBEDDING_BACKEND env var."""
+    name = name or os.getenv("EMBEDDING_BACKEND", SentenceTransformerBackend.name)
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}'. Choose one of: {', '.join(EMBEDDING_BACKENDS)}")
+    backend = EMBEDDING_BACKENDS[name]()
+    logging.info(f"Embedding backend '{name}' loaded.")
+    return backend
+
+
+def export_onnx_model(output_dir=DEFAULT_ONNX_MODEL_DIR, quantize=True):
+    """
+    Exports all-MiniLM-L6-v2 to ONNX (and an int8 dynamically-quantized copy) together
+    with its tokenizer, so the ONNX backend can load from disk without network access.
+    Requires torch and transformers, which are only needed for the export itself.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModel.from_pretrained(MODEL_NAME)
+    model.eval()
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["NVIDIA data center revenue"], return_tensors="pt")
+    model_path = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            model_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "token_type_ids": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=14,
+        )
+    print(f"Exported ONNX model to {model_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantized_path = os.path.join(output_dir, "model_quantized.onnx")
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        print(f"Quantized ONNX model saved to {quantized_path}")
+    return output_dir
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        export_onnx_model(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_ONNX_MODEL_DIR)
+    else:
+        print("Usage: python -m backend.embeddings export [output_dir]")
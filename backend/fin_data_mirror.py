@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import logging
+import argparse
+import shutil
+import threading
+import duckdb
+from backend.snowflake_pool import snowflake_pool
+from backend.fin_data_targets import COLUMN_NAMES, canonical_columns
+from backend.fin_data_parquet import PARQUET_PREFIX, write_partitions, local_output
+
+DEFAULT_MIRROR_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "mirror"))
+TABLE_NAME = "NVIDIA_FIN_DATA"
+
+# "snowflake" (default) runs the agent's SQL in Snowflake; "local" runs it against the mirror
+FIN_DATA_SOURCES = ("snowflake", "local")
+
+_local = threading.local()
+
+
+def mirror_dir():
+    return os.getenv("FIN_DATA_MIRROR_PATH", DEFAULT_MIRROR_PATH)
+
+
+def mirror_dataset():
+    """
+    Directory of the mirror's versions. Each sync writes a new version directory of Parquet
+    partitioned by Year/Quarter (the same layout as in S3); sync.json names the current one.
+    """
+    return os.path.join(mirror_dir(), TABLE_NAME.lower())
+
+
+def _sync_file():
+    return os.path.join(mirror_dir(), "sync.json")
+
+
+def _read_sync():
+    with open(_sync_file(), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _version_dir(sync):
+    # Mirrors synced before versioning keep their partitions directly in mirror_dataset()
+    version = sync.get("version")
+    return os.path.join(mirror_dataset(), version) if version else mirror_dataset()
+
+
+def fin_data_source():
+    source = os.getenv("FIN_DATA_SOURCE", "snowflake")
+    if source not in FIN_DATA_SOURCES:
+        raise ValueError(f"Unknown FIN_DATA_SOURCE '{source}'. Choose 'snowflake' or 'local'.")
+    return source
+
+
+def _replace_dataset(fill, source):
+    """
+    Builds a new version of the mirror with `fill(directory)`, which returns (rows,
+    partitions) written, then switches to it by atomically replacing sync.json, so
+    readers always see a complete version. The version it replaced is kept until the
+    next sync for queries still reading it; older ones are deleted.
+    """
+    root = mirror_dataset()
+    previous = _read_sync().get("version") if os.path.exists(_sync_file()) else None
+    version = f"v{time.time_ns()}"
+    dataset = os.path.join(root, version)
+    os.makedirs(dataset)
+    try:
+        rows, partitions = fill(dataset)
+    except Exception:
+        shutil.rmtree(dataset, ignore_errors=True)
+        raise
+    staging = _sync_file() + ".tmp"
+    with open(staging, "w", encoding="utf-8") as f:
+        json.dump({"rows": rows, "partitions": partitions, "source": source, "synced_at": time.time(),
+                   "version": version}, f)
+    os.replace(staging, _sync_file())
+    for name in os.listdir(root):
+        if name not in (version, previous):
+            path = os.path.join(root, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+    logging.info(f"Mirrored {rows} rows of {TABLE_NAME} ({partitions} partitions) from {source} to {dataset}.")
+    return rows
+
+
+def write_mirror(df, source):
+    """Replaces the mirror with `df`, written as Parquet partitioned by Year/Quarter."""
+    df = canonical_columns(df)
+    if "Year" not in df.columns:
+        df["Year"] = df["Date"].dt.year
+        df["Quarter"] = df["Date"].dt.quarter
+    return _replace_dataset(lambda root: (len(df), len(write_partitions(df, local_output(root)))), source)
+
+
+def sync_from_snowflake():
+    """Copies NVIDIA_FIN_DATA from Snowflake (the system of record) into the local mirror."""
+    with snowflake_pool.connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(f"SELECT * FROM {TABLE_NAME} ORDER BY DATE")
+            df = cur.fetch_pandas_all()
+        finally:
+            cur.close()
+    return write_mirror(df, "snowflake")
+
+
+def sync_from_s3():
+    """Downloads the partitioned Parquet files the Snowflake pipeline uploads to S3."""
+    from backend import s3_utils
+    import pyarrow.parquet as pq
+
+    def fill(root):
+        rows = partitions = 0
+        for obj in s3_utils.iter_s3_objects(PARQUET_PREFIX, suffixes=(".parquet",)):
+            path = os.path.join(root, os.path.relpath(obj["key"], PARQUET_PREFIX))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            s3_utils.s3_client.download_file(s3_utils.bucket_name, obj["key"], path)
+            rows += pq.ParquetFile(path).metadata.num_rows
+            partitions += 1
+        return rows, partitions
+
+    return _replace_dataset(fill, "s3")
+
+
+def sync_from_report(ticker="NVDA", period="5y"):
+    """Builds the mirror from the same yfinance report the Snowflake pipeline loads."""
+    from backend.snowflake_pipeline import create_daily_historical_report
+    df = create_daily_historical_report(ticker, period)
+    if df is None:
+        raise RuntimeError("Creating the daily historical report failed.")
+    df["Year"] = df["Date"].dt.year
+    df["Quarter"] = df["Date"].dt.quarter
+    # Snowflake stores Date as TIMESTAMP_NTZ
+    df["Date"] = df["Date"].dt.tz_localize(None)
+    return write_mirror(df, "report")
+
+
+def _connection():
+    """
+    Per-thread in-memory DuckDB connection exposing the current version of the mirror as
+    the NVIDIA_FIN_DATA view (reopened after a sync). Year and Quarter come from the
+    partition directories, so filters on them only read the matching files.
+    """
+    sync_file = _sync_file()
+    if not os.path.exists(sync_file):
+        raise FileNotFoundError(f"No local mirror at {mirror_dataset()}; run `python -m backend.fin_data_mirror sync` first.")
+    mtime = os.path.getmtime(sync_file)
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.mtime != mtime:
+        if conn is not None:
+            conn.close()
+        dataset = _version_dir(_read_sync())
+        conn = duckdb.connect()
+        pattern = os.path.join(dataset, "*", "*", "*.parquet").replace("'", "''")
+        conn.execute(f"CREATE VIEW {TABLE_NAME} AS SELECT {', '.join(COLUMN_NAMES)} "
+                     f"FROM read_parquet('{pattern}', hive_partitioning = true)")
+        _local.conn, _local.mtime = conn, mtime
+    return conn
+
+
+def query_mirror(query):
+    """Runs the agent's SQL against the local mirror and returns a DataFrame with Snowflake-style column names."""
+    df = _connection().execute(query.strip().rstrip(";")).df()
+    return df.rename(columns=str.upper)
+
+
+def iter_mirror_batches(query, batch_rows=None):
+    """Streams the result of the agent's SQL from the local mirror as DataFrames of up to `batch_rows` rows."""
+    batch_rows = batch_rows or int(os.getenv("FIN_DATA_BATCH_ROWS", "100000"))
+    reader = _connection().execute(query.strip().rstrip(";")).fetch_record_batch(batch_rows)
+    for batch in reader:
+        yield batch.to_pandas().rename(columns=str.upper)
+
+
+def mirror_status():
+    if not os.path.exists(_sync_file()):
+        return {"source": fin_data_source(), "synced": False}
+    sync = _read_sync()
+    return {
+        "source": fin_data_source(),
+        "synced": True,
+        "rows": sync["rows"],
+        "partitions": sync.get("partitions"),
+        "synced_from": sync["source"],
+        "version": sync.get("version"),
+        "age_seconds": round(time.time() - sync["synced_at"], 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"Mirror {TABLE_NAME} into local partitioned Parquet queried with DuckDB.")
+    parser.add_argument("command", choices=["sync", "status"])
+    parser.add_argument("--from-report", action="store_true",
+                        help="Build the mirror from the yfinance report instead of Snowflake (no Snowflake access needed).")
+    parser.add_argument("--from-s3", action="store_true",
+                        help="Download the partitioned Parquet files loaded into Snowflake instead of querying Snowflake.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if args.command == "sync":
+        if args.from_report:
+            rows = sync_from_report()
+        elif args.from_s3:
+            rows = sync_from_s3()
+        else:
+            rows = sync_from_snowflake()
+        print(f"Synced {rows} rows to {_version_dir(_read_sync())}")
+    else:
+        print(json.dumps(mirror_status(), indent=2))
@@ -0,0 +1,62 @@
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+from backend.fin_data_targets import TABLE_COLUMNS
+
+# S3 prefix of the partitioned dataset loaded into NVIDIA_FIN_DATA
+PARQUET_PREFIX = "parquet/nvidia_fin_data"
+PARQUET_COMPRESSIONS = ("zstd", "snappy")
+PARTITION_COLUMNS = ("Year", "Quarter")
+
+ARROW_TYPES = {"STRING": pa.string(), "TIMESTAMP": pa.timestamp("us"), "FLOAT": pa.float64(), "BIGINT": pa.int64()}
+# Year and Quarter live only in the hive-style path (Year=2024/Quarter=1/...), not inside
+# the files, so readers filtering on them can skip whole partitions
+FILE_SCHEMA = pa.schema([(name, ARROW_TYPES[sql_type]) for name, sql_type in TABLE_COLUMNS
+                         if name not in PARTITION_COLUMNS])
+
+
+def parquet_compression():
+    compression = os.getenv("FIN_DATA_PARQUET_COMPRESSION", "zstd").lower()
+    if compression not in PARQUET_COMPRESSIONS:
+        raise ValueError(f"Unknown FIN_DATA_PARQUET_COMPRESSION '{compression}'. Choose 'zstd' or 'snappy'.")
+    return compression
+
+
+def partition_path(year, quarter):
+    return f"Year={int(year)}/Quarter={int(quarter)}/data.parquet"
+
+
+def write_partitions(df, open_output, row_group_rows=None):
+    """
+    Writes NVIDIA_FIN_DATA rows as one Parquet file per Year/Quarter.
+
+    Each partition is converted to Arrow and written on its own through `open_output(path)`,
+    which returns a binary sink used as a context manager (a local file or an
+    S3UploadStream), so the whole table is never serialized in memory at once.
+    Returns the relative paths written.
+    """
+    row_group_rows = row_group_rows or int(os.getenv("FIN_DATA_PARQUET_ROW_GROUP_ROWS", "100000"))
+    compression = parquet_compression()
+    paths = []
+    for (year, quarter), partition in df.groupby(list(PARTITION_COLUMNS), sort=True):
+        partition = partition.sort_values(["Ticker", "Date"])
+        if partition["Date"].dt.tz is not None:
+            # Stored as TIMESTAMP_NTZ: keep the exchange-local trading date
+            partition = partition.assign(Date=partition["Date"].dt.tz_localize(None))
+        path = partition_path(year, quarter)
+        with open_output(path) as sink:
+            with pq.ParquetWriter(sink, FILE_SCHEMA, compression=compression) as writer:
+                for start in range(0, len(partition), row_group_rows):
+                    rows = partition.iloc[start:start + row_group_rows][FILE_SCHEMA.names]
+                    writer.write_table(pa.Table.from_pandas(rows, schema=FILE_SCHEMA, preserve_index=False))
+        paths.append(path)
+    return paths
+
+
+def local_output(root):
+    """`open_output` for write_partitions that writes under a local directory."""
+    def open_output(path):
+        full_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        return open(full_path, "wb")
+    return open_output
@@ -0,0 +1,140 @@
+import os
+import logging
+import duckdb
+from backend.snowflake_pool import snowflake_pool
+
+TABLE_NAME = "NVIDIA_FIN_DATA"
+STAGING_TABLE_NAME = "NVIDIA_FIN_DATA_STAGED"
+DEFAULT_DUCKDB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "nvidia_fin_data.duckdb"))
+
+# Column order of NVIDIA_FIN_DATA; rows are keyed by (Ticker, Date)
+TABLE_COLUMNS = [
+    ("Ticker", "STRING"),
+    ("Date", "TIMESTAMP"),
+    ("Open", "FLOAT"),
+    ("High", "FLOAT"),
+    ("Low", "FLOAT"),
+    ("Close", "FLOAT"),
+    ("Volume", "BIGINT"),
+    ("DailyChange", "FLOAT"),
+    ("DailyChangePercent", "FLOAT"),
+    ("DollarVolume", "FLOAT"),
+    ("MA10", "FLOAT"),
+    ("MA30", "FLOAT"),
+    ("Volatility20D", "FLOAT"),
+    ("RSI", "FLOAT"),
+    ("Year", "INT"),
+    ("Quarter", "INT"),
+]
+COLUMN_NAMES = [name for name, _ in TABLE_COLUMNS]
+KEY_COLUMNS = ("Ticker", "Date")
+# Snowflake's FLOAT is double precision; DuckDB's is single precision
+DUCKDB_TYPES = {"STRING": "VARCHAR", "FLOAT": "DOUBLE"}
+
+
+def canonical_columns(df):
+    """Maps upper-cased warehouse column names (DAILYCHANGE) back to the pipeline's names (DailyChange)."""
+    names = {name.upper(): name for name in COLUMN_NAMES}
+    return df.rename(columns=lambda column: names.get(column.upper(), column))
+
+
+class SnowflakeTarget:
+    """
+    NVIDIA_FIN_DATA in Snowflake. Rows are merged through a temporary staging table:
+    write_pandas stages the new rows as Parquet and copies them in, then one MERGE
+    upserts them by (Ticker, Date).
+    """
+
+    name = "snowflake"
+
+    def ensure_table(self):
+        columns = ",\n".join(f"{name} {sql_type}" for name, sql_type in TABLE_COLUMNS)
+        with snowflake_pool.connection() as conn:
+            conn.cursor().execute(f"CREATE TABLE IF NOT EXISTS {TABLE_NAME} (\n{columns}\n)")
+
+    def last_rows(self, ticker, count):
+        """The latest `count` stored rows for a ticker, oldest first."""
+        with snowflake_pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(f"SELECT * FROM {TABLE_NAME} WHERE TICKER = %s ORDER BY DATE DESC LIMIT %s", (ticker, count))
+                df = cur.fetch_pandas_all()
+            finally:
+                cur.close()
+        return canonical_columns(df).iloc[::-1].reset_index(drop=True)
+
+    def merge(self, df):
+        """Upserts rows by (Ticker, Date); returns the number of rows staged."""
+        from snowflake.connector.pandas_tools import write_pandas
+
+        df = df[COLUMN_NAMES]
+        updates = ", ".join(f"t.{name} = s.{name}" for name in COLUMN_NAMES if name not in KEY_COLUMNS)
+        columns = ", ".join(COLUMN_NAMES)
+        values = ", ".join(f"s.{name}" for name in COLUMN_NAMES)
+        with snowflake_pool.connection() as conn:
+            write_pandas(conn, df, STAGING_TABLE_NAME, auto_create_table=True, table_type="temporary",
+                         overwrite=True, quote_identifiers=False, use_logical_type=True)
+            cur = conn.cursor()
+            try:
+                cur.execute(f"""
+                    MERGE INTO {TABLE_NAME} t
+                    USING {STAGING_TABLE_NAME} s
+                    ON t.Ticker = s.Ticker AND t.Date = s.Date
+                    WHEN MATCHED THEN UPDATE SET {updates}
+                    WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ({values})
+                """)
+                cur.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE_NAME}")
+            finally:
+                cur.close()
+        logging.info(f"Merged {len(df)} rows into {TABLE_NAME} in Snowflake.")
+        return len(df)
+
+
+class DuckDBTarget:
+    """NVIDIA_FIN_DATA in a local DuckDB file, for tests and offline runs. Same schema and merge semantics."""
+
+    name = "duckdb"
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("FIN_DATA_DUCKDB_PATH", DEFAULT_DUCKDB_PATH)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def _connect(self):
+        return duckdb.connect(self.path)
+
+    def ensure_table(self):
+        columns = ", ".join(f"{name} {DUCKDB_TYPES.get(sql_type, sql_type)}" for name, sql_type in TABLE_COLUMNS)
+        with self._connect() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE_NAME} ({columns}, PRIMARY KEY ({', '.join(KEY_COLUMNS)}))")
+
+    def last_rows(self, ticker, count):
+        with self._connect() as conn:
+            df = conn.execute(f"SELECT * FROM {TABLE_NAME} WHERE Ticker = ? ORDER BY Date DESC LIMIT ?",
+                              [ticker, count]).df()
+        return canonical_columns(df).iloc[::-1].reset_index(drop=True)
+
+    def merge(self, df):
+        staged = df[COLUMN_NAMES]
+        with self._connect() as conn:
+            conn.register("staged", staged)
+            conn.execute(f"INSERT OR REPLACE INTO {TABLE_NAME} SELECT {', '.join(COLUMN_NAMES)} FROM staged")
+            conn.unregister("staged")
+        logging.info(f"Merged {len(staged)} rows into {TABLE_NAME} at {self.path}.")
+        return len(staged)
+
+    def read_all(self, ticker=None):
+        with self._connect() as conn:
+            if ticker is None:
+                df = conn.execute(f"SELECT * FROM {TABLE_NAME} ORDER BY Ticker, Date").df()
+            else:
+                df = conn.execute(f"SELECT * FROM {TABLE_NAME} WHERE Ticker = ? ORDER BY Date", [ticker]).df()
+        return canonical_columns(df)
+
+
+def get_target(name=None):
+    name = name or os.getenv("FIN_DATA_TARGET", SnowflakeTarget.name)
+    if name == SnowflakeTarget.name:
+        return SnowflakeTarget()
+    if name == DuckDBTarget.name:
+        return DuckDBTarget()
+    raise ValueError(f"Unknown target '{name}'. Choose 'snowflake' or 'duckdb'.")
@@ -0,0 +1,146 @@
+import logging
+import numpy as np
+import yfinance as yf
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from backend.fin_data_targets import COLUMN_NAMES
+
+# OHLCV fields of a panel, each a (dates x tickers) float64 array
+PANEL_FIELDS = ("Open", "High", "Low", "Close", "Volume")
+INDICATOR_COLUMNS = ("DailyChange", "DailyChangePercent", "DollarVolume", "MA10", "MA30", "Volatility20D", "RSI")
+
+
+def _rolling_sum(values, window):
+    """Trailing `window`-row sums down axis 0, treating NaN as missing (counted as 0)."""
+    cumsum = np.cumsum(np.where(np.isnan(values), 0.0, values), axis=0)
+    sums = cumsum.copy()
+    sums[window:] -= cumsum[:-window]
+    return sums
+
+
+def _rolling_mean(values, window):
+    """Same as pandas rolling(window, min_periods=1).mean() applied to every column."""
+    counts = _rolling_sum((~np.isnan(values)).astype(np.float64), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = _rolling_sum(values, window) / counts
+    means[counts == 0] = np.nan
+    return means
+
+
+def _rolling_std(values, window):
+    """Same as pandas rolling(window, min_periods=1).std() (ddof=1; NaN below two values)."""
+    padded = np.concatenate([np.full((window - 1,) + values.shape[1:], np.nan), values])
+    # (dates, tickers, window) view of the trailing windows; no copy is made
+    windows = sliding_window_view(padded, window, axis=0)
+    counts = np.sum(~np.isnan(windows), axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.nansum(windows, axis=-1) / counts
+        squares = np.nansum((windows - means[..., None]) ** 2, axis=-1)
+        std = np.sqrt(squares / (counts - 1))
+    std[counts < 2] = np.nan
+    return std
+
+
+def _gapped_tickers(valid):
+    """Columns whose history is not leading NaNs (not yet listed) followed by contiguous bars."""
+    started = np.maximum.accumulate(valid, axis=0)
+    return np.flatnonzero(np.any(started & ~valid, axis=0))
+
+
+def compute_panel_indicators(open_, close, volume, tickers=None):
+    """
+    Computes the NVIDIA_FIN_DATA indicators for every ticker at once from (dates x tickers)
+    arrays. Values match add_indicators() run on each ticker separately: rolling windows
+    start at each ticker's first bar, so tickers listed later may lead with NaN rows.
+    A ticker missing bars mid-history (a halted day, a gap in the download) is computed
+    over its own bars only, like add_indicators() would. Returns {indicator: (dates x
+    tickers) array}.
+    """
+    open_, close, volume = (np.ascontiguousarray(a, dtype=np.float64) for a in (open_, close, volume))
+    valid = ~np.isnan(close)
+    gapped = _gapped_tickers(valid)
+    if not gapped.size:
+        return _contiguous_panel_indicators(open_, close, volume, valid)
+
+    names = [tickers[j] if tickers is not None else str(j) for j in gapped]
+    logging.warning(f"Bars missing inside the history of {', '.join(names)}; computing their indicators separately.")
+    indicators = {name: np.full(close.shape, np.nan) for name in INDICATOR_COLUMNS}
+    contiguous = np.setdiff1d(np.arange(close.shape[1]), gapped)
+    if contiguous.size:
+        for name, values in _contiguous_panel_indicators(open_[:, contiguous], close[:, contiguous],
+                                                         volume[:, contiguous], valid[:, contiguous]).items():
+            indicators[name][:, contiguous] = values
+    for j in gapped:
+        # Drop the ticker's missing dates, so its windows span its own consecutive bars
+        rows = np.flatnonzero(valid[:, j])
+        columns = [np.ascontiguousarray(a[rows, j:j + 1]) for a in (open_, close, volume)]
+        for name, values in _contiguous_panel_indicators(*columns, np.ones((rows.size, 1), dtype=bool)).items():
+            indicators[name][rows, j] = values[:, 0]
+    return indicators
+
+
+def _contiguous_panel_indicators(open_, close, volume, valid):
+    """compute_panel_indicators() for a panel whose tickers all have contiguous histories."""
+
+    previous = np.vstack([np.full((1, close.shape[1]), np.nan), close[:-1]])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = close / previous - 1
+    delta = close - previous
+    # pct_change().fillna(0) and diff().fillna(0): a ticker's first bar has no change
+    returns = np.where(valid & np.isnan(returns), 0.0, returns)
+    delta = np.where(valid & np.isnan(delta), 0.0, delta)
+
+    up_mean = _rolling_mean(np.where(valid, np.maximum(delta, 0.0), np.nan), 14)
+    down_mean = _rolling_mean(np.where(valid, -np.minimum(delta, 0.0), np.nan), 14)
+    # Avoid division by zero
+    down_mean[down_mean == 0] = np.finfo(float).eps
+    rs = up_mean / down_mean
+
+    return {
+        "DailyChange": close - open_,
+        "DailyChangePercent": (close / open_ - 1) * 100,
+        "DollarVolume": volume * close,
+        "MA10": _rolling_mean(close, 10),
+        "MA30": _rolling_mean(close, 30),
+        "Volatility20D": _rolling_std(returns, 20) * (252 ** 0.5),
+        "RSI": 100 - (100 / (1 + rs)),
+    }
+
+
+def panel_to_frame(dates, tickers, fields, indicators):
+    """
+    Flattens a panel into NVIDIA_FIN_DATA rows (one per ticker and date with a bar),
+    ordered by Ticker then Date.
+    """
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    # Transposed to (tickers x dates) so the flattened rows come out grouped by ticker
+    valid = ~np.isnan(fields["Close"]).T
+    ticker_index, date_index = np.nonzero(valid)
+    row_dates = dates[date_index]
+    df = pd.DataFrame({"Ticker": np.asarray(tickers, dtype=object)[ticker_index], "Date": row_dates})
+    for name in PANEL_FIELDS:
+        df[name] = fields[name].T[valid]
+    df["Volume"] = df["Volume"].astype("int64")
+    for name in INDICATOR_COLUMNS:
+        df[name] = indicators[name].T[valid]
+    df["Year"] = row_dates.year
+    df["Quarter"] = row_dates.quarter
+    return df[COLUMN_NAMES]
+
+
+def fetch_panel(tickers, period="5y"):
+    """Downloads daily bars for all tickers in one request. Returns (dates, {field: (dates x tickers) array})."""
+    data = yf.download(list(tickers), period=period, auto_adjust=True, group_by="column", progress=False)
+    data = data.dropna(how="all")
+    fields = {name: np.ascontiguousarray(data[name][list(tickers)].to_numpy(dtype=np.float64))
+              for name in PANEL_FIELDS}
+    return data.index, fields
+
+
+def create_panel_report(tickers, period="5y"):
+    """NVIDIA_FIN_DATA rows with indicators for several tickers, computed in one vectorized pass."""
+    dates, fields = fetch_panel(tickers, period)
+    indicators = compute_panel_indicators(fields["Open"], fields["Close"], fields["Volume"], tickers)
+    return panel_to_frame(dates, tickers, fields, indicators)
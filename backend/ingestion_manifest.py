@@ -0,0 +1,85 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+DEFAULT_MANIFEST_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "ingestion_manifest.sqlite"))
+
+# Pipeline stages, in order: PDF -> markdown (OCR) -> chunks -> vectors
+STAGE_MARKDOWN = "markdown"
+STAGE_CHUNKS = "chunks"
+STAGE_VECTORS = "vectors"
+
+
+def content_hash(content):
+    """SHA-256 of str/bytes content, for inputs that do not come with an S3 ETag."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+class IngestionManifest:
+    """
+    Persistent record of which filings have completed which pipeline stage, and for
+    which version of their input.
+
+    Each row is keyed by (source key, stage) and stores the hash of the stage input
+    (the S3 ETag of the PDF or markdown object), so a stage only needs to run again
+    when its input changed. Rows are written as soon as a stage finishes for a filing,
+    so a crashed run resumes with the filings it had not completed yet.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("INGESTION_MANIFEST_PATH", DEFAULT_MANIFEST_PATH)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS stages (
+                source_key TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                input_hash TEXT NOT NULL,
+                output_ref TEXT,
+                detail TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (source_key, stage)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, source_key, stage):
+        """Returns the recorded stage row as a dict, or None if the stage never completed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT input_hash, output_ref, detail, updated_at FROM stages WHERE source_key = ? AND stage = ?",
+                (source_key, stage)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "input_hash": row[0],
+            "output_ref": row[1],
+            "detail": json.loads(row[2]) if row[2] else {},
+            "updated_at": row[3],
+        }
+
+    def is_current(self, source_key, stage, input_hash):
+        """True if the stage already completed for exactly this input."""
+        record = self.get(source_key, stage)
+        return record is not None and record["input_hash"] == input_hash
+
+    def record(self, source_key, stage, input_hash, output_ref=None, detail=None):
+        """Marks a stage as completed for the given input."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stages (source_key, stage, input_hash, output_ref, detail, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (source_key, stage, input_hash, output_ref, json.dumps(detail) if detail else None, time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
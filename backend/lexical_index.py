@@ -0,0 +1,205 @@
+import os
+import re
+import json
+import math
+import shutil
+import threading
+from collections import Counter
+import numpy as np
+
+DEFAULT_LEXICAL_INDEX_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "lexical_index"))
+
+# Lowercased alphanumeric runs, so "Data Center" and "GAAP" match regardless of case
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class _Postings:
+    """Inverted index for one (year, quarter), loaded from disk."""
+
+    __slots__ = ("terms", "offsets", "doc_rows", "term_freqs", "doc_lengths", "avg_doc_length", "ids", "metadatas")
+
+    def __init__(self, terms, offsets, doc_rows, term_freqs, doc_lengths, avg_doc_length, ids, metadatas):
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_rows = doc_rows
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.avg_doc_length = avg_doc_length
+        self.ids = ids
+        self.metadatas = metadatas
+
+
+class LexicalIndex:
+    """
+    On-disk BM25 index over chunk text, partitioned by (year, quarter) like the vector store.
+
+    Each partition directory holds the sorted vocabulary (`terms.json`, term -> term number),
+    the postings as flat arrays (`offsets.npy` delimits each term's slice of `doc_rows.npy`
+    and `term_freqs.npy`), per-chunk token counts (`doc_lengths.npy`), the corpus stats
+    (`stats.json`) and the chunk records (`metadata.jsonl`), so lexical hits can be returned
+    in the same {'id', 'score', 'metadata'} shape as vector-store matches.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("LEXICAL_INDEX_PATH", DEFAULT_LEXICAL_INDEX_PATH)
+        self._partitions = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def _partition_dir(self, year, quarter):
+        return os.path.join(self.path, f"{year}_{quarter}")
+
+    def has_partition(self, year, quarter):
+        return os.path.exists(os.path.join(self._partition_dir(year, quarter), "stats.json"))
+
+    def build_partition(self, year, quarter, ids, metadatas):
+        """(Re)builds the index of one (year, quarter) from its chunk ids and metadata (with 'text')."""
+        term_counts = [Counter(tokenize(metadata["text"])) for metadata in metadatas]
+        terms = sorted(set().union(*term_counts)) if term_counts else []
+        term_numbers = {term: number for number, term in enumerate(terms)}
+
+        # Group (row, tf) pairs by term number; rows are appended in order, so postings stay sorted
+        postings = [[] for _ in terms]
+        for row, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                postings[term_numbers[term]].append((row, tf))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(posting) for posting in postings])
+        pairs = np.array([pair for posting in postings for pair in posting], dtype=np.int32).reshape(-1, 2)
+        doc_lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.int32)
+
+        # Write into a temporary directory and swap it in, so readers never see a partial partition
+        directory = self._partition_dir(year, quarter)
+        staging = directory + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        with open(os.path.join(staging, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f)
+        np.save(os.path.join(staging, "offsets.npy"), offsets)
+        np.save(os.path.join(staging, "doc_rows.npy"), pairs[:, 0])
+        np.save(os.path.join(staging, "term_freqs.npy"), pairs[:, 1])
+        np.save(os.path.join(staging, "doc_lengths.npy"), doc_lengths)
+        with open(os.path.join(staging, "metadata.jsonl"), "w", encoding="utf-8") as f:
+            for vector_id, metadata in zip(ids, metadatas):
+                f.write(json.dumps({"id": vector_id, "metadata": metadata}) + "\n")
+        with open(os.path.join(staging, "stats.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "doc_count": len(ids),
+                "avg_doc_length": float(doc_lengths.mean()) if len(ids) else 0.0,
+                "term_count": len(terms),
+            }, f)
+
+        with self._lock:
+            self._partitions.pop((str(year), str(quarter)), None)
+            shutil.rmtree(directory, ignore_errors=True)
+            os.replace(staging, directory)
+        return len(ids)
+
+    def _load_partition(self, year, quarter):
+        key = (str(year), str(quarter))
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is not None or not self.has_partition(*key):
+                return partition
+
+            directory = self._partition_dir(*key)
+            with open(os.path.join(directory, "terms.json"), "r", encoding="utf-8") as f:
+                terms = {term: number for number, term in enumerate(json.load(f))}
+            with open(os.path.join(directory, "stats.json"), "r", encoding="utf-8") as f:
+                stats = json.load(f)
+            with open(os.path.join(directory, "metadata.jsonl"), "r", encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            partition = _Postings(
+                terms,
+                np.load(os.path.join(directory, "offsets.npy")),
+                np.load(os.path.join(directory, "doc_rows.npy"), mmap_mode="r"),
+                np.load(os.path.join(directory, "term_freqs.npy"), mmap_mode="r"),
+                np.load(os.path.join(directory, "doc_lengths.npy")).astype(np.float32),
+                stats["avg_doc_length"],
+                [record["id"] for record in records],
+                [record["metadata"] for record in records],
+            )
+            self._partitions[key] = partition
+            return partition
+
+    def search(self, query, top_k, year, quarter):
+        """
+        Returns the top_k BM25 matches ({'id', 'score', 'metadata'}) within one (year, quarter).
+        Returns None if the partition has not been indexed.
+        """
+        partition = self._load_partition(year, quarter)
+        if partition is None:
+            return None
+        doc_count = len(partition.ids)
+        if doc_count == 0:
+            return []
+
+        scores = np.zeros(doc_count, dtype=np.float32)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * partition.doc_lengths / max(partition.avg_doc_length, 1e-9))
+        for term in set(tokenize(query)):
+            number = partition.terms.get(term)
+            if number is None:
+                continue
+            start, end = partition.offsets[number], partition.offsets[number + 1]
+            rows = partition.doc_rows[start:end]
+            tf = partition.term_freqs[start:end].astype(np.float32)
+            doc_freq = end - start
+            idf = math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+            scores[rows] += idf * tf * (BM25_K1 + 1) / (tf + length_norm[rows])
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [
+            {"id": partition.ids[row], "score": float(scores[row]), "metadata": partition.metadatas[row]}
+            for row in candidates
+        ]
+
+
+def _normalized_scores(matches):
+    """Min-max normalizes match scores to [0, 1]; a single match (or all ties) scores 1."""
+    if not matches:
+        return {}
+    scores = [match["score"] for match in matches]
+    low, high = min(scores), max(scores)
+    spread = high - low
+    return {match["id"]: (match["score"] - low) / spread if spread > 0 else 1.0 for match in matches}
+
+
+def fuse_matches(dense_matches, lexical_matches, top_k, alpha=None):
+    """
+    Combines dense and BM25 matches by a weighted sum of their min-max normalized scores:
+    `alpha * dense + (1 - alpha) * lexical`, where a chunk missing from one list scores 0
+    there. Returns the top_k fused matches, keeping both raw scores for inspection.
+    """
+    alpha = alpha if alpha is not None else float(os.getenv("HYBRID_ALPHA", "0.5"))
+    dense_scores = _normalized_scores(dense_matches)
+    lexical_scores = _normalized_scores(lexical_matches)
+
+    by_id = {}
+    for match in list(dense_matches) + list(lexical_matches):
+        by_id.setdefault(match["id"], match)
+    raw_dense = {match["id"]: match["score"] for match in dense_matches}
+    raw_lexical = {match["id"]: match["score"] for match in lexical_matches}
+
+    fused = [
+        {
+            "id": vector_id,
+            "score": alpha * dense_scores.get(vector_id, 0.0) + (1 - alpha) * lexical_scores.get(vector_id, 0.0),
+            "dense_score": raw_dense.get(vector_id),
+            "lexical_score": raw_lexical.get(vector_id),
+            "metadata": match["metadata"],
+        }
+        for vector_id, match in by_id.items()
+    ]
+    fused.sort(key=lambda match: match["score"], reverse=True)
+    return fused[:top_k]
@@ -1,10 +1,12 @@
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
+from backend.sql_cache import DEFAULT_TICKER
 
 # Load environment variables
 
-def generate_gemini_response(agent,user_query, context):
+def get_gemini_model():
+    """Configure the Gemini client from the .env file and return the generation model."""
     dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
     load_dotenv(dotenv_path)
 
@@ -13,12 +15,14 @@ def generate_gemini_response(agent,user_query, context):
         print("Connection successful with Gemini API")
 
     genai.configure(api_key=GOOGLE_API_KEY)
-    gemini_model = genai.GenerativeModel("gemini-1.5-pro-latest")
+    return genai.GenerativeModel("gemini-1.5-pro-latest")
 
+def build_prompt(agent, user_query, context):
+    """Build the prompt for the given agent."""
     if agent == "snowflake-agent":
         prompt = f"""
 
-            I have a table in Snowflake that contains financial data for NVidia. This table records information for each day with different columns that represent various financial metrics.
+            I have a table in Snowflake that contains financial data for NVidia and peer companies (AMD, INTC, TSM, AVGO). This table records information for each ticker and day with different columns that represent various financial metrics.
             
             **Input Table: NVIDIA_FIN_DATA**  
             Below is a brief description of each column:
@@ -43,6 +47,7 @@ def generate_gemini_response(agent,user_query, context):
             - Identify the relevant columns from the provided metadata based on the user's query.
             - Generate the appropriate SQL query that will fetch the relevant data to answer the user’s query.
             - Make sure to consider: The specific financial metric(s) being asked (e.g., revenue, net income)
+            - Always filter on `TICKER = '{DEFAULT_TICKER}'` unless the user asks about other tickers (then filter on those).
             - I have already added `Year` and `Quarter` as separate columns in the table.  
             - The filtering should be done **directly** using these columns, **without** needing to extract them from the `DATE` column.  
             - The user will provide a dictionary containing `Year` and `Quarter`, which should be used for filtering.  
@@ -60,7 +65,7 @@ def generate_gemini_response(agent,user_query, context):
 
             ### **1. Raw Data Query (Without Aggregation)**
             - This query should retrieve individual record/records (financial metrics that is relevant to the user query, e.g., `(DOLLARVOLUME)`) along with date, year, quater without aggregation.
-            - It should filter based on `Year` and `Quarter`.
+            - It should filter based on `TICKER`, `Year` and `Quarter`.
 
             **Format of Response:**
             ```sql
@@ -147,5 +152,25 @@ def generate_gemini_response(agent,user_query, context):
             Focus on factual analysis based on the provided information.
             """
 
+    return prompt
+
+def generate_gemini_response(agent,user_query, context):
+    gemini_model = get_gemini_model()
+    prompt = build_prompt(agent, user_query, context)
+
     response = gemini_model.generate_content(prompt)
-    return response.text.strip()
\ No newline at end of file
+    return response.text.strip()
+
+def stream_gemini_response(agent, user_query, context):
+    """Same as generate_gemini_response, but yields the text incrementally as Gemini produces it."""
+    gemini_model = get_gemini_model()
+    prompt = build_prompt(agent, user_query, context)
+
+    for chunk in gemini_model.generate_content(prompt, stream=True):
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. safety or finish metadata)
+            continue
+        if text:
+            yield text
\ No newline at end of file
@@ -6,12 +6,17 @@ import os
 import json
 import time
 from typing import Dict, List
-from backend.pinecone_db import AgenticResearchAssistant
-from backend.agents.pinecone_agent import search_pinecone_db
+from backend.pinecone_db import shared_assistant, get_assistant
+from backend.semantic_cache import answer_cache
+from backend.snowflake_pool import snowflake_pool
+from backend.sql_cache import sql_cache
+from backend.fin_data_mirror import mirror_status
+from backend.chart_rendering import render_cache
+from backend.agents.pinecone_agent import search_pinecone_db, stream_search_pinecone_db
 from backend.agents.snowflake_agent import snowflake_agent_call
-from backend.agents.websearch_agent import news_agent
-from backend.agents.final_report_agent import combine_agents
-from fastapi.responses import JSONResponse
+from backend.agents.websearch_agent import news_agent, news_retriever_stats, start_news_prewarm, close_news_retriever
+from backend.agents.final_report_agent import combine_agents, iter_agent_sections, agent_pool_stats, AgentPoolSaturated
+from fastapi.responses import JSONResponse, StreamingResponse
 
 app = FastAPI()
 
@@ -43,6 +48,34 @@ class WebSearchRequest(BaseModel):
 class SearchRequest(BaseModel):
     query: str
     year_quarter_dict: Dict[str, List[str]]  # Accept string keys & string lists
+    bypass_cache: bool = False  # Skip the semantic answer cache for this request
+
+# Headers that stop proxies from buffering server-sent events
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event; data is JSON-encoded so newlines survive."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.on_event("startup")
+def warm_shared_assistant():
+    """Load the embedding model and connect to Pinecone once, before serving requests"""
+    shared_assistant.warm()
+
+@app.on_event("startup")
+def prewarm_news_cache():
+    """Keep the general NVIDIA feed and popular news searches cached in the background"""
+    start_news_prewarm()
+
+@app.on_event("shutdown")
+def close_snowflake_pool():
+    """Close pooled Snowflake connections so sessions are not left open on the account"""
+    snowflake_pool.close_all()
+
+@app.on_event("shutdown")
+def close_news_session():
+    """Stop the news pre-warm scheduler and close the pooled SerpApi session"""
+    close_news_retriever()
 
 # API Endpoints
 @app.get("/")
@@ -52,10 +85,22 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Check the health of connected services"""
+    assistant_status = shared_assistant.status()
     status = {
         "api": "healthy",
-        "pinecone": "unknown",
+        "pinecone": "healthy" if assistant_status["state"] == "warm" else "unavailable",
+        "assistant": assistant_status,
+        "semantic_cache": answer_cache.stats(),
+        "snowflake_pool": snowflake_pool.stats(),
+        "sql_cache": sql_cache.stats(),
+        "fin_data_mirror": mirror_status(),
+        "render_cache": render_cache.stats(),
+        "news": news_retriever_stats(),
+        "report_agents": agent_pool_stats(),
     }
+    if assistant_status["state"] != "warm":
+        return JSONResponse(status_code=503, content=status)
+    return status
 
 @app.get("/available_quarters", response_model=AvailableQuartersResponse)
 async def get_available_quarters():
@@ -70,11 +115,25 @@ async def get_available_quarters():
     
 @app.post("/summarize_using_pinecone")
 def search(request: SearchRequest):
-    assistant = AgenticResearchAssistant()
-    response = search_pinecone_db(assistant, request.query, request.year_quarter_dict)
+    assistant = get_assistant()
+    response = search_pinecone_db(assistant, request.query, request.year_quarter_dict,
+                                  use_cache=not request.bypass_cache)
     return {"response": response}    
 
 
+@app.post("/summarize_using_pinecone/stream")
+def stream_search(request: SearchRequest):
+    """Streams the summary as server-sent `token` events, followed by a `done` event"""
+    assistant = get_assistant()
+
+    def events():
+        for piece in stream_search_pinecone_db(assistant, request.query, request.year_quarter_dict,
+                                               use_cache=not request.bypass_cache):
+            yield sse_event("token", {"text": piece})
+        yield sse_event("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @app.post("/fetch_images")
 async def fetch_images(request: SearchRequest):
     try:
@@ -109,7 +168,26 @@ async def fetch_news_markdown(request: SearchRequest):
 @app.post("/generate_report")
 async def generate_report(request: SearchRequest):
     # Call the combine_agents function with the request data
-    final_report = combine_agents(request.query, request.year_quarter_dict)
+    try:
+        final_report = combine_agents(request.query, request.year_quarter_dict)
+    except AgentPoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
     # Return the final report as a response
-    return final_report
\ No newline at end of file
+    return final_report
+
+@app.post("/generate_report/stream")
+def stream_report(request: SearchRequest):
+    """Streams one `section` event per agent as soon as it finishes, followed by a `done` event"""
+    # Start the agents before streaming, so a full agent pool is answered with a 503
+    try:
+        sections = iter_agent_sections(request.query, request.year_quarter_dict)
+    except AgentPoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    def events():
+        for agent_name, result in sections:
+            yield sse_event("section", {"agent": agent_name, "result": result})
+        yield sse_event("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
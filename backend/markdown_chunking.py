@@ -1,5 +1,174 @@
 import re
 import json
+from itertools import chain
+from dataclasses import dataclass
+
+# Regex to match markdown headers at the beginning of a line.
+HEADER_PATTERN = re.compile(r'^(#{1,6})\s*(.+)$', re.MULTILINE)
+NON_SPACE_PATTERN = re.compile(r'\S')
+SPACE_PATTERN = re.compile(r'\s')
+WORD_PATTERN = re.compile(r'\S+')
+
+# Word counting copies at most this many characters of the source at a time
+WORD_COUNT_BLOCK_CHARS = 1 << 16
+
+
+@dataclass(slots=True)
+class Chunk:
+    """
+    A chunk of a markdown document, stored as character spans into the source text.
+
+    `spans` are the (start, end) offsets of the stripped header sections merged into
+    this chunk. The chunk text is only built when `content` is accessed: merged sections
+    are joined with blank lines, and the halves of a split chunk are re-joined word by
+    word with single spaces (exactly as `chunk_markdown_by_headers` always produced).
+    """
+    source: str
+    header: str | None
+    level: int | None
+    spans: tuple
+    merged_headers: list | None = None
+    part: int | None = None
+
+    @property
+    def content(self):
+        if self.part is None:
+            return "\n\n".join(self.source[start:end] for start, end in self.spans)
+        return " ".join(chain.from_iterable(self.source[start:end].split() for start, end in self.spans))
+
+    def to_dict(self):
+        chunk = {
+            'header': self.header,
+            'level': self.level,
+            'content': self.content,
+        }
+        if self.merged_headers is not None:
+            chunk['merged_headers'] = self.merged_headers
+        if self.part is not None:
+            chunk['part'] = self.part
+        return chunk
+
+
+def _stripped_span(text, start, end):
+    """Offsets of text[start:end].strip() without copying the slice."""
+    first = NON_SPACE_PATTERN.search(text, start, end)
+    if first is None:
+        return start, start
+    start = first.start()
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _iter_segments(markdown_text, matches):
+    """Yields (header_line, level, content_span, content_length) for each header section."""
+    match = next(matches, None)
+    while match is not None:
+        next_match = next(matches, None)
+        end_index = next_match.start() if next_match is not None else len(markdown_text)
+        header_line = match.group(0).strip()
+        content_start, content_end = _stripped_span(markdown_text, match.start(), end_index)
+
+        # Calculate the actual content size (excluding the header)
+        body_start, body_end = _stripped_span(markdown_text, content_start + len(header_line), content_end)
+        yield header_line, len(match.group(1)), (content_start, content_end), body_end - body_start
+        match = next_match
+
+
+def _word_blocks(text, start, end):
+    """Yields (block_start, block_end, word_count) over text[start:end], cut at whitespace."""
+    while start < end:
+        block_end = min(start + WORD_COUNT_BLOCK_CHARS, end)
+        if block_end < end:
+            space = SPACE_PATTERN.search(text, block_end, end)
+            block_end = space.start() if space is not None else end
+        yield start, block_end, len(text[start:block_end].split())
+        start = block_end
+
+
+def _nth_word(text, start, end, n):
+    """Match of the n-th (0-based) word in text[start:end], found by halving the range first."""
+    while end - start > 256:
+        space = SPACE_PATTERN.search(text, (start + end) // 2, end)
+        if space is None:
+            break
+        count = len(text[start:space.start()].split())
+        if n < count:
+            end = space.start()
+        else:
+            start, n = space.start(), n - count
+    for index, word in enumerate(WORD_PATTERN.finditer(text, start, end)):
+        if index == n:
+            return word
+
+
+def _split_in_half(chunk, split_threshold):
+    """Yields the chunk itself, or its two word-level halves if it has too many words."""
+    text = chunk.source
+    span_counts = [sum(count for _, _, count in _word_blocks(text, start, end)) for start, end in chunk.spans]
+    word_count = sum(span_counts)
+    if word_count <= split_threshold:
+        yield chunk
+        return
+
+    # The first half ends after word mid_point - 1 and the second starts at word mid_point
+    mid_point = word_count // 2
+    if mid_point == 0:
+        first_half, second_half = ((chunk.spans[0][0], chunk.spans[0][0]),), chunk.spans
+    else:
+        seen = 0
+        for index, ((start, end), count) in enumerate(zip(chunk.spans, span_counts)):
+            if seen <= mid_point - 1 < seen + count:
+                word = _nth_word(text, start, end, mid_point - 1 - seen)
+                first_half = chunk.spans[:index] + ((start, word.end()),)
+            if seen <= mid_point < seen + count:
+                word = _nth_word(text, start, end, mid_point - seen)
+                second_half = ((word.start(), end),) + chunk.spans[index + 1:]
+                break
+            seen += count
+
+    # Keep the same header information for both parts
+    yield Chunk(text, chunk.header, chunk.level, first_half, chunk.merged_headers, 1)
+    yield Chunk(text, chunk.header, chunk.level, second_half, chunk.merged_headers, 2)
+
+
+def iter_markdown_chunks(markdown_text, ideal_word_count=500, min_content_chars=200):
+    """
+    Streaming version of `chunk_markdown_by_headers`: yields `Chunk` records one at a
+    time, holding offsets into `markdown_text` instead of copies of the text.
+    """
+    # Define the threshold to split: 1.5 * ideal_word_count
+    split_threshold = int(1.5 * ideal_word_count)
+
+    matches = HEADER_PATTERN.finditer(markdown_text)
+    first_match = next(matches, None)
+
+    # If no header is found, treat the entire text as one chunk.
+    if first_match is None:
+        yield Chunk(markdown_text, None, None, (_stripped_span(markdown_text, 0, len(markdown_text)),))
+        return
+
+    def all_matches():
+        yield first_match
+        yield from matches
+
+    # Merge headers with small content until enough content is accumulated
+    current = None
+    for header_line, level, span, content_length in _iter_segments(markdown_text, all_matches()):
+        if current is None:
+            current = [header_line, level, [span], [header_line], content_length]
+        elif content_length < min_content_chars or current[4] < min_content_chars:
+            current[2].append(span)
+            current[3].append(header_line)
+            current[4] += content_length
+        else:
+            # We have enough content in the current chunk, so finalize it
+            yield from _split_in_half(Chunk(markdown_text, current[0], current[1], tuple(current[2]), current[3]), split_threshold)
+            current = [header_line, level, [span], [header_line], content_length]
+
+    # Add the last chunk
+    yield from _split_in_half(Chunk(markdown_text, current[0], current[1], tuple(current[2]), current[3]), split_threshold)
+
 
 def chunk_markdown_by_headers(markdown_text, ideal_word_count=500, min_content_chars=200):
     """
@@ -14,119 +183,7 @@ def chunk_markdown_by_headers(markdown_text, ideal_word_count=500, min_content_c
     Returns:
         List[Dict]: A list of chunk dictionaries with header metadata.
     """
-    # Define the threshold to split: 1.5 * ideal_word_count
-    split_threshold = int(1.5 * ideal_word_count)
-    
-    # Regex to match markdown headers at the beginning of a line.
-    header_pattern = re.compile(r'^(#{1,6})\s*(.+)$', re.MULTILINE)
-    
-    # Find all header matches with their start positions.
-    matches = list(header_pattern.finditer(markdown_text))
-    
-    # If no header is found, treat the entire text as one chunk.
-    if not matches:
-        return [{
-            'header': None,
-            'level': None,
-            'content': markdown_text.strip()
-        }]
-    
-    # Create segments with headers and their content
-    segments = []
-    for idx, match in enumerate(matches):
-        start_index = match.start()
-        end_index = matches[idx + 1].start() if idx + 1 < len(matches) else len(markdown_text)
-        header_line = match.group(0).strip()
-        header_level = len(match.group(1))
-        content = markdown_text[start_index:end_index].strip()
-        
-        # Calculate the actual content size (excluding the header)
-        content_without_header = content[len(header_line):].strip()
-        content_length = len(content_without_header)
-        
-        segments.append({
-            'header': header_line,
-            'level': header_level,
-            'content': content,
-            'content_without_header': content_without_header,
-            'content_length': content_length,
-        })
-    
-    # Improved merging logic - keep merging until we have enough content
-    final_chunks = []
-    current_merged_chunk = None
-    current_merged_headers = []
-    current_merged_content = ""
-    current_content_length = 0
-    
-    for segment in segments:
-        # If we don't have a current chunk or the current segment has small content
-        if current_merged_chunk is None:
-            # Start a new merged chunk
-            current_merged_chunk = {
-                'header': segment['header'],
-                'level': segment['level'],
-            }
-            current_merged_headers = [segment['header']]
-            current_merged_content = segment['content']
-            current_content_length = segment['content_length']
-        else:
-            # Always merge if the content is too small
-            if segment['content_length'] < min_content_chars or current_content_length < min_content_chars:
-                # Add to the current merged chunk
-                current_merged_headers.append(segment['header'])
-                current_merged_content += "\n\n" + segment['content']
-                current_content_length += segment['content_length']
-            else:
-                # We have enough content in the current chunk, so finalize it
-                current_merged_chunk['content'] = current_merged_content
-                current_merged_chunk['merged_headers'] = current_merged_headers
-                final_chunks.append(current_merged_chunk)
-                
-                # Start a new chunk with this segment
-                current_merged_chunk = {
-                    'header': segment['header'],
-                    'level': segment['level'],
-                }
-                current_merged_headers = [segment['header']]
-                current_merged_content = segment['content']
-                current_content_length = segment['content_length']
-    
-    # Add the last chunk if there's any
-    if current_merged_chunk is not None:
-        current_merged_chunk['content'] = current_merged_content
-        current_merged_chunk['merged_headers'] = current_merged_headers
-        final_chunks.append(current_merged_chunk)
-    
-    # Check if any chunks are too large and need splitting
-    result_chunks = []
-    for chunk in final_chunks:
-        words = chunk['content'].split()
-        if len(words) > split_threshold:
-            # Split into two parts (roughly equal halves)
-            mid_point = len(words) // 2
-            part1_text = " ".join(words[:mid_point])
-            part2_text = " ".join(words[mid_point:])
-            
-            # Keep the same header information for both parts
-            result_chunks.append({
-                'header': chunk['header'],
-                'level': chunk['level'],
-                'content': part1_text,
-                'merged_headers': chunk['merged_headers'],
-                'part': 1
-            })
-            result_chunks.append({
-                'header': chunk['header'],
-                'level': chunk['level'],
-                'content': part2_text,
-                'merged_headers': chunk['merged_headers'],
-                'part': 2
-            })
-        else:
-            result_chunks.append(chunk)
-    
-    return result_chunks
+    return [chunk.to_dict() for chunk in iter_markdown_chunks(markdown_text, ideal_word_count, min_content_chars)]
 
 # --- Main Section ---
 # if __name__ == "__main__":
@@ -10,8 +10,9 @@ MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 INPUT_FILE_PATH = "pdf/2025/2025_Third_Quarter.pdf"
 OUTPUT_FILE_PATH = "markdown/2025/2025_Third_Quarter.md"
 
-# Initialize Mistral client
-mistral_client = Mistral(api_key=MISTRAL_API_KEY)
+# Initialize Mistral client (MISTRAL_SERVER_URL points it at another server, e.g. a local fake for tests)
+MISTRAL_SERVER_URL = os.getenv("MISTRAL_SERVER_URL")
+mistral_client = Mistral(api_key=MISTRAL_API_KEY, server_url=MISTRAL_SERVER_URL) if MISTRAL_SERVER_URL else Mistral(api_key=MISTRAL_API_KEY)
 
 def extract_text_from_pdf(pdf_url):
     """Extract text from PDF using Mistral OCR API."""
@@ -38,7 +39,8 @@ def extract_text_from_pdf(pdf_url):
         return markdown_content
 
     except Exception as e:
-        raise Exception(f"Failed to extract text using Mistral OCR: {str(e)}")
+        # Chain the original error so callers can inspect its status code for retries
+        raise Exception(f"Failed to extract text using Mistral OCR: {str(e)}") from e
 
 
 # def main():
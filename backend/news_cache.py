@@ -0,0 +1,205 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+def normalize_query(query):
+    """Lowercases and strips punctuation, so trivially different phrasings share a cache entry."""
+    query = re.sub(r"[^\w\s%-]", " ", query.lower())
+    return re.sub(r"\s+", " ", query).strip()
+
+
+class NewsCache:
+    """
+    Cache of news search results keyed by (normalized query, requested records), with
+    stale-while-revalidate semantics.
+
+    Entries younger than `ttl` are served as is. Entries up to `stale_ttl` seconds past
+    that are still served immediately, while one background refresh replaces them;
+    older entries are fetched again before answering. Concurrent requests for the same
+    key share a single search. A failed refresh keeps the stale entry.
+    """
+
+    def __init__(self, ttl=None, stale_ttl=None, max_entries=None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("NEWS_CACHE_TTL", "300"))
+        self.stale_ttl = stale_ttl if stale_ttl is not None else float(os.getenv("NEWS_CACHE_STALE_TTL", "1800"))
+        self.max_entries = max_entries or int(os.getenv("NEWS_CACHE_MAX_ENTRIES", "500"))
+        self.enabled = os.getenv("NEWS_CACHE_ENABLED", "true").lower() != "false"
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (articles, fetched_at)
+        self._inflight = {}  # key -> Future of the search under way
+        self._queries = {}  # key -> (query, records) as last requested
+        self._requests = Counter()  # key -> recent requests, decayed by popular()
+        self._requested_at = {}  # key -> time of the last request (background refreshes excluded)
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="news-refresh")
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    @staticmethod
+    def key(query, records):
+        return normalize_query(query), records
+
+    def get(self, query, records, fetch):
+        """
+        Returns the articles for a search, calling `fetch(query, records)` (which raises on
+        failure) only when there is no usable cached result.
+        """
+        if not self.enabled:
+            return fetch(query, records)
+        key = self.key(query, records)
+        with self._lock:
+            self._requests[key] += 1
+            self._queries[key] = (query, records)
+            self._requested_at[key] = time.time()
+            entry = self._entries.get(key)
+            age = time.time() - entry[1] if entry is not None else None
+            if entry is not None and age <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None and age <= self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                future, owner = self._claim(key)
+                if owner:
+                    self._executor.submit(self._load, key, query, records, fetch, future)
+                return entry[0]
+            self.misses += 1
+            future, owner = self._claim(key)
+        if owner:
+            self._load(key, query, records, fetch, future)
+        return future.result()
+
+    def refresh(self, query, records, fetch):
+        """Fetches a search now (joining one already under way) and stores the result."""
+        key = self.key(query, records)
+        with self._lock:
+            self._queries.setdefault(key, (query, records))
+            future, owner = self._claim(key)
+        if owner:
+            self._load(key, query, records, fetch, future)
+        return future.result()
+
+    def _claim(self, key):
+        # Returns (future, True) if the caller must run the search, else the one in flight
+        future = self._inflight.get(key)
+        if future is not None:
+            return future, False
+        future = self._inflight[key] = Future()
+        return future, True
+
+    def _load(self, key, query, records, fetch, future):
+        try:
+            articles = fetch(query, records)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.errors += 1
+            logging.warning(f"News search for '{query}' failed: {e}")
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._entries[key] = (articles, time.time())
+            self._entries.move_to_end(key)
+            self.refreshes += 1
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._queries.pop(evicted, None)
+                self._requested_at.pop(evicted, None)
+        future.set_result(articles)
+
+    def _requested_recently(self, key):
+        # Refreshing a search nobody asked for within the TTL and stale window would only spend quota
+        requested_at = self._requested_at.get(key)
+        return requested_at is not None and time.time() - requested_at <= self.ttl + self.stale_ttl
+
+    def requested_recently(self, query, records):
+        with self._lock:
+            return self._requested_recently(self.key(query, records))
+
+    def popular(self, count):
+        """
+        The `count` most requested (query, records) since the last call, among those requested
+        within the TTL and stale window; request counts are halved each call.
+        """
+        with self._lock:
+            top = [self._queries[key] for key, _ in self._requests.most_common()
+                   if key in self._queries and self._requested_recently(key)][:count]
+            for key in list(self._requests):
+                self._requests[key] //= 2
+                if not self._requests[key]:
+                    del self._requests[key]
+            return top
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+            }
+
+
+class NewsPrewarmer:
+    """
+    Background thread that refreshes the always-on searches (the general NVIDIA feed)
+    and the most requested financial searches every `interval` seconds (default: the
+    cache TTL), so requests are answered from the cache. Only searches requested within
+    the cache's TTL and stale window are refreshed, so an idle service makes no calls.
+    """
+
+    def __init__(self, cache, fetch, searches, interval=None, top_queries=None):
+        self.cache = cache
+        self.fetch = fetch
+        self.searches = list(searches)
+        self.interval = interval or float(os.getenv("NEWS_PREWARM_INTERVAL", str(cache.ttl)))
+        self.top_queries = top_queries if top_queries is not None else int(os.getenv("NEWS_PREWARM_TOP_QUERIES", "5"))
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+
+    def run_once(self):
+        searches = [(query, records) for query, records in self.searches if self.cache.requested_recently(query, records)]
+        keys = {self.cache.key(query, records) for query, records in searches}
+        for query, records in self.cache.popular(self.top_queries):
+            if self.cache.key(query, records) not in keys:
+                searches.append((query, records))
+        for query, records in searches:
+            try:
+                self.cache.refresh(query, records, self.fetch)
+            except Exception:
+                pass  # logged by the cache; the stale entry keeps being served
+        self.runs += 1
+        return len(searches)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="news-prewarm", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
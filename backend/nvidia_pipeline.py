@@ -1,8 +1,21 @@
 from backend.nvidia_pdf_extraction import fetch_nvidia_financial_reports
-from backend.s3_utils import fetch_s3_urls, get_presigned_url, upload_to_s3
+from backend.s3_utils import iter_s3_tree, get_presigned_url, upload_to_s3, read_s3_text
 from backend.mistral_ocr_markdown import extract_text_from_pdf
 from backend.pinecone_db import extract_filename_year_quarter, AgenticResearchAssistant
-import time
+from backend.markdown_chunking import chunk_markdown_by_headers
+from backend.ingestion_manifest import IngestionManifest, content_hash, STAGE_MARKDOWN, STAGE_CHUNKS, STAGE_VECTORS
+from backend.ocr_pool import run_ocr_pool
+from backend.lexical_index import LexicalIndex
+import argparse
+import os
+
+def markdown_key_for(pdf_key):
+    """Maps 'pdf/2024/2024_First_Quarter.pdf' to 'markdown/2024/2024_First_Quarter.md'."""
+    return "markdown" + pdf_key[3:-3] + "md"
+
+def vectors_stage():
+    """Vectors are tracked per vector store, so switching VECTOR_STORE re-embeds everything once."""
+    return f"{STAGE_VECTORS}:{os.getenv('VECTOR_STORE', 'pinecone')}"
 
 def fetch_pdf_s3_upload():
     # Step 1: Fetch NVIDIA financial reports
@@ -13,37 +26,119 @@ def fetch_pdf_s3_upload():
         print(f"Fetched: {report['pdf_filename']} (Size: {report['content']} bytes)")
     return reports
 
-def convert_markdown_s3_upload():
-    # Instantiate the OCR extractor only once
-    s3_urls = fetch_s3_urls("pdf/")
-    s3_urls = s3_urls[1:]
-    for input_url in s3_urls:
-        output_url = "markdown"+input_url[3:-3]+"md"
+def convert_markdown_s3_upload(manifest, dry_run=False):
+    """OCR the PDFs that are new or changed since their last successful conversion."""
+    # Year folders are listed concurrently; only the filings that need work are kept in memory
+    total, pending = 0, []
+    for obj in iter_s3_tree("pdf/", suffixes=(".pdf",)):
+        total += 1
+        if not manifest.is_current(obj["key"], STAGE_MARKDOWN, obj["etag"]):
+            pending.append(obj)
+    print(f"{len(pending)} of {total} PDFs need OCR.")
+
+    if dry_run:
+        for obj in pending:
+            print(f"[dry-run] would OCR {obj['key']} -> {markdown_key_for(obj['key'])}")
+        return pending
+
+    etags = {obj["key"]: obj["etag"] for obj in pending}
+
+    def convert(input_url, ocr_call):
+        output_url = markdown_key_for(input_url)
         pdf_url = get_presigned_url(input_url)
-        markdown_content = extract_text_from_pdf(pdf_url)
-        upload_to_s3(output_url, markdown_content)
+        markdown_content = ocr_call(extract_text_from_pdf, pdf_url)
+        markdown_etag = upload_to_s3(output_url, markdown_content)
+        manifest.record(input_url, STAGE_MARKDOWN, etags[input_url], output_ref=output_url,
+                        detail={"markdown_etag": markdown_etag})
         print(f"{input_url} converted to md")
-        time.sleep(10)
 
-def generate_pinecone_embeddings(assistant):
-    """Fetch all markdown URLs under the 'markdown' folder and convert them to presigned URLs."""
+    # OCR runs concurrently under the Mistral rate limit; failed PDFs are retried next run
+    run_ocr_pool(list(etags), convert)
+    return pending
+
+def generate_pinecone_embeddings(assistant, manifest, dry_run=False):
+    """Chunk and embed the markdown files that are new or changed since they were last embedded."""
     print("Fetching markdown files...")
-    markdown_urls = fetch_s3_urls("markdown/")
-    markdown_urls = markdown_urls[1:]
-    presigned_urls = [get_presigned_url(url) for url in markdown_urls]
-    print(f"Fetched {len(presigned_urls)} markdown files.")
+    stage = vectors_stage()
+    lexical_index = assistant.lexical_index if assistant is not None else LexicalIndex()
+    total, pending, unindexed = 0, [], []
+    for obj in iter_s3_tree("markdown/", suffixes=(".md",)):
+        total += 1
+        if not manifest.is_current(obj["key"], stage, obj["etag"]):
+            pending.append(obj)
+        elif not lexical_index.has_partition(*extract_filename_year_quarter(obj["key"])[1:]):
+            # Filings embedded before the lexical index existed only need their BM25 index built
+            unindexed.append(obj)
+    print(f"{len(pending)} of {total} markdown files need embedding.")
 
-    # Step 2: Process each markdown file and insert embeddings into Pinecone
-    for url in presigned_urls:
-        print(url)
-        filename, year, quarter = extract_filename_year_quarter(url)  # Extract metadata from filename
-        assistant.insert_embeddings(url, year, quarter, filename)
-        print(f"Inserted Embeddings for the {year} and {quarter}")
+    if dry_run:
+        for obj in pending:
+            print(f"[dry-run] would chunk and embed {obj['key']}")
+        for obj in unindexed:
+            print(f"[dry-run] would build the lexical index for {obj['key']}")
+        return pending
+
+    for obj in unindexed:
+        filename, year, quarter = extract_filename_year_quarter(obj["key"])
+        try:
+            assistant.index_lexical(chunk_markdown_by_headers(read_s3_text(obj["key"])), year, quarter, filename)
+            print(f"Built lexical index for {year} Q{quarter}")
+        except Exception as e:
+            print(f"Failed to build the lexical index for {obj['key']}: {e}")
+
+    def documents():
+        """Read and chunk markdown files lazily, so only a few documents are in memory at a time."""
+        for obj in pending:
+            key, etag = obj["key"], obj["etag"]
+            filename, year, quarter = extract_filename_year_quarter(key)  # Extract metadata from filename
+            try:
+                markdown_text = read_s3_text(key)
+                chunks = chunk_markdown_by_headers(markdown_text)
+            except Exception as e:
+                # Leave the stage unrecorded so the next run retries this file
+                print(f"Failed to chunk {key}: {e}")
+                continue
+            manifest.record(key, STAGE_CHUNKS, etag, detail={
+                "count": len(chunks),
+                "hash": content_hash("\x00".join(chunk["content"] for chunk in chunks)),
+            })
+            yield {"key": key, "etag": etag, "chunks": chunks, "year": year, "quarter": quarter, "filename": filename}
+
+    def on_document_done(document, count):
+        # A revised filing can produce fewer chunks; remove the leftover vectors
+        previous = manifest.get(document["key"], stage)
+        previous_count = previous["detail"].get("count", 0) if previous else 0
+        try:
+            if previous_count > count:
+                assistant.delete_chunks(document["year"], document["quarter"], count, previous_count)
+        except Exception as e:
+            print(f"Failed to delete stale vectors for {document['key']}: {e}")
+            return
+        manifest.record(document["key"], stage, document["etag"], detail={"count": count})
+        print(f"Inserted Embeddings for the {document['year']} and {document['quarter']}")
+
+    def on_document_failed(document, error):
+        # Leave the stage unrecorded so the next run retries this file
+        print(f"Failed to embed {document['key']}: {error}")
+
+    # Step 2: Embed chunks across documents in large batches and upsert them concurrently
+    metrics = assistant.insert_documents(documents(), on_document_done, on_document_failed)
+    print(f"Embedding throughput: {metrics['chunks_per_sec']} chunks/sec, {metrics['vectors_per_sec']} vectors/sec")
+    return pending
 
 
 if __name__ == '__main__':
-    # Run the pipeline only once
-    reports = fetch_pdf_s3_upload()
-    convert_markdown_s3_upload()
-    assistant = AgenticResearchAssistant()
-    generate_pinecone_embeddings(assistant)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Incrementally ingest NVIDIA filings: PDF -> markdown -> chunks -> vectors.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which filings would be processed.")
+    parser.add_argument("--skip-fetch", action="store_true", help="Do not scrape the investor site for new PDFs.")
+    args = parser.parse_args()
+
+    manifest = IngestionManifest()
+    if not args.dry_run and not args.skip_fetch:
+        reports = fetch_pdf_s3_upload()
+    ocr_pending = convert_markdown_s3_upload(manifest, dry_run=args.dry_run)
+    assistant = None if args.dry_run else AgenticResearchAssistant()
+    generate_pinecone_embeddings(assistant, manifest, dry_run=args.dry_run)
+    if args.dry_run:
+        for obj in ocr_pending:
+            print(f"[dry-run] would chunk and embed {markdown_key_for(obj['key'])} after OCR")
@@ -0,0 +1,121 @@
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+
+    Tokens refill continuously at `requests_per_minute / 60` per second up to `burst`;
+    `acquire` blocks until a token is available.
+    """
+
+    def __init__(self, requests_per_minute, burst=None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(requests_per_minute // 60) or 1))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+def status_code_of(error):
+    """Best-effort HTTP status code of an API error (SDK errors may wrap the original exception)."""
+    while error is not None:
+        status_code = getattr(error, "status_code", None)
+        if status_code is None:
+            status_code = getattr(error, "status", None)
+        if not isinstance(status_code, int):
+            response = getattr(error, "response", None)
+            status_code = getattr(response, "status_code", None)
+        if isinstance(status_code, int):
+            return status_code
+        error = error.__cause__
+    return None
+
+
+def is_retryable(error):
+    """Rate limiting, server errors and transport failures are retried; anything else is not."""
+    status_code = status_code_of(error)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    # No status code: connection resets, timeouts and similar transport errors
+    cause = error
+    while cause is not None:
+        if isinstance(cause, (ConnectionError, TimeoutError)) or type(cause).__name__ in ("ConnectError", "ReadTimeout", "RemoteProtocolError"):
+            return True
+        cause = cause.__cause__
+    return False
+
+
+def call_with_retries(fn, *args, rate_limiter=None, max_retries=5, base_delay=2.0, max_delay=60.0, label="OCR call"):
+    """Calls `fn`, retrying retryable errors with full-jitter exponential backoff."""
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return fn(*args)
+        except Exception as e:
+            attempt += 1
+            if attempt > max_retries or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+            logging.warning(f"{label} failed ({e}); retry {attempt}/{max_retries} in {delay:.1f}s.")
+            time.sleep(delay)
+
+
+def run_ocr_pool(items, process_item, requests_per_minute=None, max_workers=None, max_retries=None):
+    """
+    Runs `process_item(item, ocr_call)` for every item on a bounded worker pool.
+
+    `ocr_call(fn, *args)` must wrap each OCR request: it waits for the shared rate
+    limiter and retries 429/5xx/transport errors with jittered backoff. A failing item
+    is logged and recorded without stopping the others.
+
+    Returns a dict with the 'succeeded' items and 'failed' (item, error) pairs.
+    """
+    # Default: Mistral's 1 request/second workspace limit; raise it to match a higher quota
+    requests_per_minute = requests_per_minute or float(os.getenv("OCR_REQUESTS_PER_MINUTE", "60"))
+    max_workers = max_workers or int(os.getenv("OCR_MAX_WORKERS", "4"))
+    max_retries = max_retries if max_retries is not None else int(os.getenv("OCR_MAX_RETRIES", "5"))
+    rate_limiter = TokenBucket(requests_per_minute)
+
+    def ocr_call(fn, *args):
+        return call_with_retries(fn, *args, rate_limiter=rate_limiter, max_retries=max_retries)
+
+    succeeded, failed = [], []
+    total = len(items)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr") as executor:
+        futures = {executor.submit(process_item, item, ocr_call): item for item in items}
+        for done, future in enumerate(as_completed(futures), start=1):
+            item = futures[future]
+            try:
+                future.result()
+                succeeded.append(item)
+                outcome = "done"
+            except Exception as e:
+                failed.append((item, e))
+                outcome = f"FAILED ({e})"
+            print(f"[{done}/{total}] {outcome}: {item} ({time.monotonic() - start:.1f}s elapsed)")
+
+    print(f"OCR finished: {len(succeeded)} succeeded, {len(failed)} failed.")
+    return {"succeeded": succeeded, "failed": failed}
@@ -1,10 +1,15 @@
 import os
+import time
 import logging
+import threading
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone, ServerlessSpec
 import google.generativeai as genai
 from backend.markdown_chunking import chunk_markdown_by_headers
+from backend.embeddings import get_embedding_backend, EMBEDDING_DIMENSION
+from backend.vector_store import get_vector_store, PineconeVectorStore
+from backend.upsert_pipeline import EmbeddingUpserter, chunk_records
+from backend.lexical_index import LexicalIndex
 import requests
 from urllib.parse import urlparse
 
@@ -51,16 +56,37 @@ class AgenticResearchAssistant:
         self.PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
         self.GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
         
-        # Initialize Pinecone
-        self.pc = Pinecone(api_key=self.PINECONE_API_KEY)
+        # Vector store backend: the Pinecone index (default) or a local on-disk store
+        self.vector_store_name = os.getenv("VECTOR_STORE", PineconeVectorStore.name)
         self.index_name = "nvidia-agentic-research-assistant"
-        self.dimension = 384  # Matching the embedding model's output size
+        self.dimension = EMBEDDING_DIMENSION  # Matching the embedding model's output size
+        self.pc = None
+        self.index = None
+        if self.vector_store_name == PineconeVectorStore.name:
+            self.pc = Pinecone(api_key=self.PINECONE_API_KEY)
         
         # Configure Gemini API
         genai.configure(api_key=self.GOOGLE_API_KEY)
         self.gemini_model = genai.GenerativeModel("gemini-1.5-pro-latest")
         
-        # Check and create Pinecone index if it doesn’t exist
+        # Check and create the index if it doesn’t exist, then connect to it
+        self.index_stats = None
+        self.stats_refreshed_at = None
+        self.connect_index()
+        
+        # Load the embedding model (SentenceTransformer or ONNX, see EMBEDDING_BACKEND)
+        self.model = get_embedding_backend()
+
+        # BM25 index over the same chunks, for hybrid retrieval
+        self.lexical_index = LexicalIndex()
+
+    def connect_index(self):
+        """Creates the Pinecone index if needed and (re)connects the vector store."""
+        if self.vector_store_name != PineconeVectorStore.name:
+            self.vector_store = get_vector_store(self.vector_store_name, dimension=self.dimension)
+            self.refresh_index_stats()
+            return
+
         if self.index_name not in [index["name"] for index in self.pc.list_indexes()]:
             self.pc.create_index(
                 name=self.index_name,
@@ -74,11 +100,15 @@ class AgenticResearchAssistant:
         
         # Connect to the index and print its stats
         self.index = self.pc.Index(self.index_name)
-        logging.info(f"Pinecone index stats: {self.index.describe_index_stats()}")
-        
-        # Load Sentence Transformer Model
-        self.model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-        logging.info("Sentence Transformer model loaded.")
+        self.vector_store = PineconeVectorStore(self.index)
+        self.refresh_index_stats()
+
+    def refresh_index_stats(self):
+        """Refreshes the cached control-plane metadata (index stats) for the vector store."""
+        self.index_stats = self.vector_store.describe_index_stats()
+        self.stats_refreshed_at = time.time()
+        logging.info(f"{self.vector_store_name} index stats: {self.index_stats}")
+        return self.index_stats
 
     def process_markdown(self, file_path):
         """Reads a markdown file and processes it into chunks."""
@@ -92,8 +122,49 @@ class AgenticResearchAssistant:
             logging.error(f"Error reading markdown file: {e}")
             return []
 
+    def insert_chunks(self, chunks, year, quarter, filename):
+        """Generates embeddings for markdown chunks and upserts them; returns the number inserted."""
+        if not chunks:
+            logging.warning("No chunks extracted. Skipping embedding.")
+            return 0
+
+        errors = []
+        document = {"chunks": chunks, "year": year, "quarter": quarter, "filename": filename}
+        self.insert_documents([document], on_document_failed=lambda doc, error: errors.append(error))
+        if errors:
+            raise errors[0]
+        logging.info(f"Inserted {len(chunks)} chunks into {self.vector_store_name} successfully.")
+        return len(chunks)
+
+    def insert_documents(self, documents, on_document_done=None, on_document_failed=None):
+        """
+        Embeds and upserts the chunks of many documents, batching encoding across documents
+        and sending size-bounded upserts concurrently. Returns the throughput summary.
+        The (year, quarter) lexical index is rebuilt once a document's vectors are stored.
+        """
+        def index_document(document, count):
+            try:
+                self.index_lexical(document["chunks"], document["year"], document["quarter"], document["filename"])
+            except Exception as e:
+                # The vectors are stored; hybrid search falls back to dense results for this quarter
+                logging.error(f"Building the lexical index for {document['year']} Q{document['quarter']} failed: {e}")
+            if on_document_done:
+                on_document_done(document, count)
+
+        upserter = EmbeddingUpserter(self.model, self.vector_store)
+        return upserter.run(documents, index_document, on_document_failed)
+
+    def index_lexical(self, chunks, year, quarter, filename):
+        """Builds the BM25 index of a (year, quarter) from its chunks, with the same ids as the vectors."""
+        ids, metadatas = chunk_records(chunks, year, quarter, filename)
+        return self.lexical_index.build_partition(year, quarter, ids, metadatas)
+
+    def delete_chunks(self, year, quarter, start, end):
+        """Deletes the vectors with chunk numbers in [start, end) for a (year, quarter)."""
+        self.vector_store.delete([f"{year}_{quarter}_{i}" for i in range(start, end)])
+
     def insert_embeddings(self, presigned_url, year, quarter, filename):
-        """Processes markdown from a presigned URL, generates embeddings, and inserts into Pinecone."""
+        """Processes markdown from a presigned URL, generates embeddings, and inserts into the vector store."""
         try:
             # Fetch markdown content from the presigned URL
             response = requests.get(presigned_url)
@@ -102,59 +173,21 @@ class AgenticResearchAssistant:
             
             # Process chunks from markdown content
             chunks = chunk_markdown_by_headers(markdown_text)
-            if not chunks:
-                logging.warning("No chunks extracted. Skipping embedding.")
-                return
-
-            # Extract only the text content from chunks
-            chunk_texts = [chunk["content"] for chunk in chunks]
-
-            # Generate embeddings
-            embeddings = self.model.encode(chunk_texts).tolist()
-            logging.info(f"Generated embeddings for {len(embeddings)} chunks.")
-
-            # Prepare batch upserts for Pinecone
-            pinecone_data = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                metadata = {
-                    "text": chunk["content"],
-                    "header": chunk.get("merged_headers", "No Header"),
-                    "level": str(chunk.get("level", "Unknown")),
-                    "part": str(chunk.get("part")) if chunk.get("part") is not None else "None",
-                    "year": year,
-                    "quarter": quarter,
-                    "filename": filename
-                }
-                pinecone_data.append((f"{year}_{quarter}_{i}", embedding, metadata))
-            
-            # Insert data into Pinecone in batch
-            self.index.upsert(pinecone_data)
-            logging.info(f"Inserted {len(pinecone_data)} chunks into Pinecone successfully.")
+            return self.insert_chunks(chunks, year, quarter, filename)
         except Exception as e:
             logging.error(f"Error processing presigned URL: {e}")
+            return 0
         
     def search_pinecone_db(self, query, year_quarter_dict, top_k=20):
         """Search for relevant chunks in Pinecone, filtering by multiple years and quarters, and generate a response using Gemini."""
-        query_embedding = self.model.encode([query]).tolist()
+        query_embedding = self.model.encode([query])[0]
         try:
-            # Construct metadata filter for multiple years and quarters
-            filter_criteria = {
-                "$or": [
-                    {"year": {"$eq": str(year)}, "quarter": {"$in": [str(q) for q in quarters]}}
-                    for year, quarters in year_quarter_dict.items()
-                ]
-            }
-            print(filter_criteria)
-
-            # Perform a filtered search in Pinecone
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True,
-                filter=filter_criteria  # Apply filtering
-            )
-
-            matches = results.get("matches", [])
+            # Search every selected (year, quarter) and keep the overall best matches
+            matches = []
+            for year, quarters in year_quarter_dict.items():
+                for quarter in quarters:
+                    matches.extend(self.vector_store.query(query_embedding, top_k, str(year), str(quarter)))
+            matches = sorted(matches, key=lambda match: match["score"], reverse=True)[:top_k]
             if not matches:
                 logging.warning(f"No relevant matches found for the given year-quarter combinations.")
                 return "No relevant information found for the specified year and quarters."
@@ -178,4 +211,100 @@ class AgenticResearchAssistant:
         except Exception as e:
             logging.error(f"Error during search: {e}")
             return "Error occurred during search."
-        
+
+
+class SharedAssistant:
+    """
+    Process-wide, thread-safe holder for a single warm AgenticResearchAssistant.
+
+    The assistant (embedding model, Pinecone client, Gemini configuration) is built
+    once, typically at application startup, and shared by every request. If building
+    it fails, the error is recorded and construction is retried lazily on the next
+    request. Index stats are refreshed by the first request that finds them older than
+    `refresh_interval` seconds; a failed refresh triggers a reconnect.
+    """
+
+    def __init__(self, refresh_interval=None):
+        self.refresh_interval = refresh_interval or int(os.getenv("PINECONE_REFRESH_INTERVAL", "300"))
+        self._assistant = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._last_error = None
+        self._loaded_at = None
+        self._load_seconds = None
+
+    def warm(self):
+        """Builds the shared assistant if it has not been built yet. Never raises."""
+        try:
+            self.get()
+        except Exception as e:
+            logging.error(f"Failed to warm research assistant: {e}")
+        return self.status()
+
+    def get(self):
+        """Returns the shared assistant, building it on first use."""
+        assistant = self._assistant
+        if assistant is None:
+            with self._lock:
+                if self._assistant is None:
+                    start = time.perf_counter()
+                    try:
+                        self._assistant = AgenticResearchAssistant()
+                    except Exception as e:
+                        self._last_error = str(e)
+                        raise
+                    self._load_seconds = round(time.perf_counter() - start, 3)
+                    self._loaded_at = time.time()
+                    self._last_error = None
+                    logging.info(f"Research assistant warmed in {self._load_seconds}s.")
+                assistant = self._assistant
+        self._maybe_refresh(assistant)
+        return assistant
+
+    def _maybe_refresh(self, assistant):
+        """Refreshes stale index metadata; only one thread refreshes at a time."""
+        refreshed_at = assistant.stats_refreshed_at or 0
+        if time.time() - refreshed_at < self.refresh_interval:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            assistant.refresh_index_stats()
+        except Exception as e:
+            logging.warning(f"Refreshing Pinecone index stats failed ({e}); reconnecting.")
+            try:
+                assistant.connect_index()
+                self._last_error = None
+            except Exception as reconnect_error:
+                # Keep serving with the existing client; retry after another interval
+                assistant.stats_refreshed_at = time.time()
+                self._last_error = str(reconnect_error)
+                logging.error(f"Reconnecting to Pinecone failed: {reconnect_error}")
+        finally:
+            self._refresh_lock.release()
+
+    def status(self):
+        """Returns the warm/cold state of the shared assistant for readiness checks."""
+        assistant = self._assistant
+        status = {
+            "state": "warm" if assistant is not None else "cold",
+            "load_seconds": self._load_seconds,
+            "loaded_at": self._loaded_at,
+            "last_error": self._last_error,
+        }
+        if assistant is not None:
+            status["index"] = assistant.index_name
+            status["embedding_backend"] = assistant.model.name
+            status["stats_refreshed_at"] = assistant.stats_refreshed_at
+            status["vector_store"] = assistant.vector_store_name
+            status["total_vector_count"] = (assistant.index_stats or {}).get("total_vector_count")
+        return status
+
+
+# Shared instance used by the API and the agents
+shared_assistant = SharedAssistant()
+
+
+def get_assistant():
+    """Returns the process-wide warm AgenticResearchAssistant."""
+    return shared_assistant.get()
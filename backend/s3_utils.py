@@ -1,5 +1,11 @@
+import io
 import os
+import time
+import queue
+import threading
 import boto3
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -11,14 +17,32 @@ aws_secret_access_key = os.getenv('AWS_SECRET_ACCESS_KEY')
 aws_region = os.getenv('AWS_REGION')
 bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
 
+# Concurrent uploads share one client; its connection pool must be at least as large as the upload pool
+upload_workers = int(os.getenv("S3_UPLOAD_WORKERS", "8"))
+max_pool_connections = max(upload_workers, int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32")))
+
 # Initialize a session using AWS credentials
 s3_client = boto3.client(
     's3',
     region_name=aws_region,
     aws_access_key_id=aws_access_key_id,
-    aws_secret_access_key=aws_secret_access_key
+    aws_secret_access_key=aws_secret_access_key,
+    config=Config(max_pool_connections=max_pool_connections, retries={"max_attempts": 5, "mode": "standard"})
 )
 
+_upload_executor = ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="s3-upload")
+_list_executor = ThreadPoolExecutor(max_workers=int(os.getenv("S3_LIST_WORKERS", "8")), thread_name_prefix="s3-list")
+
+# Presigned URLs are reused until shortly before they expire
+PRESIGNED_URL_EXPIRES = int(os.getenv("S3_PRESIGNED_URL_EXPIRES", "3600"))
+PRESIGNED_URL_REFRESH_MARGIN = int(os.getenv("S3_PRESIGNED_URL_REFRESH_MARGIN", "300"))
+PRESIGNED_URL_CACHE_MAX_ENTRIES = 10000
+_presigned_urls = {}  # key -> (url, expires_at)
+_presigned_urls_lock = threading.Lock()
+
+# Streamed uploads are sent in parts of this size (S3's minimum part size is 5 MB)
+UPLOAD_PART_SIZE = max(5 * 1024 * 1024, int(os.getenv("S3_UPLOAD_PART_SIZE", str(8 * 1024 * 1024))))
+
 # Function to upload binary content (e.g., PDF content) directly to S3
 def upload_file_to_s3(file_content, filname, folder=None):
     """
@@ -87,56 +111,278 @@ def upload_image_to_s3(image_content, filename, folder=None, content_type="image
 #     except Exception as e:
 #         raise Exception(f"Failed to upload PDF to S3: {e}")
 
-def fetch_s3_urls(base_path):
+def _as_prefix(base_path):
+    # Ensure the base_path ends with a slash (S3 treats folders as prefixes)
+    return base_path if not base_path or base_path.endswith('/') else base_path + '/'
+
+def _object_record(obj):
+    return {"key": obj['Key'], "etag": obj['ETag'].strip('"'), "size": obj['Size']}
+
+def _matching_objects(contents, suffixes):
+    """Files of one listing page (folder placeholder objects skipped), filtered by suffix."""
+    suffixes = tuple(suffix.lower() for suffix in suffixes) if suffixes else None
+    return [
+        _object_record(obj) for obj in contents
+        if not obj['Key'].endswith('/') and (suffixes is None or obj['Key'].lower().endswith(suffixes))
+    ]
+
+def iter_s3_objects(base_path, suffixes=None):
     """
-    Fetches all file URLs from a specific folder in the S3 bucket.
+    Lazily lists every file under a folder of the S3 bucket, one page (up to 1000 keys)
+    at a time, so large folders are neither truncated nor held in memory.
 
     :param base_path: The base folder path in the S3 bucket (e.g., "pdf/").
-    :return: A list of full S3 URLs for files within the specified folder.
+    :param suffixes: Optional file extensions to keep, e.g. (".pdf",) (case-insensitive).
+    :return: A generator of dicts with 'key', 'etag' and 'size'.
     """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=_as_prefix(base_path)):
+        yield from _matching_objects(page.get('Contents', []), suffixes)
+
+def iter_s3_objects_concurrently(prefixes, suffixes=None):
+    """
+    Lists several prefixes in parallel and yields their files as pages arrive (in no
+    particular order). At most a few pages are buffered, so memory stays flat.
+    """
+    prefixes = list(prefixes)
+    pages = queue.Queue(maxsize=2 * _list_executor._max_workers)
+    stop = threading.Event()
+    done = object()
+
+    def offer(item):
+        # Give up if the consumer stopped iterating, instead of blocking forever on a full queue
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def list_prefix(prefix):
+        try:
+            paginator = s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=bucket_name, Prefix=_as_prefix(prefix)):
+                if not offer(_matching_objects(page.get('Contents', []), suffixes)):
+                    return
+        except Exception as e:
+            offer(e)
+        offer(done)
+
+    for prefix in prefixes:
+        _list_executor.submit(list_prefix, prefix)
     try:
-        # Ensure the base_path ends with a slash (S3 treats folders as prefixes)
-        if not base_path.endswith('/'):
-            base_path += '/'
+        remaining = len(prefixes)
+        while remaining:
+            item = pages.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield from item
+    finally:
+        stop.set()
+
+def iter_s3_tree(base_path, suffixes=None):
+    """
+    Like iter_s3_objects, but lists each sub-folder of `base_path` (e.g. "pdf/2024/")
+    concurrently after yielding the files directly inside it.
+    """
+    subprefixes = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=_as_prefix(base_path), Delimiter='/'):
+        yield from _matching_objects(page.get('Contents', []), suffixes)
+        subprefixes.extend(common['Prefix'] for common in page.get('CommonPrefixes', []))
+    if subprefixes:
+        yield from iter_s3_objects_concurrently(subprefixes, suffixes)
 
-        # List objects with the specified prefix (base_path)
-        response = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=base_path)
+def fetch_s3_urls(base_path):
+    """
+    Fetches all file paths from a specific folder in the S3 bucket.
 
-        # Check if 'Contents' exists in the response (it won't if no files are found)
-        if 'Contents' not in response:
+    :param base_path: The base folder path in the S3 bucket (e.g., "pdf/").
+    :return: A list of S3 keys for files within the specified folder.
+    """
+    try:
+        s3_urls = [obj["key"] for obj in iter_s3_objects(base_path)]
+        if not s3_urls:
             print(f"No files found in folder: {base_path}")
             return []
 
-        # Construct full S3 URLs for each file
-        s3_urls = []
-        for obj in response['Contents']:
-            key = obj['Key']  # The file key (e.g., "pdf/2021/Q1.pdf")
-            s3_url = f"{key}"
-
-            s3_urls.append(s3_url)
-
         print(f"Found {len(s3_urls)} files in folder: {base_path}")
         return s3_urls
 
     except Exception as e:
         print(f"Error fetching file paths: {e}")
         return []
-    
+
+def fetch_s3_objects(base_path):
+    """
+    Fetches the keys of all files in a specific folder of the S3 bucket, with their ETags.
+
+    :param base_path: The base folder path in the S3 bucket (e.g., "pdf/").
+    :return: A list of dicts with 'key', 'etag' and 'size' for files within the folder.
+    """
+    objects = list(iter_s3_objects(base_path))
+    print(f"Found {len(objects)} files in folder: {base_path}")
+    return objects
+
+def read_s3_text(key):
+    """Download a text file (e.g. Markdown) from S3 and return its content."""
+    response = s3_client.get_object(Bucket=bucket_name, Key=key)
+    return response['Body'].read().decode('utf-8')
+
 def get_presigned_url(key):
     """Generate a presigned URL for the PDF file in S3."""
+    now = time.time()
+    with _presigned_urls_lock:
+        cached = _presigned_urls.get(key)
+    if cached is not None and now < cached[1] - PRESIGNED_URL_REFRESH_MARGIN:
+        return cached[0]
+
     presigned_url = s3_client.generate_presigned_url(
         'get_object',
         Params={'Bucket': bucket_name, 'Key': key},
-        ExpiresIn=3600  # URL valid for 1 hour
+        ExpiresIn=PRESIGNED_URL_EXPIRES  # URL valid for 1 hour by default
     )
+    with _presigned_urls_lock:
+        if len(_presigned_urls) >= PRESIGNED_URL_CACHE_MAX_ENTRIES:
+            # Drop expired URLs first, then the oldest ones
+            for cached_key in [k for k, (_, expires_at) in _presigned_urls.items() if expires_at <= now]:
+                del _presigned_urls[cached_key]
+            while len(_presigned_urls) >= PRESIGNED_URL_CACHE_MAX_ENTRIES:
+                del _presigned_urls[next(iter(_presigned_urls))]
+        _presigned_urls[key] = (presigned_url, now + PRESIGNED_URL_EXPIRES)
     print("Pre-signed url: ",presigned_url)
     return presigned_url
 
 def upload_to_s3(key, content):
-    """Upload the Markdown file to S3."""
-    s3_client.put_object(Bucket=bucket_name, Key=key, Body=content, ContentType="text/markdown")
+    """Upload the Markdown file to S3 and return the ETag of the stored object."""
+    response = s3_client.put_object(Bucket=bucket_name, Key=key, Body=content, ContentType="text/markdown")
     print(f"Markdown file uploaded successfully to s3://{bucket_name}/{key}")
+    return response['ETag'].strip('"')
+
+
+def upload_images_to_s3(images, folder=None, content_type="image/png"):
+    """
+    Uploads several images concurrently and returns their presigned URLs, in input order.
+
+    :param images: A list of (filename, binary content) pairs.
+    :param folder: Optional folder name in the S3 bucket (default is None).
+    :param content_type: MIME type of the images.
+    :return: Presigned URLs of the images that were uploaded; failed uploads are logged and skipped.
+    """
+    def upload(filename, image_content):
+        s3_key = f"{folder}/{filename}" if folder else filename
+        s3_client.put_object(Bucket=bucket_name, Key=s3_key, Body=image_content, ContentType=content_type)
+        print(f"{filename} uploaded successfully to {bucket_name}/{s3_key}")
+        return get_presigned_url(s3_key)
+
+    futures = [_upload_executor.submit(upload, filename, image_content) for filename, image_content in images]
+    presigned_urls = []
+    for (filename, _), future in zip(images, futures):
+        try:
+            presigned_urls.append(future.result())
+        except Exception as e:
+            print(f"Error uploading image {filename}: {e}")
+    return presigned_urls
+
+
+class S3UploadStream(io.RawIOBase):
+    """
+    Writable binary stream to an S3 object, sent as a multipart upload while it is being
+    written, so a large file is never held in memory whole. Objects smaller than one part
+    are sent with a single put_object on close. Leaving a `with` block with an exception
+    aborts the upload instead of storing a partial object.
+    """
+
+    def __init__(self, key, content_type=None, part_size=None):
+        super().__init__()
+        self.key = key
+        self.content_type = content_type
+        self.part_size = part_size or UPLOAD_PART_SIZE
+        self._buffer = bytearray()
+        self._position = 0
+        self._upload_id = None
+        self._parts = []
+        self._aborted = False
 
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def _extra_args(self):
+        return {"ContentType": self.content_type} if self.content_type else {}
+
+    def _upload_part(self, body):
+        if self._upload_id is None:
+            response = s3_client.create_multipart_upload(Bucket=bucket_name, Key=self.key, **self._extra_args())
+            self._upload_id = response["UploadId"]
+        part_number = len(self._parts) + 1
+        response = s3_client.upload_part(Bucket=bucket_name, Key=self.key, UploadId=self._upload_id,
+                                         PartNumber=part_number, Body=body)
+        self._parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+
+    def abort(self):
+        self._aborted = True
+        if self._upload_id is not None:
+            s3_client.abort_multipart_upload(Bucket=bucket_name, Key=self.key, UploadId=self._upload_id)
+            self._upload_id = None
+        super().close()
+
+    def close(self):
+        if self.closed:
+            return
+        if self._aborted:
+            return super().close()
+        try:
+            if self._upload_id is None:
+                s3_client.put_object(Bucket=bucket_name, Key=self.key, Body=bytes(self._buffer), **self._extra_args())
+            else:
+                if self._buffer:
+                    self._upload_part(bytes(self._buffer))
+                s3_client.complete_multipart_upload(Bucket=bucket_name, Key=self.key, UploadId=self._upload_id,
+                                                    MultipartUpload={"Parts": self._parts})
+            self._buffer = bytearray()
+        except Exception:
+            self.abort()
+            raise
+        super().close()
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+def delete_s3_objects(keys):
+    """Deletes objects from the bucket, up to 1000 keys per request."""
+    keys = list(keys)
+    for start in range(0, len(keys), 1000):
+        batch = keys[start:start + 1000]
+        s3_client.delete_objects(Bucket=bucket_name, Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True})
+    return len(keys)
+
+
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+
+def iter_image_urls_from_s3_folder(folder_name):
+    """Yields a presigned URL for each image file in a folder of the S3 bucket, page by page."""
+    for obj in iter_s3_objects(folder_name, suffixes=IMAGE_SUFFIXES):
+        # Get presigned URL for each image file (not the full URL)
+        yield get_presigned_url(obj["key"])
 
 def fetch_images_from_s3_folder(folder_name):
     """
@@ -146,30 +392,11 @@ def fetch_images_from_s3_folder(folder_name):
     :return: A list of pre-signed URLs for image files within the specified folder.
     """
     try:
-        # Ensure the folder_name ends with a slash (S3 treats folders as prefixes)
-        if not folder_name.endswith('/'):
-            folder_name += '/'
-
-        # List objects with the specified prefix (folder_name)
-        response = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=folder_name)
-
-        # Check if 'Contents' exists in the response (it won't if no files are found)
-        if 'Contents' not in response:
+        s3_image_urls = list(iter_image_urls_from_s3_folder(folder_name))
+        if not s3_image_urls:
             print(f"No files found in folder: {folder_name}")
             return []
 
-        # Construct the list of image files (based on file extensions)
-        s3_image_urls = []
-        for obj in response['Contents']:
-            key = obj['Key']  # The file key (e.g., "plots/my_image.png")
-            
-            # Filter image files based on common image extensions
-            if key.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
-                # Get presigned URL for each image file (not the full URL)
-                presigned_url = get_presigned_url(key)  # Pass only the key
-                if presigned_url:
-                    s3_image_urls.append(presigned_url)
-
         print(f"Found {len(s3_image_urls)} images in folder: {folder_name}")
         return s3_image_urls
 
@@ -0,0 +1,119 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def canonicalize_year_quarter_dict(year_quarter_dict):
+    """
+    Returns a hashable, order-independent key for a year -> quarters selection, so
+    {"2024": ["2", "1"]} and {2024: ["1", "2"]} share cache entries.
+    """
+    return tuple(sorted(
+        (str(year), tuple(sorted({str(q) for q in quarters})))
+        for year, quarters in year_quarter_dict.items()
+        if quarters
+    ))
+
+
+class SemanticCache:
+    """
+    In-memory cache of generated answers, looked up by meaning rather than exact text.
+
+    Entries are scoped by the canonicalized year/quarter selection; within a scope, a
+    lookup hits the most similar prior question whose (normalized) query embedding has
+    cosine similarity >= `threshold`. Entries expire after `ttl` seconds and the least
+    recently used entry is evicted once `max_entries` is reached.
+    """
+
+    def __init__(self, threshold=None, ttl=None, max_entries=None):
+        self.threshold = threshold if threshold is not None else float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+        self.max_entries = max_entries or int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+        self.enabled = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() != "false"
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # entry id -> (scope, embedding, answer, created_at), in LRU order
+        self._scopes = {}  # scope -> {entry id: None}
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _remove(self, entry_id):
+        scope = self._entries.pop(entry_id)[0]
+        scope_ids = self._scopes[scope]
+        del scope_ids[entry_id]
+        if not scope_ids:
+            del self._scopes[scope]
+
+    def lookup(self, year_quarter_dict, embedding):
+        """Returns the cached answer for the closest matching question, or None on a miss."""
+        if not self.enabled:
+            return None
+        scope = canonicalize_year_quarter_dict(year_quarter_dict)
+        query_vector = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            entry_ids = list(self._scopes.get(scope, ()))
+            for entry_id in entry_ids:
+                if now - self._entries[entry_id][3] > self.ttl:
+                    self._remove(entry_id)
+            entry_ids = list(self._scopes.get(scope, ()))
+            if not entry_ids:
+                self.misses += 1
+                return None
+
+            vectors = np.stack([self._entries[entry_id][1] for entry_id in entry_ids])
+            similarities = vectors @ query_vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            best_id = entry_ids[best]
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            logging.info(f"Semantic cache hit (similarity {similarities[best]:.3f}).")
+            return self._entries[best_id][2]
+
+    def store(self, year_quarter_dict, embedding, answer):
+        """Caches an answer for the question embedding within its year/quarter scope."""
+        if not self.enabled:
+            return
+        scope = canonicalize_year_quarter_dict(year_quarter_dict)
+        with self._lock:
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (scope, self._normalize(embedding), answer, time.time())
+            self._scopes.setdefault(scope, {})[entry_id] = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "threshold": self.threshold,
+                "ttl": self.ttl,
+            }
+
+
+# Shared cache for the Pinecone summarization agent
+answer_cache = SemanticCache()
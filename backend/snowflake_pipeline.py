@@ -1,101 +1,117 @@
 import yfinance as yf
 from dotenv import load_dotenv
 from pathlib import Path
-from .. import s3_utils
+from backend import s3_utils
+from backend import fin_data_mirror
+from backend.fin_data_targets import get_target, COLUMN_NAMES, TABLE_COLUMNS
+from backend.fin_data_parquet import PARQUET_PREFIX, FILE_SCHEMA, write_partitions
+from backend.indicator_panel import create_panel_report
 import numpy as np
-import io
+import pandas as pd
+import argparse
+import logging
 import snowflake.connector
 load_dotenv()
 import os
 
+# Bars of stored history an incremental update needs: the longest indicator window (MA30)
+INDICATOR_WINDOW = 30
+
+def add_indicators(df):
+    """
+    Adds DailyChange, DailyChangePercent, DollarVolume, MA10, MA30, Volatility20D and RSI
+    to a single ticker's bars (sorted by Date). Every indicator only looks back at most
+    INDICATOR_WINDOW bars, so recomputing over the last stored window plus new bars
+    reproduces the full-history values for the new bars.
+    """
+    # Some additional calculated columns that change daily
+    if 'Close' in df.columns and 'Open' in df.columns:
+        df['DailyChange'] = df['Close'] - df['Open']
+        df['DailyChangePercent'] = (df['Close'] / df['Open'] - 1) * 100
+
+    if 'Volume' in df.columns and 'Close' in df.columns:
+        df['DollarVolume'] = df['Volume'] * df['Close']
+
+    # Calculate 10-day and 30-day moving averages
+    # Handle NaN values for initial periods by filling with the value itself
+    if 'Close' in df.columns:
+        df['MA10'] = df['Close'].rolling(window=10, min_periods=1).mean()
+        df['MA30'] = df['Close'].rolling(window=30, min_periods=1).mean()
+
+    # Calculate volatility (standard deviation of returns over 20 days)
+    if 'Close' in df.columns:
+        # Calculate returns first
+        df['Returns'] = df['Close'].pct_change()
+
+        # Handle initial NaN value in Returns
+        df['Returns'] = df['Returns'].fillna(0)
+
+        # Calculate volatility with min_periods=1 to handle initial values
+        df['Volatility20D'] = df['Returns'].rolling(window=20, min_periods=1).std() * (252 ** 0.5)
+
+    # Calculate Relative Strength Index (RSI)
+    if 'Close' in df.columns:
+        delta = df['Close'].diff()
+        # Handle initial NaN value
+        delta = delta.fillna(0)
+
+        up = delta.clip(lower=0)
+        down = -1 * delta.clip(upper=0)
+
+        # Instead of ewm which produces initial NaNs, use rolling with expanding
+        # for the initial periods
+        up_mean = up.rolling(window=14, min_periods=1).mean()
+        down_mean = down.rolling(window=14, min_periods=1).mean()
+
+        # Avoid division by zero
+        down_mean = down_mean.replace(0, np.finfo(float).eps)
+
+        rs = up_mean / down_mean
+        df['RSI'] = 100 - (100 / (1 + rs))
+
+    # Remove intermediate calculation columns
+    if 'Returns' in df.columns:
+        df = df.drop('Returns', axis=1)
+    return df
+
+def add_year_quarter(df):
+    # Create 'year' and 'quarter' columns by extracting them from 'Date'
+    df['Year'] = df['Date'].dt.year
+    df['Quarter'] = df['Date'].dt.quarter
+    return df
+
+def fetch_history(ticker="NVDA", period="5y", start=None):
+    """Daily OHLCV bars for a ticker, from `start` (inclusive) if given, else over `period`."""
+    ticker_obj = yf.Ticker(ticker)
+    if start is not None:
+        hist_data = ticker_obj.history(start=start, auto_adjust=True)
+    else:
+        hist_data = ticker_obj.history(period=period, auto_adjust=True)
+
+    # Reset index to make Date a column, and add ticker column as the first column
+    df = hist_data.reset_index()
+    df.insert(0, 'Ticker', ticker)
+
+    # Remove Dividends and Stock Splits columns if they exist
+    return df.drop(columns=[col for col in ('Dividends', 'Stock Splits') if col in df.columns])
+
 def create_daily_historical_report(ticker="NVDA", period="5y", output_file=None):
     """
     Create a report with daily historical data and technical indicators
+    (also saved as CSV to `output_file`, if given; the load itself goes through Parquet)
     """
     print(f"🔍 Fetching daily historical data for {ticker} over {period}...")
     
-    # Create output directory if it doesn't exist
-    output_dir = Path("data")
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    if not output_file:
-        output_file = output_dir / f"{ticker}_daily_historical.csv"
-    
     try:
-        # Get ticker object
-        ticker_obj = yf.Ticker(ticker)
-        
-        # Get detailed historical data with all available columns
-        hist_data = ticker_obj.history(period=period, auto_adjust=True)
-        
-        # Reset index to make Date a column
-        df = hist_data.reset_index()
-        
-        # Add ticker column as the first column
-        df.insert(0, 'Ticker', ticker)
-        
-        # Some additional calculated columns that change daily
-        if 'Close' in df.columns and 'Open' in df.columns:
-            df['DailyChange'] = df['Close'] - df['Open']
-            df['DailyChangePercent'] = (df['Close'] / df['Open'] - 1) * 100
-        
-        if 'Volume' in df.columns and 'Close' in df.columns:
-            df['DollarVolume'] = df['Volume'] * df['Close']
-        
-        # Calculate 10-day and 30-day moving averages
-        # Handle NaN values for initial periods by filling with the value itself
-        if 'Close' in df.columns:
-            df['MA10'] = df['Close'].rolling(window=10, min_periods=1).mean()
-            df['MA30'] = df['Close'].rolling(window=30, min_periods=1).mean()
-        
-        # Calculate volatility (standard deviation of returns over 20 days)
-        if 'Close' in df.columns:
-            # Calculate returns first
-            df['Returns'] = df['Close'].pct_change()
-            
-            # Handle initial NaN value in Returns
-            df['Returns'] = df['Returns'].fillna(0)
-            
-            # Calculate volatility with min_periods=1 to handle initial values
-            df['Volatility20D'] = df['Returns'].rolling(window=20, min_periods=1).std() * (252 ** 0.5)
-        
-        # Calculate Relative Strength Index (RSI)
-        if 'Close' in df.columns:
-            delta = df['Close'].diff()
-            # Handle initial NaN value
-            delta = delta.fillna(0)
-            
-            up = delta.clip(lower=0)
-            down = -1 * delta.clip(upper=0)
-            
-            # Instead of ewm which produces initial NaNs, use rolling with expanding
-            # for the initial periods
-            up_mean = up.rolling(window=14, min_periods=1).mean()
-            down_mean = down.rolling(window=14, min_periods=1).mean()
-            
-            # Avoid division by zero
-            down_mean = down_mean.replace(0, np.finfo(float).eps)
-            
-            rs = up_mean / down_mean
-            df['RSI'] = 100 - (100 / (1 + rs))
-        
-        # Remove intermediate calculation columns
-        if 'Returns' in df.columns:
-            df = df.drop('Returns', axis=1)
-        
-        # Remove Dividends and Stock Splits columns if they exist
-        if 'Dividends' in df.columns:
-            df = df.drop('Dividends', axis=1)
-        
-        if 'Stock Splits' in df.columns:
-            df = df.drop('Stock Splits', axis=1)
-        
-        # Save to CSV
-        df.to_csv(output_file, index=False)
+        # Get detailed historical data and add the technical indicators
+        df = add_indicators(fetch_history(ticker, period))
         
         # Summary
         print(f"✅ Created daily historical report for {ticker} with {len(df)} rows and {len(df.columns)} columns")
-        print(f"📊 Report saved to: {output_file}")
+        if output_file:
+            Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+            df.to_csv(output_file, index=False)
+            print(f"📊 Report saved to: {output_file}")
         print(f"📈 Date range: {df['Date'].min()} to {df['Date'].max()}")
         
         return df
@@ -106,19 +122,20 @@ def create_daily_historical_report(ticker="NVDA", period="5y", output_file=None)
         traceback.print_exc()
         return None
 
-def upload_csv_to_s3(df):
-    # Convert DataFrame to CSV in memory (without index)
-    output_buffer = io.StringIO()
-    df.to_csv(output_buffer, index=False)
-    output_buffer.seek(0)  # Go to the beginning of the StringIO object
-
-    # Generate the filename with timestamp
-    filename = f"nvidia_data.csv"
-
-    # Upload the CSV to S3
-    s3_utils.upload_file_to_s3(output_buffer.getvalue(), filename, "csvFile")
-
-    print("File uploaded to s3")
+def upload_parquet_to_s3(df):
+    """
+    Streams the report to S3 as Parquet partitioned by Year/Quarter
+    (parquet/nvidia_fin_data/Year=2024/Quarter=1/data.parquet), then deletes partitions
+    left over from earlier loads. Returns the set of keys written.
+    """
+    written = {f"{PARQUET_PREFIX}/{path}" for path in write_partitions(
+        df, lambda path: s3_utils.S3UploadStream(f"{PARQUET_PREFIX}/{path}", content_type="application/vnd.apache.parquet"))}
+    stale = [obj["key"] for obj in s3_utils.iter_s3_objects(PARQUET_PREFIX, suffixes=(".parquet",))
+             if obj["key"] not in written]
+    if stale:
+        s3_utils.delete_s3_objects(stale)
+    print(f"Uploaded {len(written)} Parquet partitions to s3 ({len(stale)} stale partitions removed)")
+    return written
 
 def snowflake_connector():
     # Snowflake connection details
@@ -170,23 +187,21 @@ def snowflake_connector():
             STORAGE_ALLOWED_LOCATIONS = ('s3://nvidia-agentic-assistant/');
         """)
 
-    # Create CSV Format
-    def create_csv_format(cur):
+    # Create Parquet Format
+    def create_parquet_format(cur):
         cur.execute("""
-            CREATE OR REPLACE FILE FORMAT NVIDIA_CSV_FORMAT
-            TYPE = 'CSV'
-            FIELD_OPTIONALLY_ENCLOSED_BY = '"'
-            SKIP_HEADER = 1; -- Ensures the first row is treated as column headers
-
+            CREATE OR REPLACE FILE FORMAT NVIDIA_PARQUET_FORMAT
+            TYPE = 'PARQUET'
+            USE_LOGICAL_TYPE = TRUE; -- Read Date as a timestamp, not an integer
         """)
 
     # Create Stage
     def create_stage(cur):
-        cur.execute("""
-            CREATE STAGE IF NOT EXISTS NVIDIA_STAGE
-            URL = 's3://nvidia-agentic-assistant/csvFile/'
+        cur.execute(f"""
+            CREATE STAGE IF NOT EXISTS NVIDIA_PARQUET_STAGE
+            URL = 's3://nvidia-agentic-assistant/{PARQUET_PREFIX}/'
             STORAGE_INTEGRATION = nvidia_integration
-            FILE_FORMAT = (FORMAT_NAME = 'NVIDIA_CSV_FORMAT');
+            FILE_FORMAT = (FORMAT_NAME = 'NVIDIA_PARQUET_FORMAT');
         """)
 
     # Create Table by Inferring Schema
@@ -214,16 +229,22 @@ def snowflake_connector():
 
     # Load Data into Snowflake Table from Stage
     def load_data_into_snowflake(cur):
-        cur.execute("""
-            COPY INTO NVIDIA_FIN_DATA
-            FROM @NVIDIA_STAGE
-            FILES = ('nvidia_data.csv')
-            FILE_FORMAT = (FORMAT_NAME = 'NVIDIA_CSV_FORMAT')
+        # Columns are matched by name; Year and Quarter are only in the partition path,
+        # so they are derived from Date (the partition values are the same)
+        columns = list(FILE_SCHEMA.names)
+        select = ", ".join(f'$1:"{name}"::{sql_type}' for name, sql_type in TABLE_COLUMNS if name in columns)
+        cur.execute(f"""
+            COPY INTO NVIDIA_FIN_DATA ({", ".join(columns)}, Year, Quarter)
+            FROM (
+                SELECT {select}, YEAR($1:"Date"::TIMESTAMP), QUARTER($1:"Date"::TIMESTAMP)
+                FROM @NVIDIA_PARQUET_STAGE
+            )
+            PATTERN = '.*[.]parquet'
         """)
 
     # Calling functions
     create_storage_integration(cur)
-    create_csv_format(cur)
+    create_parquet_format(cur)
     create_stage(cur)
     create_table(cur)
     load_data_into_snowflake(cur)
@@ -235,14 +256,93 @@ def snowflake_connector():
     
 
 
+def _naive_dates(df):
+    # Tables store Date as TIMESTAMP_NTZ
+    df['Date'] = pd.to_datetime(df['Date'])
+    if df['Date'].dt.tz is not None:
+        df['Date'] = df['Date'].dt.tz_localize(None)
+    return df
+
+def load_full(target, ticker="NVDA", period="5y", fetch=None):
+    """Computes indicators over the whole history and upserts it into the target. Returns the number of rows loaded."""
+    fetch = fetch or fetch_history
+    df = add_indicators(_naive_dates(fetch(ticker, period=period)))
+    target.ensure_table()
+    return target.merge(add_year_quarter(df)[COLUMN_NAMES])
+
+def update_incremental(target, ticker="NVDA", fetch=None):
+    """
+    Fetches only the bars after the last stored date and upserts them with their indicators.
+
+    Indicators are recomputed over the last INDICATOR_WINDOW stored bars plus the new ones,
+    which is all the state they need (RSI here is a 14-bar rolling mean, not Wilder's
+    running average). The last stored bar is fetched again as an overlap check: auto-adjusted
+    prices are rescaled after a dividend or split, and then the whole history is reloaded.
+    Returns the number of rows merged.
+    """
+    fetch = fetch or fetch_history
+    target.ensure_table()
+    stored = target.last_rows(ticker, INDICATOR_WINDOW)
+    if stored.empty:
+        print(f"No stored rows for {ticker}; loading the full history.")
+        return load_full(target, ticker, fetch=fetch)
+
+    stored = _naive_dates(stored)
+    last_date = stored['Date'].iloc[-1]
+    fetched = _naive_dates(fetch(ticker, start=last_date.strftime("%Y-%m-%d")))
+
+    overlap = fetched[fetched['Date'] == last_date]
+    if not overlap.empty and not np.isclose(overlap['Close'].iloc[0], stored['Close'].iloc[-1], rtol=1e-6):
+        print(f"Adjusted prices for {ticker} changed since the last load; reloading the full history.")
+        return load_full(target, ticker, fetch=fetch)
+
+    new_bars = fetched[fetched['Date'] > last_date]
+    if new_bars.empty:
+        print(f"{ticker} is up to date through {last_date:%Y-%m-%d}.")
+        return 0
+
+    raw_columns = ['Ticker', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+    window = pd.concat([stored[raw_columns], new_bars[raw_columns]], ignore_index=True)
+    window['Volume'] = window['Volume'].astype('int64')
+    df = add_indicators(window).iloc[len(stored):]
+    print(f"📈 Merging {len(df)} new bars for {ticker}: {df['Date'].min()} to {df['Date'].max()}")
+    return target.merge(add_year_quarter(df)[COLUMN_NAMES])
+
+
 # Example usage
 if __name__ == "__main__":
-    df = create_daily_historical_report("NVDA", "5y")
-    # Create 'year' column by extracting the year from 'Date'
-    df['Year'] = df['Date'].dt.year
+    parser = argparse.ArgumentParser(description="Load daily bars and technical indicators into NVIDIA_FIN_DATA.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Fetch only the bars after the last stored date and merge them into the table.")
+    parser.add_argument("--target", choices=["snowflake", "duckdb"], default="snowflake",
+                        help="Table to load: Snowflake or the local DuckDB file.")
+    parser.add_argument("--tickers", nargs="+", default=["NVDA"],
+                        help="Tickers to load, e.g. NVDA AMD INTC TSM AVGO (several are computed as one panel).")
+    parser.add_argument("--csv", metavar="PATH",
+                        help="Also save the full load's report as CSV, e.g. data/NVDA_daily_historical.csv.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    target = get_target(args.target)
 
-    # Create 'quarter' column by extracting the quarter from 'Date'
-    df['Quarter'] = df['Date'].dt.quarter
-    print(len(df), type(df), df.columns)
-    upload_csv_to_s3(df)
-    snowflake_connector()
+    if args.incremental:
+        rows = sum(update_incremental(target, ticker) for ticker in args.tickers)
+        print(f"Merged {rows} rows into NVIDIA_FIN_DATA ({args.target}).")
+        if args.target == "snowflake" and rows:
+            fin_data_mirror.sync_from_snowflake()
+    else:
+        if len(args.tickers) > 1:
+            # All tickers' indicators in one vectorized pass over a (dates x tickers) panel
+            df = create_panel_report(args.tickers, "5y")
+            if args.csv:
+                df.to_csv(args.csv, index=False)
+        else:
+            df = add_year_quarter(create_daily_historical_report(args.tickers[0], "5y", args.csv))
+        print(len(df), type(df), df.columns)
+        if args.target == "duckdb":
+            target.ensure_table()
+            target.merge(_naive_dates(df)[COLUMN_NAMES])
+        else:
+            upload_parquet_to_s3(df)
+            snowflake_connector()
+            # Refresh the local query mirror from the table just loaded
+            fin_data_mirror.sync_from_snowflake()
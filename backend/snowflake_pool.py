@@ -0,0 +1,225 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+import snowflake.connector
+from dotenv import load_dotenv
+
+dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
+load_dotenv(dotenv_path)
+
+# Session context applied once when a pooled connection is opened
+DEFAULT_DATABASE = "NVIDIA_DB"
+DEFAULT_SCHEMA = "NVIDIA_SCHEMA"
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the acquire timeout."""
+
+
+class PoolClosed(Exception):
+    """Raised when a connection is requested after close_all()."""
+
+
+class SnowflakeConnectionPool:
+    """
+    Bounded, thread-safe pool of Snowflake connections.
+
+    At most `max_size` connections are open at once; callers beyond that wait up to
+    `acquire_timeout` seconds. Connections are opened lazily with the database, schema
+    (and warehouse, if configured) preset, so requests never run USE statements.
+    A connection that sat idle longer than `health_check_interval` is checked with
+    `SELECT 1` before it is handed out, and one idle longer than `idle_timeout` is
+    closed. A connection is always returned on exit from `connection()`; if the
+    caller's code raised and the connection is no longer usable, it is discarded.
+    """
+
+    def __init__(self, max_size=None, acquire_timeout=None, idle_timeout=None, health_check_interval=None,
+                 connect=None):
+        self.max_size = max_size or int(os.getenv("SNOWFLAKE_POOL_SIZE", "4"))
+        self.acquire_timeout = acquire_timeout or float(os.getenv("SNOWFLAKE_POOL_TIMEOUT", "30"))
+        self.idle_timeout = idle_timeout or float(os.getenv("SNOWFLAKE_POOL_IDLE_SECONDS", "600"))
+        self.health_check_interval = health_check_interval or float(os.getenv("SNOWFLAKE_POOL_HEALTH_CHECK_SECONDS", "60"))
+        self._connect = connect or self._open_connection
+        self._condition = threading.Condition()
+        self._idle = []  # (connection, returned_at), most recently returned last
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self.created = 0
+        self.closed = 0
+        self.acquired = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.failed_health_checks = 0
+
+    @staticmethod
+    def _open_connection():
+        params = {
+            "user": os.getenv("SNOWFLAKE_USER"),
+            "password": os.getenv("SNOWFLAKE_PASSWORD"),
+            "account": os.getenv("SNOWFLAKE_ACCOUNT"),
+            "role": os.getenv("SNOWFLAKE_ROLE"),
+            "database": os.getenv("SNOWFLAKE_DATABASE", DEFAULT_DATABASE),
+            "schema": os.getenv("SNOWFLAKE_SCHEMA", DEFAULT_SCHEMA),
+        }
+        if os.getenv("SNOWFLAKE_WAREHOUSE"):
+            params["warehouse"] = os.getenv("SNOWFLAKE_WAREHOUSE")
+        return snowflake.connector.connect(**params)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception as e:
+            logging.warning(f"Closing Snowflake connection failed: {e}")
+        with self._condition:
+            self._open -= 1
+            self.closed += 1
+            self._condition.notify()
+
+    def _evict_idle(self):
+        """Removes connections idle past idle_timeout; call with the condition held."""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [conn for conn, returned_at in self._idle if returned_at < cutoff]
+        self._idle = [(conn, returned_at) for conn, returned_at in self._idle if returned_at >= cutoff]
+        return expired
+
+    def _is_healthy(self, conn, returned_at):
+        if conn.is_closed():
+            return False
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            finally:
+                cur.close()
+            return True
+        except Exception as e:
+            logging.warning(f"Snowflake connection failed its health check: {e}")
+            return False
+
+    def acquire(self):
+        """Returns a connection, reusing an idle one or opening a new one if under max_size."""
+        start = time.monotonic()
+        deadline = start + self.acquire_timeout
+        while True:
+            with self._condition:
+                expired = self._evict_idle()
+                self._open -= len(expired)
+                self.closed += len(expired)
+                candidate = None
+                while candidate is None:
+                    if self._closed:
+                        raise PoolClosed("The Snowflake connection pool is closed.")
+                    if self._idle:
+                        candidate = self._idle.pop()
+                    elif self._open < self.max_size:
+                        self._open += 1
+                        candidate = (None, None)
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise PoolTimeout(f"No Snowflake connection available after {self.acquire_timeout}s "
+                                              f"({self._in_use} in use).")
+                        self._waiting += 1
+                        self._condition.wait(remaining)
+                        self._waiting -= 1
+            for conn in expired:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+            conn, returned_at = candidate
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._condition:
+                        self._open -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self.created += 1
+            elif not self._is_healthy(conn, returned_at):
+                with self._condition:
+                    self.failed_health_checks += 1
+                self._close(conn)
+                continue
+
+            waited = time.monotonic() - start
+            with self._condition:
+                self._in_use += 1
+                self.acquired += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            return conn
+
+    def release(self, conn, discard=False):
+        """
+        Returns a connection to the pool, or closes it if it is broken, `discard` is set or
+        the pool has been closed.
+        """
+        with self._condition:
+            self._in_use -= 1
+            if not (discard or self._closed or conn.is_closed()):
+                self._idle.append((conn, time.monotonic()))
+                self._condition.notify()
+                return
+        self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except Exception:
+            # Keep the connection only if it still answers; a failed query must not poison the pool
+            discard = not self._is_healthy(conn, 0)
+            raise
+        finally:
+            # Also runs when a generator holding the connection is closed early
+            self.release(conn, discard=discard)
+
+    def close_all(self):
+        """
+        Closes every idle connection and the pool itself: connections in use are closed when
+        released, and acquire() raises PoolClosed.
+        """
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self.closed += len(idle)
+            self._condition.notify_all()
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "created": self.created,
+                "closed": self.closed,
+                "acquired": self.acquired,
+                "failed_health_checks": self.failed_health_checks,
+                "avg_wait_ms": round(1000 * self.wait_seconds / self.acquired, 3) if self.acquired else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait_seconds, 3),
+            }
+
+
+# Shared pool used by the snowflake agent
+snowflake_pool = SnowflakeConnectionPool()
@@ -0,0 +1,265 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+# Placeholder for the ticker and year/quarter predicate in cached and template SQL
+FILTER_PLACEHOLDER = "{year_quarter_filter}"
+
+# NVIDIA_FIN_DATA holds peers too (AMD, INTC, ...); questions are answered for this ticker
+DEFAULT_TICKER = os.getenv("FIN_DATA_TICKER", "NVDA")
+TICKER_PATTERN = re.compile(r"^[A-Z0-9.^=-]{1,15}$")
+# How questions name the tickers loaded into NVIDIA_FIN_DATA
+TICKER_NAMES = {
+    "NVDA": ("nvda", "nvidia"),
+    "AMD": ("amd", "advanced micro devices"),
+    "INTC": ("intc", "intel"),
+    "TSM": ("tsm", "tsmc", "taiwan semiconductor"),
+    "AVGO": ("avgo", "broadcom"),
+}
+TICKER_NAME_PATTERNS = {
+    ticker: re.compile(r"\b(?:" + "|".join(re.escape(name) for name in names) + r")\b")
+    for ticker, names in TICKER_NAMES.items()
+}
+
+# Metric intents answered without the LLM: (phrases, columns), checked in order
+METRIC_INTENTS = [
+    (("opening", "open price", "closing", "close price"), ("OPEN", "CLOSE")),
+    (("high and low", "high price", "low price", "high prices", "low prices"), ("HIGH", "LOW")),
+    (("10-day moving average", "10 day moving average", "ma10"), ("MA10",)),
+    (("30-day moving average", "30 day moving average", "ma30"), ("MA30",)),
+    (("moving average",), ("MA10", "MA30")),
+    (("daily change percent", "daily change percentage", "percentage change", "percent change"), ("DAILYCHANGEPERCENT",)),
+    (("daily change",), ("DAILYCHANGE", "DAILYCHANGEPERCENT")),
+    (("dollar volume",), ("DOLLARVOLUME",)),
+    (("volume", "shares traded"), ("VOLUME",)),
+    (("volatility",), ("VOLATILITY20D",)),
+    (("rsi", "relative strength"), ("RSI",)),
+]
+# Words a templated question may contain besides metric phrases; anything else (conditions,
+# aggregates, other periods, ...) needs the LLM
+FILLER_WORDS = {
+    "a", "all", "an", "and", "are", "as", "both", "by", "chart", "daily", "data", "day", "days", "did",
+    "display", "do", "does", "during", "each", "for", "from", "get", "give", "graph", "how", "in", "is",
+    "its", "list", "me", "of", "on", "over", "period", "please", "plot", "price", "prices",
+    "quarter", "quarters", "s", "selected", "share", "shares", "show", "stock", "the", "time", "to", "trend",
+    "value", "values", "vs", "versus", "was", "were", "what", "with",
+}
+TEMPLATE_SQL = "SELECT DATE, {columns}, YEAR, QUARTER FROM NVIDIA_FIN_DATA WHERE {year_quarter_filter} ORDER BY DATE;"
+
+WHERE_PATTERN = re.compile(r"\bWHERE\b(.*?)(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bQUALIFY\b|;|$)", re.IGNORECASE | re.DOTALL)
+CLAUSE_END_PATTERN = re.compile(r"\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bQUALIFY\b|$", re.IGNORECASE)
+# Words a WHERE clause may contain and still be only a ticker/year/quarter filter
+FILTER_WORDS = {"ticker", "year", "quarter", "and", "or", "in", "between", "not"}
+
+
+def normalize_question(question):
+    """Lowercases and strips punctuation, so trivially different phrasings share a cache entry."""
+    question = re.sub(r"[^\w\s%-]", " ", question.lower())
+    return re.sub(r"\s+", " ", question).strip()
+
+
+def year_quarter_filter(year_quarter_dict):
+    """SQL predicate for a year -> quarters selection. Values are validated as integers."""
+    clauses = []
+    for year, quarters in sorted(year_quarter_dict.items()):
+        quarters = sorted({int(q) for q in quarters})
+        if quarters:
+            clauses.append(f"(YEAR = {int(year)} AND QUARTER IN ({', '.join(map(str, quarters))}))")
+    if not clauses:
+        raise ValueError("At least one year and quarter is required.")
+    return "(" + " OR ".join(clauses) + ")"
+
+
+def ticker_literal(ticker=None):
+    """Quoted ticker symbol for SQL. The symbol is validated, not escaped."""
+    ticker = (ticker or DEFAULT_TICKER).upper()
+    if not TICKER_PATTERN.match(ticker):
+        raise ValueError(f"Invalid ticker '{ticker}'.")
+    return f"'{ticker}'"
+
+
+def ticker_filter(ticker=None):
+    """SQL predicate selecting one ticker."""
+    return f"TICKER = {ticker_literal(ticker)}"
+
+
+def question_tickers(question):
+    """Tickers of TICKER_NAMES the question names, in TICKER_NAMES order."""
+    text = normalize_question(question)
+    return [ticker for ticker, pattern in TICKER_NAME_PATTERNS.items() if pattern.search(text)]
+
+
+def render_sql(sql_template, year_quarter_dict, ticker=None):
+    return sql_template.replace(FILTER_PLACEHOLDER, f"{ticker_filter(ticker)} AND {year_quarter_filter(year_quarter_dict)}")
+
+
+def template_sql(question):
+    """
+    Maps a recognized metric question (opening/closing price, moving averages, daily change,
+    ...) to parameterized SQL over NVIDIA_FIN_DATA, or returns None. Only questions made of
+    metric phrases and FILLER_WORDS qualify.
+    """
+    text = normalize_question(question)
+    for pattern in TICKER_NAME_PATTERNS.values():
+        text = pattern.sub(" ", text)  # the ticker is chosen by resolve_sql
+    columns = []
+    for phrases, intent_columns in METRIC_INTENTS:
+        pattern = re.compile(r"\b(?:" + "|".join(re.escape(phrase) for phrase in phrases) + r")\b")
+        # Remove matches so "dollar volume" does not also match "volume"
+        text, matched = pattern.subn(" ", text)
+        if matched:
+            columns.extend(column for column in intent_columns if column not in columns)
+    if not columns or not set(text.split()) <= FILLER_WORDS:
+        return None
+    return TEMPLATE_SQL.format(columns=", ".join(columns), year_quarter_filter=FILTER_PLACEHOLDER)
+
+
+def parameterize_sql(sql, ticker=None):
+    """
+    Replaces the WHERE clause of generated SQL with the ticker/year/quarter placeholder.
+    Returns None if the clause filters on anything besides Year, Quarter and `ticker`
+    (default DEFAULT_TICKER), since that SQL is only valid for the question it was
+    generated for.
+    """
+    sql = sql.strip().rstrip(";")
+    matches = list(WHERE_PATTERN.finditer(sql))
+    if len(matches) != 1:
+        return None
+    match = matches[0]
+    words = set(re.findall(r"[a-z_]+", re.sub(r"'[^']*'", " ", match.group(1).lower())))
+    if not words <= FILTER_WORDS:
+        return None
+    literals = {literal.upper() for literal in re.findall(r"'([^']*)'", match.group(1))}
+    if literals - {(ticker or DEFAULT_TICKER).upper()}:
+        return None
+    return f"{sql[:match.start(1)]} {FILTER_PLACEHOLDER} {sql[match.end(1):]}".rstrip() + ";"
+
+
+def require_ticker_filter(sql, tickers):
+    """
+    Returns generated SQL restricted to `tickers`: unchanged if its WHERE clause already
+    filters on TICKER, otherwise with the ticker predicate added to its WHERE clause. Raises
+    ValueError for SQL the predicate cannot be added to safely (subqueries, joins, ...),
+    since NVIDIA_FIN_DATA mixes tickers.
+    """
+    body = sql.strip().rstrip(";")
+    matches = list(WHERE_PATTERN.finditer(body))
+    if any(re.search(r"\bTICKER\b", re.sub(r"'[^']*'", " ", match.group(1)), re.IGNORECASE) for match in matches):
+        return sql
+    if len(tickers) == 1:
+        predicate = ticker_filter(tickers[0])
+    else:
+        predicate = f"TICKER IN ({', '.join(map(ticker_literal, tickers))})"
+    if len(re.findall(r"\b(?:SELECT|JOIN|UNION)\b", body, re.IGNORECASE)) != 1 or len(matches) > 1:
+        raise ValueError("Generated SQL does not filter on TICKER and cannot be restricted to the requested tickers.")
+    if matches:
+        match = matches[0]
+        body = f"{body[:match.start(1)]} {predicate} AND ({match.group(1).strip()}) {body[match.end(1):]}"
+    else:
+        end = CLAUSE_END_PATTERN.search(body).start()
+        body = f"{body[:end].rstrip()} WHERE {predicate} {body[end:]}"
+    logging.info("Generated SQL did not filter on TICKER; added the ticker predicate.")
+    return body.strip() + ";"
+
+
+class SqlCache:
+    """
+    LRU cache of generated SQL templates keyed by the normalized question.
+
+    Templates hold FILTER_PLACEHOLDER instead of literal years and quarters, so one
+    entry serves the same question for any selection. Entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or int(os.getenv("SQL_CACHE_MAX_ENTRIES", "500"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("SQL_CACHE_TTL", "86400"))
+        self.enabled = os.getenv("SQL_CACHE_ENABLED", "true").lower() != "false"
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # normalized question -> (sql template, created_at)
+        self.hits = 0
+        self.misses = 0
+        self.template_hits = 0
+
+    def lookup(self, question):
+        if not self.enabled:
+            return None
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def store(self, question, sql_template):
+        if not self.enabled:
+            return
+        key = normalize_question(question)
+        with self._lock:
+            self._entries[key] = (sql_template, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_template_hit(self):
+        with self._lock:
+            self.template_hits += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "template_hits": self.template_hits,
+            }
+
+
+def resolve_sql(question, year_quarter_dict, generate, cache=None):
+    """
+    Returns (sql, source) for a question: a metric template, a cached template, or SQL
+    produced by `generate(question, year_quarter_dict)` (the LLM), which is cached when
+    it can be parameterized. `source` is "template", "cache" or "llm".
+
+    Questions are answered for the ticker they name (DEFAULT_TICKER if none); questions
+    naming several tickers always go to the LLM, and its SQL is restricted to those tickers.
+    """
+    cache = cache or sql_cache
+    tickers = question_tickers(question) or [DEFAULT_TICKER]
+    ticker = tickers[0] if len(tickers) == 1 else None
+    if ticker is not None:
+        sql_template = template_sql(question)
+        if sql_template is not None:
+            cache.record_template_hit()
+            return render_sql(sql_template, year_quarter_dict, ticker), "template"
+
+        sql_template = cache.lookup(question)
+        if sql_template is not None:
+            return render_sql(sql_template, year_quarter_dict, ticker), "cache"
+
+    sql = generate(question, year_quarter_dict)
+    if sql:
+        sql = require_ticker_filter(sql, tickers)
+        sql_template = parameterize_sql(sql, ticker) if ticker is not None else None
+        if sql_template is not None:
+            cache.store(question, sql_template)
+        else:
+            logging.info("Generated SQL filters on more than one ticker, Year and Quarter; not caching it.")
+    return sql, "llm"
+
+
+# Shared instance used by the snowflake agent
+sql_cache = SqlCache()
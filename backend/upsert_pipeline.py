@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from backend.ocr_pool import call_with_retries
+
+# Pinecone rejects upsert requests over 2 MB; stay well below it
+DEFAULT_MAX_BATCH_BYTES = 1_500_000
+DEFAULT_MAX_BATCH_VECTORS = 100
+# Serialized size of one float in an upsert request (JSON text is the worst case)
+BYTES_PER_VALUE = 12
+RECORD_OVERHEAD_BYTES = 64
+
+
+def chunk_records(chunks, year, quarter, filename):
+    """Vector ids and metadata for a document's chunks, in chunk order."""
+    ids, metadatas = [], []
+    for i, chunk in enumerate(chunks):
+        metadata = {
+            "text": chunk["content"],
+            "header": chunk.get("merged_headers", "No Header"),
+            "level": str(chunk.get("level", "Unknown")),
+            "part": str(chunk.get("part")) if chunk.get("part") is not None else "None",
+            "year": year,
+            "quarter": quarter,
+            "filename": filename
+        }
+        ids.append(f"{year}_{quarter}_{i}")
+        metadatas.append(metadata)
+    return ids, metadatas
+
+
+def estimate_record_bytes(vector_id, metadata, dimension):
+    return len(vector_id) + len(json.dumps(metadata)) + dimension * BYTES_PER_VALUE + RECORD_OVERHEAD_BYTES
+
+
+def split_upsert_batches(ids, vectors, metadatas, max_vectors, max_bytes):
+    """
+    Splits records into upsert batches bounded by vector count and estimated request size.
+    Yields (start, end) row ranges; vectors stay float32 until the store serializes them.
+    """
+    dimension = vectors.shape[1]
+    start, batch_bytes = 0, 0
+    for row in range(len(ids)):
+        record_bytes = estimate_record_bytes(ids[row], metadatas[row], dimension)
+        if row > start and (row - start >= max_vectors or batch_bytes + record_bytes > max_bytes):
+            yield start, row
+            start, batch_bytes = row, 0
+        batch_bytes += record_bytes
+    if start < len(ids):
+        yield start, len(ids)
+
+
+class UpsertMetrics:
+    """Throughput counters for one pipeline run."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.chunks_encoded = 0
+        self.vectors_upserted = 0
+        self.upsert_requests = 0
+        self.encode_seconds = 0.0
+        self.upsert_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_upsert(self, vectors, seconds):
+        with self._lock:
+            self.vectors_upserted += vectors
+            self.upsert_requests += 1
+            self.upsert_seconds += seconds
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        return {
+            "chunks": self.chunks_encoded,
+            "vectors": self.vectors_upserted,
+            "upsert_requests": self.upsert_requests,
+            "elapsed_seconds": round(elapsed, 3),
+            "encode_seconds": round(self.encode_seconds, 3),
+            "upsert_seconds": round(self.upsert_seconds, 3),
+            "chunks_per_sec": round(self.chunks_encoded / elapsed, 2),
+            "vectors_per_sec": round(self.vectors_upserted / elapsed, 2),
+        }
+
+
+class EmbeddingUpserter:
+    """
+    Embeds chunks from many documents and upserts them into a vector store.
+
+    Chunks are pooled across documents into large encode batches. Each encoded batch
+    is split into size-aware upsert batches that are sent concurrently (with retries)
+    while the next batch is being encoded. `on_document_done(document, count)` runs once
+    all of a document's vectors are stored; `on_document_failed(document, error)` runs if
+    any of its batches fails after retries.
+    """
+
+    def __init__(self, model, vector_store, encode_batch_size=None, max_batch_vectors=None,
+                 max_batch_bytes=None, max_workers=None, max_retries=3):
+        self.model = model
+        self.vector_store = vector_store
+        self.encode_batch_size = encode_batch_size or int(os.getenv("EMBED_BATCH_SIZE", "256"))
+        self.max_batch_vectors = max_batch_vectors or int(os.getenv("UPSERT_BATCH_VECTORS", str(DEFAULT_MAX_BATCH_VECTORS)))
+        self.max_batch_bytes = max_batch_bytes or int(os.getenv("UPSERT_BATCH_BYTES", str(DEFAULT_MAX_BATCH_BYTES)))
+        self.max_workers = max_workers or int(os.getenv("UPSERT_WORKERS", "4"))
+        self.max_retries = max_retries
+        # The local store rewrites a partition per call, so it gets whole encode batches
+        if getattr(vector_store, "name", None) == "local":
+            self.max_batch_vectors = self.max_batch_bytes = float("inf")
+
+    def _upsert(self, ids, vectors, metadatas, metrics):
+        start = time.perf_counter()
+        call_with_retries(self.vector_store.upsert, ids, vectors, metadatas,
+                          max_retries=self.max_retries, base_delay=1.0, label="Upsert")
+        metrics.add_upsert(len(ids), time.perf_counter() - start)
+
+    def run(self, documents, on_document_done=None, on_document_failed=None):
+        """
+        `documents` is an iterable of dicts with 'chunks', 'year', 'quarter' and 'filename'
+        (extra keys are passed through to the callbacks). Returns the throughput summary.
+        """
+        metrics = UpsertMetrics()
+        pending_rows = {}  # sequence number -> rows not yet stored
+        failed_docs = set()
+        lock = threading.Lock()
+
+        def finish_rows(owners):
+            """Mark rows stored; `owners` lists (sequence number, document, row count in the batch)."""
+            completed = []
+            with lock:
+                for key, document, count in owners:
+                    if key in failed_docs:
+                        continue
+                    pending_rows[key] -= count
+                    if pending_rows[key] == 0:
+                        del pending_rows[key]
+                        completed.append(document)
+            for document in completed:
+                if on_document_done:
+                    on_document_done(document, len(document["chunks"]))
+
+        def fail_rows(owners, error):
+            newly_failed = []
+            with lock:
+                for key, document, _ in owners:
+                    if key not in failed_docs:
+                        failed_docs.add(key)
+                        pending_rows.pop(key, None)
+                        newly_failed.append(document)
+            for document in newly_failed:
+                logging.error(f"Upserting {document.get('filename')} failed: {error}")
+                if on_document_failed:
+                    on_document_failed(document, error)
+
+        def on_batch_done(future, owners):
+            error = future.exception()
+            if error is not None:
+                fail_rows(owners, error)
+            else:
+                finish_rows(owners)
+
+        def flush(buffer, executor, in_flight):
+            texts = [text for _, _, _, _, text in buffer]
+            start = time.perf_counter()
+            vectors = np.asarray(self.model.encode(texts), dtype=np.float32)
+            metrics.encode_seconds += time.perf_counter() - start
+            metrics.chunks_encoded += len(texts)
+
+            ids = [vector_id for _, _, vector_id, _, _ in buffer]
+            metadatas = [metadata for _, _, _, metadata, _ in buffer]
+            for batch_start, batch_end in split_upsert_batches(ids, vectors, metadatas,
+                                                               self.max_batch_vectors, self.max_batch_bytes):
+                owners = {}
+                for key, document, _, _, _ in buffer[batch_start:batch_end]:
+                    owners.setdefault(key, [key, document, 0])[2] += 1
+                owners = [tuple(owner) for owner in owners.values()]
+
+                # Backpressure: keep at most 2x workers requests queued
+                while len(in_flight) >= 2 * self.max_workers:
+                    done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        in_flight.discard(future)
+                future = executor.submit(self._upsert, ids[batch_start:batch_end],
+                                         vectors[batch_start:batch_end], metadatas[batch_start:batch_end], metrics)
+                future.add_done_callback(lambda f, owners=owners: on_batch_done(f, owners))
+                in_flight.add(future)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="upsert") as executor:
+            in_flight = set()
+            buffer = deque()
+            # Documents are keyed by their position in this run: id() can be reused once a
+            # finished document is garbage collected
+            for key, document in enumerate(documents):
+                try:
+                    ids, metadatas = chunk_records(document["chunks"], document["year"], document["quarter"], document["filename"])
+                except Exception as e:
+                    fail_rows([(key, document, 0)], e)
+                    continue
+                if not ids:
+                    if on_document_done:
+                        on_document_done(document, 0)
+                    continue
+                with lock:
+                    pending_rows[key] = len(ids)
+                for vector_id, metadata in zip(ids, metadatas):
+                    buffer.append((key, document, vector_id, metadata, metadata["text"]))
+                while len(buffer) >= self.encode_batch_size:
+                    batch = [buffer.popleft() for _ in range(self.encode_batch_size)]
+                    try:
+                        flush(batch, executor, in_flight)
+                    except Exception as e:
+                        fail_rows([(key, doc, 0) for key, doc, _, _, _ in batch], e)
+            if buffer:
+                batch = list(buffer)
+                try:
+                    flush(batch, executor, in_flight)
+                except Exception as e:
+                    fail_rows([(key, doc, 0) for key, doc, _, _, _ in batch], e)
+
+        summary = metrics.summary()
+        logging.info(
+            f"Upserted {summary['vectors']} vectors from {summary['chunks']} chunks in {summary['elapsed_seconds']}s "
+            f"({summary['chunks_per_sec']} chunks/sec, {summary['vectors_per_sec']} vectors/sec)."
+        )
+        return summary
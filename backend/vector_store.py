@@ -0,0 +1,259 @@
+import os
+import json
+import logging
+import threading
+import numpy as np
+
+DEFAULT_LOCAL_STORE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "vector_store"))
+
+
+class PineconeVectorStore:
+    """Vector store backed by the serverless Pinecone index (the system default)."""
+
+    name = "pinecone"
+
+    def __init__(self, index):
+        self.index = index
+
+    def upsert(self, ids, vectors, metadatas):
+        """Inserts or overwrites vectors; `vectors` is an (n, dim) float32 array."""
+        items = [
+            (vector_id, vector.tolist(), metadata)
+            for vector_id, vector, metadata in zip(ids, vectors, metadatas)
+        ]
+        self.index.upsert(items)
+        return len(items)
+
+    def query(self, vector, top_k, year, quarter):
+        """Returns the top_k matches ({'id', 'score', 'metadata'}) within one (year, quarter)."""
+        results = self.index.query(
+            vector=[list(map(float, vector))],
+            top_k=top_k,
+            include_metadata=True,
+            filter={
+                "year": {"$eq": str(year)},
+                "quarter": {"$eq": str(quarter)}
+            }
+        )
+        return results.get("matches", [])
+
+    def delete(self, ids):
+        if ids:
+            self.index.delete(ids=list(ids))
+
+    def describe_index_stats(self):
+        stats = self.index.describe_index_stats()
+        return {
+            "total_vector_count": getattr(stats, "total_vector_count", None),
+            "dimension": getattr(stats, "dimension", None),
+        }
+
+
+class _Partition:
+    """Vectors and metadata for one (year, quarter), loaded from disk."""
+
+    __slots__ = ("ids", "rows", "metadatas", "vectors", "hnsw")
+
+    def __init__(self, ids, metadatas, vectors, hnsw=None):
+        self.ids = ids
+        self.rows = {vector_id: row for row, vector_id in enumerate(ids)}
+        self.metadatas = metadatas
+        self.vectors = vectors
+        self.hnsw = hnsw
+
+
+class LocalVectorStore:
+    """
+    In-process vector store for offline use and tests.
+
+    Vectors are partitioned by (year, quarter), matching how the agents always filter.
+    Each partition directory holds a raw float32 matrix of L2-normalized vectors
+    (`vectors.f32`, memory-mapped for queries) and `metadata.jsonl` with one
+    {"id", "metadata"} record per row. A query is a single dot product over the rows of
+    the selected partition, so scores are cosine similarities, as with the Pinecone index.
+    Partitions with at least `hnsw_threshold` rows also get an HNSW index (requires
+    hnswlib) for approximate search.
+    """
+
+    name = "local"
+
+    def __init__(self, path=None, dimension=384, hnsw_threshold=None):
+        self.path = path or os.getenv("LOCAL_VECTOR_STORE_PATH", DEFAULT_LOCAL_STORE_PATH)
+        self.dimension = dimension
+        self.hnsw_threshold = hnsw_threshold or int(os.getenv("LOCAL_VECTOR_HNSW_THRESHOLD", "50000"))
+        self._partitions = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def _partition_dir(self, year, quarter):
+        return os.path.join(self.path, f"{year}_{quarter}")
+
+    def _load_partition(self, year, quarter):
+        key = (str(year), str(quarter))
+        partition = self._partitions.get(key)
+        if partition is not None:
+            return partition
+
+        directory = self._partition_dir(*key)
+        metadata_path = os.path.join(directory, "metadata.jsonl")
+        if not os.path.exists(metadata_path):
+            return None
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        ids = [record["id"] for record in records]
+        metadatas = [record["metadata"] for record in records]
+        vectors = np.memmap(os.path.join(directory, "vectors.f32"), dtype=np.float32, mode="r",
+                            shape=(len(ids), self.dimension)) if ids else np.empty((0, self.dimension), dtype=np.float32)
+
+        hnsw = None
+        hnsw_path = os.path.join(directory, "index.hnsw")
+        if os.path.exists(hnsw_path):
+            try:
+                import hnswlib
+                hnsw = hnswlib.Index(space="ip", dim=self.dimension)
+                hnsw.load_index(hnsw_path, max_elements=len(ids))
+            except ImportError:
+                logging.warning("hnswlib is not installed; using exact search for large partitions.")
+
+        partition = _Partition(ids, metadatas, vectors, hnsw)
+        self._partitions[key] = partition
+        return partition
+
+    def _write_partition(self, year, quarter, ids, metadatas, vectors):
+        directory = self._partition_dir(year, quarter)
+        os.makedirs(directory, exist_ok=True)
+        self._partitions.pop((str(year), str(quarter)), None)
+
+        # Write to temporary files and swap them in, so readers never see a partial partition
+        vectors_path = os.path.join(directory, "vectors.f32")
+        np.ascontiguousarray(vectors, dtype=np.float32).tofile(vectors_path + ".tmp")
+        with open(os.path.join(directory, "metadata.jsonl.tmp"), "w", encoding="utf-8") as f:
+            for vector_id, metadata in zip(ids, metadatas):
+                f.write(json.dumps({"id": vector_id, "metadata": metadata}) + "\n")
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(os.path.join(directory, "metadata.jsonl.tmp"), os.path.join(directory, "metadata.jsonl"))
+
+        hnsw_path = os.path.join(directory, "index.hnsw")
+        if len(ids) >= self.hnsw_threshold:
+            try:
+                import hnswlib
+                hnsw = hnswlib.Index(space="ip", dim=self.dimension)
+                hnsw.init_index(max_elements=len(ids), ef_construction=200, M=16)
+                hnsw.add_items(vectors, np.arange(len(ids)))
+                hnsw.save_index(hnsw_path)
+            except ImportError:
+                logging.warning("hnswlib is not installed; skipping HNSW index build.")
+        elif os.path.exists(hnsw_path):
+            os.remove(hnsw_path)
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.clip(norms, 1e-12, None)
+
+    def upsert(self, ids, vectors, metadatas):
+        """Inserts or overwrites vectors; each metadata dict must carry 'year' and 'quarter'."""
+        vectors = self._normalize(np.atleast_2d(vectors))
+        groups = {}
+        for row, (vector_id, metadata) in enumerate(zip(ids, metadatas)):
+            key = (str(metadata["year"]), str(metadata["quarter"]))
+            groups.setdefault(key, []).append(row)
+
+        with self._lock:
+            for (year, quarter), rows in groups.items():
+                partition = self._load_partition(year, quarter)
+                if partition is None:
+                    new_ids, new_metadatas = [], []
+                    new_vectors = np.empty((0, self.dimension), dtype=np.float32)
+                else:
+                    new_ids, new_metadatas = list(partition.ids), list(partition.metadatas)
+                    new_vectors = np.array(partition.vectors, dtype=np.float32)
+                positions = {vector_id: position for position, vector_id in enumerate(new_ids)}
+
+                appended = []
+                for row in rows:
+                    position = positions.get(ids[row])
+                    if position is None:
+                        positions[ids[row]] = len(new_ids)
+                        new_ids.append(ids[row])
+                        new_metadatas.append(metadatas[row])
+                        appended.append(row)
+                    else:
+                        new_metadatas[position] = metadatas[row]
+                        new_vectors[position] = vectors[row]
+                if appended:
+                    new_vectors = np.concatenate([new_vectors, vectors[appended]], axis=0)
+
+                self._write_partition(year, quarter, new_ids, new_metadatas, new_vectors)
+        return len(ids)
+
+    def query(self, vector, top_k, year, quarter):
+        """Returns the top_k matches ({'id', 'score', 'metadata'}) within one (year, quarter)."""
+        with self._lock:
+            partition = self._load_partition(year, quarter)
+        if partition is None or not partition.ids:
+            return []
+
+        query_vector = self._normalize(vector).ravel()
+        top_k = min(top_k, len(partition.ids))
+        if partition.hnsw is not None:
+            partition.hnsw.set_ef(max(top_k * 2, 50))
+            labels, distances = partition.hnsw.knn_query(query_vector, k=top_k)
+            rows, scores = labels[0], 1.0 - distances[0]
+        else:
+            all_scores = partition.vectors @ query_vector
+            rows = np.argpartition(-all_scores, top_k - 1)[:top_k]
+            rows = rows[np.argsort(-all_scores[rows], kind="stable")]
+            scores = all_scores[rows]
+
+        return [
+            {"id": partition.ids[row], "score": float(score), "metadata": partition.metadatas[row]}
+            for row, score in zip(rows, scores)
+        ]
+
+    def delete(self, ids):
+        ids = set(ids)
+        if not ids:
+            return
+        with self._lock:
+            for name in os.listdir(self.path):
+                if "_" not in name:
+                    continue
+                year, quarter = name.split("_", 1)
+                partition = self._load_partition(year, quarter)
+                if partition is None or not ids.intersection(partition.rows):
+                    continue
+                keep = [row for row, vector_id in enumerate(partition.ids) if vector_id not in ids]
+                self._write_partition(
+                    year, quarter,
+                    [partition.ids[row] for row in keep],
+                    [partition.metadatas[row] for row in keep],
+                    np.array(partition.vectors, dtype=np.float32)[keep],
+                )
+
+    def describe_index_stats(self):
+        with self._lock:
+            counts = {}
+            for name in sorted(os.listdir(self.path)):
+                if "_" in name:
+                    partition = self._load_partition(*name.split("_", 1))
+                    if partition is not None:
+                        counts[name] = len(partition.ids)
+        return {
+            "total_vector_count": sum(counts.values()),
+            "dimension": self.dimension,
+            "partitions": counts,
+        }
+
+
+def get_vector_store(name=None, index=None, dimension=384):
+    """Returns the vector store selected by `name` or the VECTOR_STORE env var."""
+    name = name or os.getenv("VECTOR_STORE", PineconeVectorStore.name)
+    if name == PineconeVectorStore.name:
+        if index is None:
+            raise ValueError("A Pinecone index is required for the pinecone vector store.")
+        return PineconeVectorStore(index)
+    if name == LocalVectorStore.name:
+        return LocalVectorStore(dimension=dimension)
+    raise ValueError(f"Unknown vector store '{name}'. Choose 'pinecone' or 'local'.")
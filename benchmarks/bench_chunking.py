@@ -0,0 +1,187 @@
+"""
+Microbenchmark: streaming offset-based chunker vs. the original list-building chunker.
+
+Generates a synthetic 10-K-sized markdown document, checks that both implementations
+produce identical chunks, and reports wall time and peak traced memory for each.
+
+    python -m benchmarks.bench_chunking [size_mb]
+"""
+import re
+import sys
+import time
+import random
+import tracemalloc
+from backend.markdown_chunking import chunk_markdown_by_headers, iter_markdown_chunks
+
+
+def reference_chunk_markdown_by_headers(markdown_text, ideal_word_count=500, min_content_chars=200):
+    """The original list-building implementation, kept as the benchmark baseline."""
+    # Define the threshold to split: 1.5 * ideal_word_count
+    split_threshold = int(1.5 * ideal_word_count)
+    
+    # Regex to match markdown headers at the beginning of a line.
+    header_pattern = re.compile(r'^(#{1,6})\s*(.+)$', re.MULTILINE)
+    
+    # Find all header matches with their start positions.
+    matches = list(header_pattern.finditer(markdown_text))
+    
+    # If no header is found, treat the entire text as one chunk.
+    if not matches:
+        return [{
+            'header': None,
+            'level': None,
+            'content': markdown_text.strip()
+        }]
+    
+    # Create segments with headers and their content
+    segments = []
+    for idx, match in enumerate(matches):
+        start_index = match.start()
+        end_index = matches[idx + 1].start() if idx + 1 < len(matches) else len(markdown_text)
+        header_line = match.group(0).strip()
+        header_level = len(match.group(1))
+        content = markdown_text[start_index:end_index].strip()
+        
+        # Calculate the actual content size (excluding the header)
+        content_without_header = content[len(header_line):].strip()
+        content_length = len(content_without_header)
+        
+        segments.append({
+            'header': header_line,
+            'level': header_level,
+            'content': content,
+            'content_without_header': content_without_header,
+            'content_length': content_length,
+        })
+    
+    # Improved merging logic - keep merging until we have enough content
+    final_chunks = []
+    current_merged_chunk = None
+    current_merged_headers = []
+    current_merged_content = ""
+    current_content_length = 0
+    
+    for segment in segments:
+        # If we don't have a current chunk or the current segment has small content
+        if current_merged_chunk is None:
+            # Start a new merged chunk
+            current_merged_chunk = {
+                'header': segment['header'],
+                'level': segment['level'],
+            }
+            current_merged_headers = [segment['header']]
+            current_merged_content = segment['content']
+            current_content_length = segment['content_length']
+        else:
+            # Always merge if the content is too small
+            if segment['content_length'] < min_content_chars or current_content_length < min_content_chars:
+                # Add to the current merged chunk
+                current_merged_headers.append(segment['header'])
+                current_merged_content += "\n\n" + segment['content']
+                current_content_length += segment['content_length']
+            else:
+                # We have enough content in the current chunk, so finalize it
+                current_merged_chunk['content'] = current_merged_content
+                current_merged_chunk['merged_headers'] = current_merged_headers
+                final_chunks.append(current_merged_chunk)
+                
+                # Start a new chunk with this segment
+                current_merged_chunk = {
+                    'header': segment['header'],
+                    'level': segment['level'],
+                }
+                current_merged_headers = [segment['header']]
+                current_merged_content = segment['content']
+                current_content_length = segment['content_length']
+    
+    # Add the last chunk if there's any
+    if current_merged_chunk is not None:
+        current_merged_chunk['content'] = current_merged_content
+        current_merged_chunk['merged_headers'] = current_merged_headers
+        final_chunks.append(current_merged_chunk)
+    
+    # Check if any chunks are too large and need splitting
+    result_chunks = []
+    for chunk in final_chunks:
+        words = chunk['content'].split()
+        if len(words) > split_threshold:
+            # Split into two parts (roughly equal halves)
+            mid_point = len(words) // 2
+            part1_text = " ".join(words[:mid_point])
+            part2_text = " ".join(words[mid_point:])
+            
+            # Keep the same header information for both parts
+            result_chunks.append({
+                'header': chunk['header'],
+                'level': chunk['level'],
+                'content': part1_text,
+                'merged_headers': chunk['merged_headers'],
+                'part': 1
+            })
+            result_chunks.append({
+                'header': chunk['header'],
+                'level': chunk['level'],
+                'content': part2_text,
+                'merged_headers': chunk['merged_headers'],
+                'part': 2
+            })
+        else:
+            result_chunks.append(chunk)
+    
+    return result_chunks
+
+
+WORDS = ("revenue", "Data", "Center", "gross", "margin", "GAAP", "non-GAAP", "fiscal", "quarter",
+         "increase", "compared", "segment", "operating", "expenses", "$", "million", "billion", "%")
+
+
+def synthetic_filing(size_mb=5.0, seed=7):
+    """Markdown shaped like an OCR'd 10-K: many headers, short tables and long narrative sections."""
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < size_mb * 1_000_000:
+        level = rng.choice((1, 2, 2, 3, 3, 3, 4))
+        header = "#" * level + " " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6)))
+        n_words = rng.choice((5, 20, 60, 300, 900, 1500))
+        body = " ".join(rng.choice(WORDS) for _ in range(n_words))
+        if rng.random() < 0.3:
+            body += "\n\n| Item | Q1 | Q2 |\n|---|---|---|\n| Revenue | 22,103 | 26,044 |"
+        parts.append(header + "\n\n" + body + "\n\n")
+        size += len(parts[-1])
+    return "".join(parts)
+
+
+def measure(fn, text):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(text)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def consume_stream(text):
+    """Stream chunks and only materialize each one's text transiently, as an embedder would."""
+    return sum(len(chunk.content) for chunk in iter_markdown_chunks(text))
+
+
+def main(size_mb=5.0):
+    text = synthetic_filing(size_mb)
+    print(f"Synthetic filing: {len(text) / 1e6:.1f} MB, {len(re.findall(r'^#', text, re.MULTILINE))} headers")
+
+    reference, reference_time, reference_peak = measure(reference_chunk_markdown_by_headers, text)
+    current, current_time, current_peak = measure(chunk_markdown_by_headers, text)
+    _, stream_time, stream_peak = measure(consume_stream, text)
+
+    identical = reference == current
+    print(f"Identical output: {identical} ({len(current)} chunks)")
+    print(f"{'implementation':<28}{'time (s)':>10}{'peak (MB)':>12}")
+    print(f"{'original':<28}{reference_time:>10.3f}{reference_peak / 1e6:>12.1f}")
+    print(f"{'chunk_markdown_by_headers':<28}{current_time:>10.3f}{current_peak / 1e6:>12.1f}")
+    print(f"{'iter_markdown_chunks':<28}{stream_time:>10.3f}{stream_peak / 1e6:>12.1f}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else 5.0))
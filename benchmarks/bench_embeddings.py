@@ -0,0 +1,74 @@
+"""
+Parity check and throughput benchmark: ONNX embedding backend vs. SentenceTransformer.
+
+Run from the repository root after exporting the ONNX artifact:
+    python -m backend.embeddings export
+    python -m benchmarks.bench_embeddings
+"""
+import sys
+import time
+import numpy as np
+from backend.embeddings import SentenceTransformerBackend, OnnxEmbeddingBackend
+
+# Vectors must stay interchangeable with the ones already stored in Pinecone
+MIN_COSINE_SIMILARITY = 0.99
+
+SAMPLE_TEXTS = [
+    "What were Nvidia's major financial highlights",
+    "Data Center revenue was a record, up 427% from a year ago.",
+    "GAAP gross margin was 78.4% and non-GAAP gross margin was 78.9%.",
+    "Gaming revenue declined sequentially due to lower sell-in to partners.",
+    "Automotive revenue was driven by AI cockpit solutions and self-driving platforms.",
+    "Operating expenses increased primarily due to compensation and benefits.",
+    "The company returned cash to shareholders through share repurchases and dividends.",
+    "Risk factors include export controls affecting shipments to China.",
+]
+
+
+def check_parity(reference, candidate, texts):
+    reference_vectors = reference.encode(texts)
+    candidate_vectors = candidate.encode(texts)
+    similarities = np.sum(reference_vectors * candidate_vectors, axis=1)
+    print(f"Cosine similarity vs. reference: min={similarities.min():.5f} mean={similarities.mean():.5f}")
+
+    # Rankings against the first text should agree as well
+    reference_rank = np.argsort(-(reference_vectors[1:] @ reference_vectors[0]))
+    candidate_rank = np.argsort(-(candidate_vectors[1:] @ candidate_vectors[0]))
+    print(f"Top-3 ranking agreement: {list(reference_rank[:3]) == list(candidate_rank[:3])}")
+    return similarities.min() >= MIN_COSINE_SIMILARITY
+
+
+def measure_throughput(backend, texts, repeats=3):
+    backend.encode(texts[:8])  # warm-up
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        backend.encode(texts)
+        best = min(best, time.perf_counter() - start)
+    return len(texts) / best
+
+
+def main(n_texts=512):
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] + f" (section {i})" for i in range(n_texts)]
+
+    start = time.perf_counter()
+    reference = SentenceTransformerBackend()
+    print(f"SentenceTransformer load: {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    candidate = OnnxEmbeddingBackend()
+    print(f"ONNX load: {time.perf_counter() - start:.2f}s")
+
+    passed = check_parity(reference, candidate, SAMPLE_TEXTS)
+
+    for backend in (reference, candidate):
+        print(f"{backend.name}: {measure_throughput(backend, texts):.1f} texts/sec")
+
+    if not passed:
+        print(f"Parity check FAILED: similarity below {MIN_COSINE_SIMILARITY}")
+        return 1
+    print("Parity check passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Microbenchmark: vectorized (dates x tickers) indicator panel vs. per-ticker pandas.
+
+Builds a synthetic 5-year panel (some tickers listed part-way through, some missing bars
+mid-history), checks that the panel engine matches add_indicators() run on each ticker,
+and reports wall time for growing numbers of tickers.
+
+    python -m benchmarks.bench_indicator_panel [max_tickers]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from backend.indicator_panel import compute_panel_indicators, panel_to_frame, INDICATOR_COLUMNS
+from backend.snowflake_pipeline import add_indicators, add_year_quarter
+from backend.fin_data_targets import COLUMN_NAMES
+
+TRADING_DAYS = 1256  # about five years
+
+
+def synthetic_panel(n_tickers, n_dates=TRADING_DAYS, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2020-01-01", periods=n_dates)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_dates, n_tickers)), axis=0))
+    fields = {
+        "Open": close * (1 + rng.normal(0, 0.01, close.shape)),
+        "High": close * 1.02,
+        "Low": close * 0.98,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, close.shape).astype(np.float64),
+    }
+    # Every tenth ticker was listed part-way through the period
+    for column in range(0, n_tickers, 10):
+        listed = int(rng.integers(1, n_dates // 2))
+        for values in fields.values():
+            values[:listed, column] = np.nan
+    # Every seventh ticker is missing a few bars mid-history (halted days, download gaps)
+    for column in range(3, n_tickers, 7):
+        missing = rng.integers(n_dates // 2, n_dates, 3)
+        for values in fields.values():
+            values[missing, column] = np.nan
+    tickers = [f"T{i:03d}" for i in range(n_tickers)]
+    return dates, tickers, fields
+
+
+def per_ticker_frame(dates, tickers, fields):
+    """The single-ticker pipeline, run once per column of the panel."""
+    frames = []
+    for column, ticker in enumerate(tickers):
+        df = pd.DataFrame({"Date": dates, **{name: values[:, column] for name, values in fields.items()}})
+        df = df.dropna(subset=["Close"]).reset_index(drop=True)
+        df["Volume"] = df["Volume"].astype("int64")
+        df.insert(0, "Ticker", ticker)
+        frames.append(add_year_quarter(add_indicators(df)))
+    return pd.concat(frames, ignore_index=True)[COLUMN_NAMES]
+
+
+def panel_frame(dates, tickers, fields):
+    indicators = compute_panel_indicators(fields["Open"], fields["Close"], fields["Volume"], tickers)
+    return panel_to_frame(dates, tickers, fields, indicators)
+
+
+def max_difference(expected, actual):
+    worst = 0.0
+    for name in INDICATOR_COLUMNS:
+        a, b = expected[name].to_numpy(), actual[name].to_numpy()
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            return float("inf")
+        mask = ~np.isnan(a)
+        worst = max(worst, float(np.max(np.abs(a[mask] - b[mask]) / np.maximum(1.0, np.abs(a[mask])))))
+    return worst
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(max_tickers=500):
+    sizes = [n for n in (5, 50, 100, 250, 500, 1000) if n <= max_tickers]
+    print(f"{'tickers':>8}{'rows':>10}{'per-ticker (s)':>16}{'panel (s)':>12}{'speedup':>10}{'max rel diff':>14}")
+    ok = True
+    for n in sizes:
+        dates, tickers, fields = synthetic_panel(n)
+        expected, reference_time = timed(per_ticker_frame, dates, tickers, fields)
+        actual, panel_time = timed(panel_frame, dates, tickers, fields)
+        same_rows = expected[["Ticker", "Date", "Year", "Quarter"]].equals(actual[["Ticker", "Date", "Year", "Quarter"]])
+        difference = max_difference(expected, actual) if same_rows else float("inf")
+        ok = ok and difference < 1e-9
+        print(f"{n:>8}{len(actual):>10}{reference_time:>16.3f}{panel_time:>12.3f}"
+              f"{reference_time / panel_time:>9.1f}x{difference:>14.1e}")
+    print(f"Matches single-ticker results: {ok}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,83 @@
+"""
+Benchmark: news searches served live vs. from the stale-while-revalidate news cache.
+
+Starts the fake SerpApi server, points the news retriever at it and checks that warm
+requests never reach the API, stale entries are served immediately while refreshing in
+the background, concurrent misses share one search, and the pre-warm scheduler keeps
+the general feed and popular queries fresh without searching for an idle service.
+
+    python -m benchmarks.bench_news_cache [latency_seconds]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.fake_serpapi import start_fake_serpapi
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(latency=0.3):
+    server = start_fake_serpapi(latency=latency)
+    os.environ["SERPAPI_URL"] = server.url
+    os.environ.setdefault("SERPAPI_API_KEY", "fake")
+    from backend.agents.websearch_agent import NewsRetriever, GENERAL_QUERY, GENERAL_RECORDS, FINANCIAL_RECORDS
+    from backend.news_cache import NewsPrewarmer
+
+    retriever = NewsRetriever()
+    cache = retriever.cache
+    checks = {}
+    idle = NewsPrewarmer(cache, retriever.search, [(GENERAL_QUERY, GENERAL_RECORDS)], top_queries=5)
+    before = server.searches
+    idle.run_once()
+    checks["idle service makes no pre-warm searches"] = server.searches - before == 0
+    searches = [("News on NVIDIA: financial highlights quarterly results", FINANCIAL_RECORDS),
+                (GENERAL_QUERY, GENERAL_RECORDS)]
+
+    _, cold = timed(retriever.fetch_news_batch, searches)
+    before = server.searches
+    _, warm = timed(lambda: [retriever.fetch_news_batch(searches) for _ in range(50)])
+    checks["warm requests reach the API"] = server.searches - before == 0
+
+    # Expire the entries into their stale window: served at once, refreshed in the background
+    cache.ttl = 0.2
+    time.sleep(0.3)
+    before = server.searches
+    _, stale = timed(retriever.fetch_news_batch, searches)
+    time.sleep(latency + 0.2)
+    checks["stale entries refreshed in the background"] = server.searches - before == len(searches)
+    cache.ttl = 300
+
+    cache.clear()
+    before = server.searches
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        list(pool.map(lambda _: retriever.fetch_news(*searches[0]), range(20)))
+    checks["concurrent misses share one search"] = server.searches - before == 1
+
+    cache.clear()
+    prewarmer = NewsPrewarmer(cache, retriever.search, [(GENERAL_QUERY, GENERAL_RECORDS)], top_queries=5)
+    refreshed = prewarmer.run_once()
+    before = server.searches
+    retriever.fetch_news_batch(searches)
+    checks["pre-warmed searches served from memory"] = server.searches - before == 0
+
+    print(f"{'request':<34}{'wall time (ms)':>16}")
+    print(f"{'cold (2 concurrent searches)':<34}{cold * 1000:>16.1f}")
+    print(f"{'warm (mean of 50)':<34}{warm * 1000 / 50:>16.2f}")
+    print(f"{'stale (served, refresh queued)':<34}{stale * 1000:>16.2f}")
+    print(f"Pre-warm run refreshed {refreshed} searches; API searches served: {server.searches}")
+    print(f"Cache: {cache.stats()}")
+    print(f"Latency: {retriever.stats()}")
+    for name, ok in checks.items():
+        print(f"{name}: {ok}")
+    retriever.close()
+    server.shutdown()
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.3))
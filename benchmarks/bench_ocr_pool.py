@@ -0,0 +1,80 @@
+"""
+Check of the concurrent OCR pool against the fake Mistral OCR server.
+
+Runs a batch of filings (one of them unreadable) through run_ocr_pool and the real
+Mistral client, with the fake answering 429 to every few requests, and checks that
+requests respect the token-bucket rate, that 429s are retried until the documents
+succeed, and that the broken document fails alone. Also reports the speedup over a
+single worker.
+
+    python -m benchmarks.bench_ocr_pool [documents] [requests_per_minute]
+"""
+import os
+import sys
+import time
+from benchmarks.fake_mistral_ocr import start_fake_mistral_ocr
+
+
+def within_rate(times, requests_per_minute, burst, slack=0.25):
+    """True if no stretch of requests outpaces the token bucket (burst plus the refill rate)."""
+    rate = requests_per_minute / 60.0
+    for i in range(len(times)):
+        for j in range(i + 1, len(times)):
+            if j - i + 1 > burst + rate * (times[j] - times[i]) + slack:
+                return False
+    return True
+
+
+def run(documents, requests_per_minute, max_workers):
+    from backend.mistral_ocr_markdown import extract_text_from_pdf
+    from backend.ocr_pool import run_ocr_pool
+
+    def convert(document_url, ocr_call):
+        markdown = ocr_call(extract_text_from_pdf, document_url)
+        assert document_url in markdown
+
+    start = time.perf_counter()
+    result = run_ocr_pool(documents, convert, requests_per_minute=requests_per_minute,
+                          max_workers=max_workers, max_retries=5)
+    return result, time.perf_counter() - start
+
+
+def main(count=8, requests_per_minute=120):
+    server = start_fake_mistral_ocr(latency=1.0, throttle_every=4)
+    # The Mistral client is configured when its module is imported
+    os.environ["MISTRAL_SERVER_URL"] = server.url
+    os.environ.setdefault("MISTRAL_API_KEY", "fake")
+
+    documents = [f"https://bucket.s3.amazonaws.com/pdf/2024/filing_{i}.pdf" for i in range(count - 1)]
+    broken = "https://bucket.s3.amazonaws.com/pdf/2024/broken_filing.pdf"
+    documents.insert(count // 2, broken)
+
+    result, elapsed = run(documents, requests_per_minute, max_workers=4)
+    with server.lock:
+        log = list(server.requests)
+    times = [received_at for received_at, _, _ in log]
+    statuses = [status for _, _, status in log]
+
+    server.throttle_every = None
+    with server.lock:
+        server.requests.clear()
+    _, sequential = run(documents, requests_per_minute, max_workers=1)
+
+    failed = [item for item, _ in result["failed"]]
+    checks = {
+        "requests stay within the rate limit": within_rate(times, requests_per_minute, burst=max(1, requests_per_minute // 60)),
+        "429s were retried": statuses.count(429) > 0 and len(result["succeeded"]) == count - 1,
+        "only the broken document failed": failed == [broken],
+        "broken document was not retried": sum(1 for _, url, _ in log if url == broken) == 1,
+    }
+    print(f"{count} documents, {requests_per_minute} requests/minute, 1.0s per document")
+    print(f"Requests: {len(log)} ({statuses.count(429)} answered 429, {statuses.count(422)} answered 422)")
+    print(f"4 workers: {elapsed:.1f}s   1 worker: {sequential:.1f}s   speedup: {sequential / elapsed:.1f}x")
+    for name, ok in checks.items():
+        print(f"{name}: {ok}")
+    server.shutdown()
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(arg) for arg in sys.argv[1:3])))
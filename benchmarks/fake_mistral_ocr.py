@@ -0,0 +1,117 @@
+"""
+Fake Mistral OCR server for testing the ingestion OCR pool offline.
+
+Answers POST /v1/ocr like the Mistral API, with one markdown page per document after an
+artificial latency. It can also misbehave on purpose:
+- `--rate-limit N` answers 429 when more than N requests arrive within one minute,
+  like a workspace quota
+- `--throttle-every K` answers 429 to every K-th request, to exercise retries
+- any document URL containing "broken" always gets a 422 (not retryable)
+GET /stats returns the request log (times and status codes).
+
+    python -m benchmarks.fake_mistral_ocr [--port 8081] [--latency 0.5]
+    MISTRAL_SERVER_URL=http://127.0.0.1:8081 python -m backend.nvidia_pipeline
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class FakeMistralOcr(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.5, rate_limit=None, throttle_every=None):
+        super().__init__(address, FakeMistralOcrHandler)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.throttle_every = throttle_every
+        self.requests = []  # (received_at, document_url, status)
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def admit(self, document_url):
+        """Status code for the next request: 200, 429 (rate limited) or 422 (broken document)."""
+        with self.lock:
+            now = time.monotonic()
+            recent = sum(1 for received_at, _, status in self.requests if now - received_at < 60 and status != 429)
+            if self.rate_limit is not None and recent >= self.rate_limit:
+                status = 429
+            elif self.throttle_every and (len(self.requests) + 1) % self.throttle_every == 0:
+                status = 429
+            elif "broken" in document_url:
+                status = 422
+            else:
+                status = 200
+            self.requests.append((now, document_url, status))
+            return status
+
+
+class FakeMistralOcrHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/ocr":
+            return self._send(404, {"detail": "Not found."})
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        document_url = body.get("document", {}).get("document_url", "")
+        status = self.server.admit(document_url)
+        if status == 429:
+            return self._send(429, {"message": "Requests rate limit exceeded"})
+        if status == 422:
+            return self._send(422, {"detail": [{"loc": ["body", "document", "document_url"], "type": "value_error",
+                                                "msg": f"Could not read document {document_url}"}]})
+        time.sleep(self.server.latency)
+        self._send(200, {
+            "model": body.get("model", "mistral-ocr-latest"),
+            "pages": [{
+                "index": 0,
+                "markdown": f"# Filing\n\nOCR text of {document_url}.",
+                "images": [],
+                "dimensions": {"dpi": 200, "height": 2200, "width": 1700},
+            }],
+            "usage_info": {"pages_processed": 1, "doc_size_bytes": None},
+        })
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/stats":
+            return self._send(404, {"detail": "Not found."})
+        with self.server.lock:
+            start = self.server.requests[0][0] if self.server.requests else 0
+            log = [{"at": round(at - start, 3), "document_url": url, "status": status}
+                   for at, url, status in self.server.requests]
+        self._send(200, {"requests": log})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_mistral_ocr(port=0, latency=0.5, rate_limit=None, throttle_every=None):
+    """Starts the fake server on a background thread and returns it (its `url` is the server URL)."""
+    server = FakeMistralOcr(("127.0.0.1", port), latency, rate_limit, throttle_every)
+    threading.Thread(target=server.serve_forever, name="fake-mistral-ocr", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Mistral OCR server.")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds to spend on each document.")
+    parser.add_argument("--rate-limit", type=int, help="Requests per minute before answering 429.")
+    parser.add_argument("--throttle-every", type=int, help="Answer 429 to every K-th request.")
+    args = parser.parse_args()
+    server = FakeMistralOcr(("127.0.0.1", args.port), args.latency, args.rate_limit, args.throttle_every)
+    print(f"Fake Mistral OCR listening on {server.url}")
+    server.serve_forever()
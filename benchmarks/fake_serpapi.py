@@ -0,0 +1,98 @@
+"""
+Fake SerpApi news search server for testing the news agent offline.
+
+Answers GET /search?q=...&num=... with canned `news_results` from allowed domains,
+dated today, after an artificial latency. GET /stats returns the number of searches
+served, so a test can check how many requests actually reached "SerpApi".
+
+    python -m benchmarks.fake_serpapi [--port 8082] [--latency 0.3]
+    SERPAPI_URL=http://127.0.0.1:8082/search SERPAPI_API_KEY=test uvicorn backend.main:app
+"""
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SOURCES = [("Reuters", "reuters.com"), ("Bloomberg", "bloomberg.com"), ("The Verge", "theverge.com"),
+           ("MarketWatch", "marketwatch.com"), ("Tom's Hardware", "tomshardware.com")]
+
+
+def news_results(query, count):
+    today = datetime.now().strftime("%b %d, %Y")
+    results = []
+    for i in range(count):
+        source, domain = SOURCES[i % len(SOURCES)]
+        slug = "-".join(query.lower().split())[:40]
+        results.append({
+            "position": i + 1,
+            "title": f"{query} ({i + 1})",
+            "link": f"https://www.{domain}/news/{slug}-{i + 1}",
+            "source": source,
+            "date": today,
+            "snippet": f"Coverage of {query} from {source}.",
+        })
+    return results
+
+
+class FakeSerpApi(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.3):
+        super().__init__(address, FakeSerpApiHandler)
+        self.latency = latency
+        self.searches = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/search"
+
+
+class FakeSerpApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == "/stats":
+            with self.server.lock:
+                return self._send(200, {"searches": self.server.searches})
+        if url.path != "/search" or "q" not in params:
+            return self._send(404, {"error": "Unknown endpoint."})
+        with self.server.lock:
+            self.server.searches += 1
+        time.sleep(self.server.latency)
+        query = params["q"][0]
+        count = min(int(params.get("num", ["10"])[0]), 100)
+        self._send(200, {"search_parameters": {"q": query, "tbm": "nws"}, "news_results": news_results(query, count)})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_serpapi(port=0, latency=0.3):
+    """Starts the fake server on a background thread and returns it (its `url` is the search endpoint)."""
+    server = FakeSerpApi(("127.0.0.1", port), latency)
+    threading.Thread(target=server.serve_forever, name="fake-serpapi", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake SerpApi news search server.")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds to wait before answering a search.")
+    args = parser.parse_args()
+    server = FakeSerpApi(("127.0.0.1", args.port), args.latency)
+    print(f"Fake SerpApi listening on {server.url}")
+    server.serve_forever()
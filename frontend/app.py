@@ -7,6 +7,21 @@ import json
 FASTAPI_URL = "http://127.0.0.1:8000/"  # FastAPI base URL
 LOGO_PATH = "frontend/assets/app-logo.png"  # Ensure this matches your actual filename
 
+def iter_sse_events(response):
+    """Parse a server-sent event stream into (event, data) pairs."""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
 def configure_page():
     """Sets up the Streamlit page configuration."""
     st.set_page_config(layout="wide", page_title="Nvidia Assistant")
@@ -132,15 +147,21 @@ def display_main_content(user_selection):
             print(request_data)
 
             if action == "Summarize":
-                # Send request to FastAPI
+                # Stream the summary from FastAPI and render it as it arrives
                 try:
-                    response = requests.post(f"{FASTAPI_URL}summarize_using_pinecone", json=request_data)
-                    if response.status_code == 200:
-                        result = response.json().get("response", "No response received.")
-                        st.success("✅ Response received:")
-                        st.write(result)
-                    else:
-                        st.error(f"❌ Error: {response.status_code} - {response.text}")
+                    with requests.post(f"{FASTAPI_URL}summarize_using_pinecone/stream", json=request_data, stream=True) as response:
+                        if response.status_code == 200:
+                            st.success("✅ Response received:")
+                            placeholder = st.empty()
+                            result = ""
+                            for event, data in iter_sse_events(response):
+                                if event == "token":
+                                    result += data["text"]
+                                    placeholder.markdown(result)
+                            if not result:
+                                placeholder.write("No response received.")
+                        else:
+                            st.error(f"❌ Error: {response.status_code} - {response.text}")
                 except requests.exceptions.RequestException as e:
                     st.error(f"❌ Failed to connect to API: {e}")
 
@@ -225,39 +246,55 @@ def display_main_content(user_selection):
                 except requests.exceptions.RequestException as e:
                     st.error(f"An error occurred while fetching news: {e}")
             elif action == "Complete report":
-                url = f"{FASTAPI_URL}/generate_report/"
+                url = f"{FASTAPI_URL}generate_report/stream"
                 
-                # Send GET request to the FastAPI endpoint
+                # Stream the report and fill in each section as its agent finishes
                 try:
-                    response = requests.post(url, json=request_data)
-                    response.raise_for_status()  # Raise an exception for bad responses
-
-                    # If the request is successful, extract the summary and markdown content
-                    data = response.json()
-                    pinecone_result = data.get("pinecone_result", "")
-                    snowflake_result = data.get("snowflake_result", "")
-                    news_result = data.get("news_result", {})
-
-                    # Extract summary and markdown from news_result if it exists
-                    news_summary = news_result.get("summary", "")
-                    news_markdown = news_result.get("markdown", "")
-                    top_financial_news = news_markdown.split("LATEST NVIDIA GENERAL NEWS")[0]
-                    st.markdown("## NVIDIA REPORT")
-                    st.markdown("### NVIDIA Report Summary")
-                    st.write(pinecone_result)
-                    st.markdown("### NVIDIA Visual Summary")
-                    if snowflake_result:
-                        for url in snowflake_result:
-                            st.image(url, caption="Generated Plot", use_container_width=True)
-                    else:
-                        st.warning("No images found.")
-                    st.markdown("### NVIDIA News Summary and Top Financial News")
-                    if news_summary:
-                        st.markdown("### News Summary")
-                        st.write(news_summary)  # Display the summary
-                    if top_financial_news:
-                        st.markdown("### Top 5 Financial News")
-                        st.write(top_financial_news)
+                    with requests.post(url, json=request_data, stream=True) as response:
+                        response.raise_for_status()  # Raise an exception for bad responses
+
+                        st.markdown("## NVIDIA REPORT")
+                        st.markdown("### NVIDIA Report Summary")
+                        pinecone_section = st.empty()
+                        pinecone_section.info("Generating summary...")
+                        st.markdown("### NVIDIA Visual Summary")
+                        snowflake_section = st.empty()
+                        snowflake_section.info("Generating visuals...")
+                        st.markdown("### NVIDIA News Summary and Top Financial News")
+                        news_section = st.empty()
+                        news_section.info("Fetching news...")
+
+                        for event, data in iter_sse_events(response):
+                            if event != "section":
+                                continue
+                            agent, result = data["agent"], data["result"]
+
+                            if agent == "pinecone":
+                                pinecone_section.write(result or "Summary unavailable: the document search did not finish in time.")
+
+                            elif agent == "snowflake":
+                                with snowflake_section.container():
+                                    if result:
+                                        for image_url in result:
+                                            st.image(image_url, caption="Generated Plot", use_container_width=True)
+                                    else:
+                                        st.warning("No images found.")
+
+                            elif agent == "news":
+                                # Extract summary and markdown from news_result if it exists
+                                news_result = result or {}  # None when the news agent timed out
+                                news_summary = news_result.get("summary", "")
+                                news_markdown = news_result.get("markdown", "")
+                                top_financial_news = news_markdown.split("LATEST NVIDIA GENERAL NEWS")[0]
+                                with news_section.container():
+                                    if news_summary:
+                                        st.markdown("### News Summary")
+                                        st.write(news_summary)  # Display the summary
+                                    if top_financial_news:
+                                        st.markdown("### Top 5 Financial News")
+                                        st.write(top_financial_news)
+                                    if not news_summary and not top_financial_news:
+                                        st.warning("No news found.")
 
                 except requests.exceptions.RequestException as e:
                     st.error(f"An error occurred while fetching news: {e}")